@@ -6,3 +6,9 @@ DB_HOST = "sample_host"
 DB_USER = "sample_user"
 DB_PASS = "sample_psw"
 DB_PORT = 1234
+
+# Named database targets for fan-out audits (a job's `targets`); keys left out fall back to the values above
+DB_TARGETS = {
+    "us_east": {"host": "sample_host_us_east"},
+    "eu_west": {"host": "sample_host_eu_west", "database": "sample_db_eu"},
+}
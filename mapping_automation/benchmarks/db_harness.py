@@ -0,0 +1,254 @@
+# --- Imports ---
+import contextlib
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import tempfile
+from collections import Counter, defaultdict
+
+
+# --- Schema ---
+# The production tables as the scripts use them. `{serial}` is filled in per backend so the same DDL
+# runs on a locally launched Postgres and on the embedded SQLite substitute.
+
+SCHEMA = """
+CREATE TABLE table_source_info (
+    id {serial},
+    source TEXT NOT NULL,
+    protocol TEXT,
+    provider TEXT,
+    last_update_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE table_dataset_config (
+    id {serial},
+    dataset_id INTEGER NOT NULL REFERENCES table_source_info (id),
+    dataset_name TEXT NOT NULL,
+    dataset_description TEXT,
+    download_type TEXT NOT NULL,
+    last_update_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE table_canonical_fields (
+    id {serial},
+    name TEXT NOT NULL,
+    download_type TEXT NOT NULL,
+    last_update_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE table_mapping (
+    id {serial},
+    field_id INTEGER NOT NULL REFERENCES table_canonical_fields (id),
+    dataset_id INTEGER NOT NULL,
+    column_transformation_id INTEGER,
+    custom_transformation TEXT,
+    is_active BOOLEAN NOT NULL DEFAULT true,
+    last_update_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    create_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    download_type TEXT NOT NULL,
+    dataset_name TEXT NOT NULL,
+    dataset_description TEXT,
+    auto_mapped BOOLEAN DEFAULT false
+);
+CREATE TABLE table_origin_field (
+    id {serial},
+    mapping_id INTEGER NOT NULL REFERENCES table_mapping (id),
+    source_field TEXT NOT NULL,
+    dataset_id INTEGER NOT NULL,
+    is_active BOOLEAN NOT NULL DEFAULT true,
+    last_update_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    create_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    short_name TEXT,
+    long_name TEXT
+);
+CREATE TABLE table_field_definitions (
+    id {serial},
+    download_type TEXT,
+    field TEXT NOT NULL,
+    long_name TEXT NOT NULL,
+    transformation TEXT NOT NULL,
+    last_update_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_dataset_config_download_type ON table_dataset_config (download_type, dataset_id);
+CREATE INDEX idx_canonical_fields_download_type ON table_canonical_fields (download_type, name);
+CREATE INDEX idx_mapping_lookup ON table_mapping (field_id, dataset_id, dataset_name, download_type);
+CREATE INDEX idx_origin_lookup ON table_origin_field (mapping_id, source_field, dataset_id);
+"""
+
+SERIAL = {"sqlite": "INTEGER PRIMARY KEY", "postgres": "SERIAL PRIMARY KEY"}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# --- Statement Counting ---
+class CountingCursor:
+    def __init__(self, cursor, harness):
+        self._cursor = cursor
+        self._harness = harness
+
+    def execute(self, qry, params=None):
+        self._harness.record(qry)
+        if params is None:
+            return self._cursor.execute(qry)
+        return self._cursor.execute(qry, params)
+
+    def executemany(self, qry, seq):
+        self._harness.record(qry)
+        return self._cursor.executemany(qry, seq)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class CountingConnection:
+    def __init__(self, conn, harness):
+        self._conn = conn
+        self._harness = harness
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._conn.cursor(*args, **kwargs), self._harness)
+
+    def close(self):
+        # the harness owns the underlying connection; scripts calling conn.close() must not end the session
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+# --- Local Database ---
+class LocalDatabase:
+    def __init__(self, backend=None):
+        self.backend = backend or ("postgres" if postgres_available() else "sqlite")
+        self.counts = defaultdict(Counter)
+        self.current_stage = None
+        self._tmp_dir = None
+        self._raw = None
+        self._pg_data = None
+
+    # lifecycle
+    def start(self):
+        self._tmp_dir = tempfile.mkdtemp(prefix="mapping_db_")
+        if self.backend == "postgres":
+            self._raw = self._start_postgres()
+        else:
+            self._raw = sqlite3.connect(os.path.join(self._tmp_dir, "mapping.db"), check_same_thread=False)
+        cursor = self._raw.cursor()
+        for statement in SCHEMA.format(serial=SERIAL[self.backend]).split(";"):
+            if statement.strip():
+                cursor.execute(statement)
+        self._raw.commit()
+        return self
+
+    def stop(self):
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+        if self._pg_data:
+            subprocess.run(["pg_ctl", "-D", self._pg_data, "-m", "fast", "-w", "stop"], capture_output=True)
+        if self._tmp_dir:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _start_postgres(self):
+        import psycopg2
+
+        self._pg_data = os.path.join(self._tmp_dir, "pgdata")
+        subprocess.run(["initdb", "-D", self._pg_data, "-A", "trust", "-U", "postgres"], check=True,
+                       capture_output=True)
+        port = _free_port()
+        options = f"-p {port} -k {self._tmp_dir} -c listen_addresses='' -c fsync=off"
+        subprocess.run(["pg_ctl", "-D", self._pg_data, "-o", options, "-w", "start"], check=True, capture_output=True)
+        return psycopg2.connect(dbname="postgres", user="postgres", host=self._tmp_dir, port=port)
+
+    # data
+    def connection(self):
+        return CountingConnection(self._raw, self)
+
+    def load(self, data):
+        cursor = self._raw.cursor()
+        marker = "?" if self.backend == "sqlite" else "%s"
+
+        def insert(table, columns, rows):
+            values = ", ".join([marker] * len(columns))
+            cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({values})", rows)
+
+        insert("table_source_info", ("id", "source", "protocol", "provider"),
+               [(row[3], row[0], row[1], row[2]) for row in data.source_info])
+        insert("table_dataset_config", ("dataset_id", "dataset_name", "dataset_description", "download_type"),
+               [(row[3], row[4], row[5], row[6]) for row in data.source_info])
+        insert("table_canonical_fields", ("id", "name", "download_type"),
+               [(field_id, name, data.download_type) for field_id, name in data.field_info])
+        insert("table_mapping", ("id", "field_id", "dataset_id", "column_transformation_id", "custom_transformation",
+                                 "is_active", "download_type", "dataset_name", "auto_mapped"),
+               [(m[0], m[1], m[2], 3, m[5], m[4], data.download_type, m[3], True) for m in data.mappings])
+        insert("table_origin_field", ("mapping_id", "source_field", "dataset_id", "is_active", "short_name",
+                                      "long_name"),
+               [(o[0], o[1], o[2], o[3], o[1], o[1]) for o in data.origin_fields])
+        insert("table_field_definitions", ("download_type", "field", "long_name", "transformation"),
+               [(data.download_type, name, d["long_name"], d["transformation"]) for name, d in data.definitions.items()])
+        if self.backend == "postgres":
+            for table in ("table_source_info", "table_canonical_fields", "table_mapping"):
+                cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                               f"(SELECT COALESCE(MAX(id), 1) FROM {table}))")
+            cursor.execute("ANALYZE")
+        self._raw.commit()
+        return self
+
+    def execute(self, qry):
+        cursor = self._raw.cursor()
+        cursor.execute(qry)
+        self._raw.commit()
+
+    def scalar(self, qry):
+        cursor = self._raw.cursor()
+        cursor.execute(qry)
+        return cursor.fetchone()[0]
+
+    # counting
+    def record(self, qry):
+        kind = qry.lstrip().split(None, 1)[0].upper() if qry.strip() else ""
+        self.counts[self.current_stage][kind] += 1
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        previous, self.current_stage = self.current_stage, name
+        try:
+            yield self
+        finally:
+            self.current_stage = previous
+
+    def statements(self, stage, kind=None):
+        counts = self.counts.get(stage, Counter())
+        return counts[kind.upper()] if kind else sum(counts.values())
+
+    def assert_budget(self, stage, max_statements, kind=None):
+        issued = self.statements(stage, kind)
+        if issued > max_statements:
+            label = f"{kind.upper()} statements" if kind else "statements"
+            raise QueryBudgetExceeded(f"Stage '{stage}' issued {issued} {label}, budget is {max_statements}: "
+                                      f"{dict(self.counts[stage])}")
+        return issued
+
+    def reset_counts(self):
+        self.counts.clear()
+
+
+def postgres_available():
+    return bool(shutil.which("initdb") and shutil.which("pg_ctl"))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
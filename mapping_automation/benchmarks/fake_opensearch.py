@@ -0,0 +1,327 @@
+# --- Imports ---
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+# --- Query Evaluation ---
+# Keyword fields are matched case-insensitively (a lowercase-normalized keyword), text fields are
+# tokenized on non-alphanumerics for match_phrase, the same way the metadata index is mapped.
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(value):
+    return _TOKEN.findall(str(value).lower())
+
+
+class Corpus:
+    def __init__(self, documents):
+        self.documents = list(documents)
+        self._keywords = defaultdict(list)
+        self._tokens = defaultdict(set)
+        self._doc_tokens = []
+        for doc_id, doc in enumerate(self.documents):
+            tokens = {}
+            for name, value in doc.items():
+                if value is None:
+                    continue
+                self._keywords[(name, str(value).lower())].append(doc_id)
+                tokens[name] = tokenize(value)
+                for token in tokens[name]:
+                    self._tokens[(name, token)].add(doc_id)
+            self._doc_tokens.append(tokens)
+
+    def _candidates(self, clause):
+        if "match_all" in clause:
+            return set(range(len(self.documents)))
+        if "term" in clause:
+            (name, value), = clause["term"].items()
+            value = value.get("value") if isinstance(value, dict) else value
+            return set(self._keywords.get((name, str(value).lower()), ()))
+        if "match_phrase" in clause:
+            (name, phrase), = clause["match_phrase"].items()
+            phrase = phrase.get("query") if isinstance(phrase, dict) else phrase
+            tokens = tokenize(phrase)
+            if not tokens:
+                return set()
+            ids = set.intersection(*(self._tokens.get((name, token), set()) for token in tokens))
+            return {doc_id for doc_id in ids if _contains_run(self._doc_tokens[doc_id].get(name, []), tokens)}
+        raise ValueError(f"Unsupported query clause: {sorted(clause)}")
+
+    def search(self, body):
+        query = body.get("query", {"match_all": {}})
+        if "bool" in query:
+            clauses = query["bool"].get("must", []) + query["bool"].get("filter", [])
+        else:
+            clauses = [query]
+        if not clauses:
+            clauses = [{"match_all": {}}]
+
+        matched = None
+        for clause in sorted(clauses, key=lambda c: "match_phrase" in c):
+            ids = self._candidates(clause)
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                break
+        matched = sorted(matched or ())
+
+        # sort on keyword sub-fields and _id (ascending) with search_after paging
+        sort_keys = {}
+        if body.get("sort"):
+            fields = [next(iter(item)) if isinstance(item, dict) else item for item in body["sort"]]
+            for name in fields:
+                if name != "_id" and not name.endswith(".keyword"):
+                    # like the real index: text fields have no fielddata, only their .keyword sub-fields sort
+                    raise ValueError(f"Text fields are not optimised for sorting; use [{name}.keyword] instead")
+            sort_keys = {doc_id: [str(doc_id) if name == "_id" else str(self.documents[doc_id].get(name[:-8], ""))
+                                  for name in fields] for doc_id in matched}
+            matched.sort(key=sort_keys.get)
+            if body.get("search_after"):
+                after = [str(value) for value in body["search_after"]]
+                matched = [doc_id for doc_id in matched if sort_keys[doc_id] > after]
+
+        terminated_early = False
+        terminate_after = body.get("terminate_after")
+        if terminate_after and len(matched) > terminate_after:
+            matched = matched[:terminate_after]
+            terminated_early = True
+
+        start = body.get("from", 0)
+        size = body.get("size", 10)
+        hits = [{"_index": "metadata", "_id": str(doc_id), "_score": 1.0,
+                 "_source": _select_source(self.documents[doc_id], body.get("_source", True))}
+                for doc_id in matched[start:start + size]]
+        for hit in hits if sort_keys else ():
+            hit["sort"] = sort_keys[int(hit["_id"])]
+
+        result = {"took": 1, "timed_out": False,
+                  "hits": {"total": {"value": len(matched), "relation": "eq"}, "max_score": 1.0 if hits else None,
+                           "hits": hits}}
+        if terminate_after:
+            result["terminated_early"] = terminated_early
+        return result
+
+
+def _contains_run(tokens, run):
+    width = len(run)
+    return any(tokens[i:i + width] == run for i in range(len(tokens) - width + 1))
+
+
+def _select_source(doc, source_filter):
+    if source_filter is True:
+        return dict(doc)
+    if source_filter is False:
+        return {}
+    if isinstance(source_filter, str):
+        source_filter = [source_filter]
+    if isinstance(source_filter, dict):
+        source_filter = source_filter.get("includes", list(doc))
+    return {name: doc[name] for name in source_filter if name in doc}
+
+
+def apply_filter_path(payload, filter_path):
+    paths = [p.strip().split(".") for p in filter_path.split(",") if p.strip()]
+
+    def walk(node, remaining):
+        if not remaining:
+            return node
+        if isinstance(node, list):
+            kept = [walk(item, remaining) for item in node]
+            return [item for item in kept if item is not None] or None
+        if not isinstance(node, dict):
+            return None
+        head, rest = remaining[0], remaining[1:]
+        out = {}
+        for key, value in node.items():
+            if head == "*" or head == key:
+                kept = walk(value, rest)
+                if kept is not None:
+                    out[key] = kept
+        return out or None
+
+    result = {}
+    for path in paths:
+        _merge(result, walk(payload, path) or {})
+    return result
+
+
+def _merge(target, source):
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        elif isinstance(value, list) and isinstance(target.get(key), list):
+            for i, item in enumerate(value):
+                if i < len(target[key]) and isinstance(item, dict):
+                    _merge(target[key][i], item)
+                elif i >= len(target[key]):
+                    target[key].append(item)
+        else:
+            target[key] = value
+
+
+# --- HTTP Stand-in ---
+class FakeOpenSearch:
+    def __init__(self, documents, latency_ms=0, throttle_rate=0.0, error_rate=0.0, seed=0, compression=True,
+                 host="127.0.0.1", port=0):
+        self.corpus = documents if isinstance(documents, Corpus) else Corpus(documents)
+        self.latency_ms = latency_ms
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.compression = compression
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = defaultdict(int)
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def search_url(self):
+        return f"{self.url}/metadata/_search"
+
+    @property
+    def msearch_url(self):
+        return f"{self.url}/metadata/_msearch"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def _roll(self):
+        with self._lock:
+            delay = self.latency_ms
+            if isinstance(delay, (tuple, list)):
+                delay = self._rng.uniform(*delay)
+            return delay / 1000.0, self._rng.random(), self._rng.random()
+
+    def handle(self, path, query_string, body):
+        delay, throttle_roll, error_roll = self._roll()
+        if delay:
+            time.sleep(delay)
+        if throttle_roll < self.throttle_rate:
+            self.count(throttled=1)
+            return 429, {"error": {"type": "es_rejected_execution_exception", "reason": "rejected execution"},
+                         "status": 429}
+        if error_roll < self.error_rate:
+            self.count(errors=1)
+            return 500, {"error": {"type": "internal_server_error", "reason": "injected failure"}, "status": 500}
+
+        params = parse_qs(query_string)
+        try:
+            if path.rstrip("/").endswith("_msearch"):
+                lines = [json.loads(line) for line in body.decode().splitlines() if line.strip()]
+                responses = []
+                for search_body in lines[1::2]:
+                    response = dict(self.corpus.search(search_body), status=200)
+                    responses.append(response)
+                self.count(msearch=1, searches=len(responses))
+                payload = {"took": 1, "responses": responses}
+            else:
+                self.count(searches=1)
+                payload = self.corpus.search(json.loads(body) if body else {})
+        except ValueError as e:
+            return 400, {"error": {"type": "search_phase_execution_exception", "reason": str(e)}, "status": 400}
+
+        if "filter_path" in params:
+            payload = apply_filter_path(payload, params["filter_path"][0])
+        return 200, payload
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _serve(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            split = urlsplit(self.path)
+            status, payload = server.handle(split.path, split.query, body)
+
+            data = json.dumps(payload).encode()
+            headers = {"Content-Type": "application/json"}
+            if server.compression and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                data = gzip.compress(data, compresslevel=1)
+                headers["Content-Encoding"] = "gzip"
+            server.count(requests=1, bytes_in=length, bytes_out=len(data))
+
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = _serve
+        do_POST = _serve
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fixture corpus over a fake OpenSearch HTTP endpoint.")
+    parser.add_argument("--corpus", required=True, help="JSON array or NDJSON file of metadata documents")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--latency-ms", type=float, nargs="+", default=[0], help="fixed delay or MIN MAX range")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    args = parser.parse_args()
+
+    latency = args.latency_ms[0] if len(args.latency_ms) == 1 else tuple(args.latency_ms[:2])
+    server = FakeOpenSearch(load_corpus(args.corpus), latency_ms=latency, throttle_rate=args.throttle_rate,
+                            error_rate=args.error_rate, port=args.port)
+    print(f"Fake OpenSearch serving {len(server.corpus.documents)} documents at {server.search_url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# --- Imports ---
+import argparse
+import contextlib
+import datetime
+import gzip
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from unittest.mock import patch
+
+import pandas as pd
+
+from Automation_Scripts.mapping_automation.src import main
+from Automation_Scripts.mapping_automation.src.main import FINAL_HEADERS, INITIAL_HEADERS
+from Automation_Scripts.mapping_automation.src.memory import PeakRssSampler
+from Automation_Scripts.mapping_automation.benchmarks.synthetic import generate, parse_scale
+from Automation_Scripts.mapping_automation.benchmarks.fake_opensearch import FakeOpenSearch, apply_filter_path
+from Automation_Scripts.mapping_automation.benchmarks.db_harness import LocalDatabase
+
+STANDIN_URL = "http://standin-opensearch.local/api/search"
+
+
+# --- Local ES Stand-in ---
+class _StandInResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.content = json.dumps(payload).encode()
+        self.wire_bytes = len(self.content)
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class StandInSearch:
+    # Answers the bool/term/match_phrase query built by get_metadata_elastic_search from an in-memory index
+    def __init__(self, documents):
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._index = defaultdict(list)
+        for doc in documents:
+            self._index[(doc["documentId"], doc["className"], doc["longName"].lower())].append(doc)
+
+    def get(self, url, headers=None, data=None, params=None, **kwargs):
+        # honours the lean request options: gzip bodies, size and filter_path
+        self.requests += 1
+        self.bytes_in += len(data)
+        gzipped = "gzip" in (headers or {}).get("Accept-Encoding", "")
+        if (headers or {}).get("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        body = json.loads(data)
+        terms, phrase = {}, ""
+        for clause in body["query"]["bool"]["must"]:
+            if "term" in clause:
+                (name, value), = clause["term"].items()
+                terms[name] = value["value"]
+            else:
+                phrase = clause["match_phrase"]["longName"]
+
+        docs = self._index.get((terms.get("documentId"), terms.get("className"), phrase.lower()), [])
+        hits = [{"_index": "metadata", "_id": doc["tableSystemName"], "_score": 1.0,
+                 "_source": {name: doc[name] for name in body.get("_source", doc) if name in doc}}
+                for doc in docs if terms.get("resource", doc["resource"]) == doc["resource"]]
+        payload = {"took": 1, "timed_out": False,
+                   "hits": {"total": {"value": len(hits), "relation": "eq"}, "hits": hits[:body.get("size", 10)]}}
+        if (params or {}).get("filter_path"):
+            payload = apply_filter_path(payload, params["filter_path"])
+        response = _StandInResponse(payload)
+        if gzipped:
+            response.wire_bytes = len(gzip.compress(response.content, compresslevel=1))
+        self.bytes_out += response.wire_bytes
+        return response
+
+
+# --- Measurement ---
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkRun:
+    def __init__(self, label, scale, audit_rows, db):
+        self.db = db
+        self.base = {
+            "label": label,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "git_rev": git_revision(),
+            "python": platform.python_version(),
+            "scale": scale,
+            "audit_rows": audit_rows,
+            "db_backend": db.backend,
+        }
+        self.records = []
+
+    def stage(self, name, rows, fn, **extra):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), self.db.stage(name), \
+                PeakRssSampler() as rss:
+            start = time.perf_counter()
+            result = fn()
+            seconds = time.perf_counter() - start
+
+        record = dict(self.base, stage=name, rows=rows, seconds=round(seconds, 4),
+                      rows_per_sec=round(rows / seconds, 1) if seconds > 0 else None,
+                      peak_rss_mb=rss.peak_mb, statements=self.db.statements(name), **{k: v() if callable(v) else v for k, v in extra.items()})
+        self.records.append(record)
+        print(f"  {name:<32} rows={rows:<9} {seconds:>9.3f}s  {record['rows_per_sec'] or 0:>12,.0f} rows/s"
+              f"  peak_rss={rss.peak_mb}MB  statements={record['statements']}")
+        return result
+
+
+# --- Suite ---
+@contextlib.contextmanager
+def es_backend(kind, documents, **server_options):
+    # "standin" answers in-process without HTTP; "server" goes over localhost to FakeOpenSearch
+    if kind == "server":
+        with FakeOpenSearch(documents, **server_options) as server:
+            yield server.search_url, lambda: dict(server.stats)
+    else:
+        search = StandInSearch(documents)
+        with patch.object(main.requests, "get", search.get):
+            yield STANDIN_URL, lambda: {"searches": search.requests, "bytes_in": search.bytes_in,
+                                        "bytes_out": search.bytes_out}
+
+
+def run_suite(scale, label, seed=0, excel=True, download_type="listing", es="standin", db_backend=None,
+              lean_es=False, **server_options):
+    data = generate(scale, download_type=download_type, seed=seed)
+    with LocalDatabase(db_backend) as db, patch.object(main, "lean_es", lean_es):
+        db.load(data)
+        return _run_stages(db, data, scale, label, excel, download_type, es, server_options)
+
+
+def _run_stages(db, data, scale, label, excel, download_type, es, server_options):
+    conn = db.connection()
+    cursor = conn.cursor()
+    run = BenchmarkRun(label, scale, data.audit_rows, db)
+    run.base["es_backend"] = es
+    run.base["lean_es"] = main.lean_es
+    print(f"Scale {scale}: {data.audit_rows} audit rows, {len(data.mappings)} mappings, "
+          f"{len(data.es_documents)} ES documents")
+
+    source_info = run.stage("get_src_info", len(data.source_info),
+                            lambda: main.get_src_info(cursor, data.sources, download_type))
+    field_info = run.stage("get_field_info", len(data.field_info),
+                           lambda: main.get_field_info(cursor, data.canonical_fields, download_type))
+    master_list = [l1 + l2 for l1 in source_info for l2 in field_info]
+
+    audit_tups = run.stage("mapping_audit", len(master_list), lambda: main.mapping_audit(cursor, master_list))
+    proposals = run.stage("append_proposed_fields", len(audit_tups),
+                          lambda: main.append_proposed_fields(audit_tups, data.definitions))
+    audit_df = pd.DataFrame(proposals, columns=INITIAL_HEADERS)
+
+    with es_backend(es, data.es_documents, **server_options) as (search_url, es_stats):
+        audit_df = run.stage("elasticsearch_check_from_df", len(audit_df),
+                             lambda: main.elasticsearch_check_from_df(audit_df, search_url),
+                             es_stats=es_stats)
+    es_record = run.records[-1]
+    if es_record["es_stats"].get("searches"):
+        # wire bytes and latency per search, to compare lean and default requests
+        searches = es_record["es_stats"]["searches"]
+        es_record["ms_per_search"] = round(es_record["seconds"] * 1000 / searches, 4)
+        es_record["bytes_per_search"] = round((es_record["es_stats"].get("bytes_in", 0) +
+                                               es_record["es_stats"].get("bytes_out", 0)) / searches, 1)
+    audit_df = run.stage("add_finalized_transformation", len(audit_df),
+                         lambda: main.add_finalized_transformation(audit_df))
+
+    if excel:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_file = os.path.join(tmp_dir, f"Canonical_Audit_{download_type}_results.xlsx")
+            run.stage("write_updated_audit_to_excel", len(audit_df),
+                      lambda: main.write_updated_audit_to_excel(FINAL_HEADERS, audit_df.values.tolist(), out_file))
+
+    unmapped_df = audit_df[(audit_df['Mapping Status'] == 'Not Mapped') & (audit_df['es_Pass'] == 'Y')]
+    deactivated_df = audit_df[(audit_df['Mapping Status'] == 'Deactivated') & (audit_df['es_Pass'] == 'Y')]
+
+    mapping_ids = run.stage("canonical_inserts_from_df", len(unmapped_df),
+                            lambda: main.canonical_inserts_from_df(unmapped_df, conn, download_type))
+    run.stage("origin_inserts_from_df", len(unmapped_df),
+              lambda: main.origin_inserts_from_df(unmapped_df, conn, mapping_ids=mapping_ids))
+    run.stage("canonical_updates_from_df", len(deactivated_df),
+              lambda: main.canonical_updates_from_df(deactivated_df, conn))
+    run.stage("origin_updates_from_df", len(deactivated_df),
+              lambda: main.origin_updates_from_df(deactivated_df, conn))
+
+    return run.records
+
+
+def append_results(path, records):
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def compare(path, baseline_label, label):
+    latest = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            latest[(record["label"], record["scale"], record["stage"])] = record
+
+    print(f"\n{'scale':>9}  {'stage':<32} {baseline_label:>14} {label:>14}  speedup")
+    for (run_label, scale, stage), record in sorted(latest.items(), key=lambda item: (item[0][1], item[0][2])):
+        baseline = latest.get((baseline_label, scale, stage))
+        if run_label != label or not baseline or not baseline["rows_per_sec"] or not record["rows_per_sec"]:
+            continue
+        speedup = record["rows_per_sec"] / baseline["rows_per_sec"]
+        print(f"{scale:>9}  {stage:<32} {baseline['rows_per_sec']:>14,.0f} {record['rows_per_sec']:>14,.0f}"
+              f"  {speedup:.2f}x")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Throughput benchmarks for the mapping_automation stages.")
+    parser.add_argument("--scale", nargs="+", default=["1k"], help="audit row counts, e.g. 1k 100k 1M")
+    parser.add_argument("--label", default=None, help="name for this run in the results file (default: git rev)")
+    parser.add_argument("--results", default="benchmark_results.jsonl")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--download-type", default="listing")
+    parser.add_argument("--skip-excel", action="store_true", help="skip write_updated_audit_to_excel")
+    parser.add_argument("--compare", metavar="BASELINE_LABEL", help="print speedups against an earlier label")
+    parser.add_argument("--db", choices=["sqlite", "postgres"], default=None,
+                        help="local database backend (default: postgres when initdb/pg_ctl are on PATH)")
+    parser.add_argument("--es", choices=["standin", "server"], default="standin",
+                        help="answer ES lookups in-process or through the local FakeOpenSearch HTTP server")
+    parser.add_argument("--es-latency-ms", type=float, default=0, help="per-request latency for --es server")
+    parser.add_argument("--es-throttle-rate", type=float, default=0.0, help="fraction of 429s for --es server")
+    parser.add_argument("--es-error-rate", type=float, default=0.0, help="fraction of 500s for --es server")
+    parser.add_argument("--es-lean", action="store_true", help="send lean ES searches (main.lean_es)")
+    args = parser.parse_args()
+
+    server_options = {}
+    if args.es == "server":
+        server_options = dict(latency_ms=args.es_latency_ms, throttle_rate=args.es_throttle_rate,
+                              error_rate=args.es_error_rate)
+
+    label = args.label or git_revision() or "local"
+    for scale in args.scale:
+        records = run_suite(parse_scale(scale), label, seed=args.seed, excel=not args.skip_excel,
+                            download_type=args.download_type, es=args.es, db_backend=args.db,
+                            lean_es=args.es_lean, **server_options)
+        append_results(args.results, records)
+    print(f"Results appended to '{args.results}' under label '{label}'.")
+
+    if args.compare:
+        compare(args.results, args.compare, label)
+
+
+if __name__ == "__main__":
+    main_cli()
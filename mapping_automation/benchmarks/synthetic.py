@@ -0,0 +1,99 @@
+# --- Imports ---
+import math
+import random
+from dataclasses import dataclass, field
+
+
+# --- Synthetic Data Generator ---
+# Produces source/dataset/field/mapping data shaped like the production tables, sized so that
+# the source x field cross product audited by main() has roughly `scale` rows.
+
+PROTOCOLS = ("RETS", "WEBAPI")
+RESOURCES = {"RETS": "Property", "WEBAPI": "EntityType"}
+
+
+@dataclass
+class SyntheticData:
+    download_type: str
+    source_info: list = field(default_factory=list)      # rows shaped like get_src_info()
+    field_info: list = field(default_factory=list)       # rows shaped like get_field_info()
+    definitions: dict = field(default_factory=dict)      # shaped like field_mapping_definitions
+    mappings: list = field(default_factory=list)         # (id, field_id, dataset_id, dataset_name, is_active, transformation)
+    origin_fields: list = field(default_factory=list)    # (mapping_id, source_field, dataset_id, is_active)
+    es_documents: list = field(default_factory=list)     # ES metadata documents
+
+    @property
+    def sources(self):
+        return sorted({row[0] for row in self.source_info})
+
+    @property
+    def canonical_fields(self):
+        return tuple(name for _, name in self.field_info)
+
+    @property
+    def audit_rows(self):
+        return len(self.source_info) * len(self.field_info)
+
+
+def parse_scale(value):
+    value = str(value).strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    number = value[:-1] if multiplier > 1 else value
+    return int(float(number) * multiplier)
+
+
+def generate(scale, download_type="listing", seed=0, fields_per_dataset=50, datasets_per_source=4,
+             mapped_ratio=0.6, deactivated_ratio=0.1, es_hit_ratio=0.85):
+    rng = random.Random(seed)
+    data = SyntheticData(download_type=download_type)
+
+    n_fields = max(1, min(fields_per_dataset, scale))
+    n_datasets = max(1, math.ceil(scale / n_fields))
+
+    for field_idx in range(1, n_fields + 1):
+        name = f"FIELD_{field_idx:04d}"
+        data.field_info.append((field_idx, name))
+        if field_idx % 3 == 0:
+            data.definitions[name] = {
+                "long_name": f"Fld{field_idx}A, Fld{field_idx}B",
+                "transformation": f"concat(Fld{field_idx}A, ''-'', Fld{field_idx}B)",
+            }
+        else:
+            data.definitions[name] = {
+                "long_name": f"Fld{field_idx}A",
+                "transformation": f"IF(Fld{field_idx}A=''Y'',1,0)",
+            }
+
+    for dataset_id in range(1, n_datasets + 1):
+        source = f"SRC_{(dataset_id - 1) // datasets_per_source + 1:05d}"
+        protocol = PROTOCOLS[dataset_id % len(PROTOCOLS)]
+        dataset_name = f"Class{dataset_id}"
+        data.source_info.append((source, protocol, f"Provider{dataset_id % 7}", dataset_id, dataset_name,
+                                 f"Synthetic class {dataset_id}", download_type))
+
+    mapping_id = 0
+    for source, protocol, _, dataset_id, dataset_name, _, _ in data.source_info:
+        for field_id, name in data.field_info:
+            short_names = [s.strip() for s in data.definitions[name]["long_name"].split(',')]
+
+            roll = rng.random()
+            if roll < mapped_ratio + deactivated_ratio:
+                mapping_id += 1
+                is_active = roll < mapped_ratio
+                data.mappings.append((mapping_id, field_id, dataset_id, dataset_name, is_active,
+                                      data.definitions[name]["transformation"]))
+                if not is_active:
+                    data.origin_fields.append((mapping_id, short_names[0], dataset_id, False))
+
+            for short_name in short_names:
+                if rng.random() < es_hit_ratio:
+                    data.es_documents.append({
+                        "documentId": source.lower(),
+                        "className": dataset_name.lower(),
+                        "resource": RESOURCES[protocol].lower(),
+                        "longName": short_name,
+                        "tableSystemName": f"tbl_{dataset_id}_{short_name}",
+                    })
+
+    return data
+
@@ -0,0 +1,113 @@
+# --- Imports ---
+from Automation_Scripts.mapping_automation.src import tracing
+
+
+# --- Materialized Audit Table ---
+# table_mapping_audit holds the audit status of every (download_type, dataset_id, dataset_name, field_id) that has a
+# table_mapping row: 'Mapped' when any matching mapping is active, otherwise 'Deactivated'. Pairs without a row are
+# 'Not Mapped'. view_mapping_audit adds those by crossing datasets with canonical fields, so other tools can read
+# the full audit state with one query.
+#
+# refresh_audit_table() is a delta refresh: only keys whose table_mapping rows changed since the stored watermark
+# (table_mapping_audit_state) are recomputed. Deleted table_mapping rows leave no timestamp behind, so schedule a
+# periodic refresh with full=True, as for the incremental audit.
+
+AUDIT_TABLE_DDL = [
+    """CREATE TABLE IF NOT EXISTS table_mapping_audit (
+        download_type TEXT NOT NULL,
+        dataset_id INTEGER NOT NULL,
+        dataset_name TEXT NOT NULL,
+        field_id INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        refreshed_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (download_type, dataset_id, dataset_name, field_id)
+    );""",
+    """CREATE TABLE IF NOT EXISTS table_mapping_audit_state (
+        download_type TEXT PRIMARY KEY,
+        watermark TIMESTAMP,
+        refreshed_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );""",
+    "DROP VIEW IF EXISTS view_mapping_audit;",
+    """CREATE VIEW view_mapping_audit AS
+        SELECT info.source, cls.dataset_id, cls.dataset_name, cls.download_type, f.id AS field_id, f.name AS field_name,
+               COALESCE(a.status, 'Not Mapped') AS status
+        FROM table_dataset_config cls
+                JOIN table_source_info info ON info.id = cls.dataset_id
+                JOIN table_canonical_fields f ON f.download_type = cls.download_type
+                LEFT JOIN table_mapping_audit a ON a.download_type = cls.download_type AND a.dataset_id = cls.dataset_id
+                        AND a.dataset_name = cls.dataset_name AND a.field_id = f.id;""",
+]
+
+STATUS_SELECT = """
+    SELECT download_type, dataset_id, dataset_name, field_id,
+           CASE WHEN MAX(CASE WHEN is_active THEN 1 ELSE 0 END) = 1 THEN 'Mapped' ELSE 'Deactivated' END,
+           CURRENT_TIMESTAMP
+    FROM table_mapping
+    WHERE {where}
+    GROUP BY download_type, dataset_id, dataset_name, field_id"""
+
+
+def ensure_audit_table(conn):
+    cursor = conn.cursor()
+    for stmt in AUDIT_TABLE_DDL:
+        tracing.execute(cursor, stmt, "audit_table_ddl")
+    conn.commit()
+
+
+def refresh_audit_table(conn, dl_type, full=False):
+    # Returns the number of keys recomputed
+    cursor = conn.cursor()
+    watermark_qry = f"SELECT watermark FROM table_mapping_audit_state WHERE download_type = '{dl_type}';"
+    try:
+        tracing.execute(cursor, watermark_qry, "audit_table_watermark", download_type=dl_type)
+    except Exception:
+        # first use against this database: install the tables and view, then start with a full refresh
+        conn.rollback()
+        ensure_audit_table(conn)
+        tracing.execute(cursor, watermark_qry, "audit_table_watermark", download_type=dl_type)
+    row = cursor.fetchone()
+    watermark = None if full or row is None else row[0]
+
+    tracing.execute(cursor, f"SELECT MAX(last_update_ts) FROM table_mapping WHERE download_type = '{dl_type}';",
+                    "audit_table_high_water_mark", download_type=dl_type)
+    high_water_mark = cursor.fetchone()[0]
+
+    if watermark is None:
+        delete_qry = f"DELETE FROM table_mapping_audit WHERE download_type = '{dl_type}';"
+        where = f"download_type = '{dl_type}'"
+    else:
+        # >= re-reads rows stamped at the previous watermark; recomputing a key is idempotent
+        changed = f"""SELECT dataset_id, dataset_name, field_id FROM table_mapping
+                      WHERE download_type = '{dl_type}' AND last_update_ts >= '{watermark}'"""
+        delete_qry = f"""DELETE FROM table_mapping_audit WHERE download_type = '{dl_type}'
+                         AND (dataset_id, dataset_name, field_id) IN ({changed});"""
+        where = f"download_type = '{dl_type}' AND (dataset_id, dataset_name, field_id) IN ({changed})"
+
+    with tracing.span("audit_table.refresh", download_type=dl_type, full=watermark is None):
+        tracing.execute(cursor, delete_qry, "audit_table_delete", download_type=dl_type)
+        tracing.execute(cursor, f"""
+            INSERT INTO table_mapping_audit
+            (download_type, dataset_id, dataset_name, field_id, status, refreshed_ts)
+            {STATUS_SELECT.format(where=where)};""", "audit_table_insert", download_type=dl_type)
+        refreshed = cursor.rowcount
+        tracing.execute(cursor, f"DELETE FROM table_mapping_audit_state WHERE download_type = '{dl_type}';",
+                        "audit_table_state", download_type=dl_type)
+        if high_water_mark is not None:
+            tracing.execute(cursor, f"""
+                INSERT INTO table_mapping_audit_state (download_type, watermark, refreshed_ts)
+                VALUES ('{dl_type}', '{high_water_mark}', CURRENT_TIMESTAMP);""",
+                            "audit_table_state", download_type=dl_type)
+    conn.commit()
+
+    print(f"Audit table refreshed for '{dl_type}': {refreshed} {'keys' if watermark is None else 'changed keys'}")
+    return refreshed
+
+
+def read_audit_statuses(cursor, dl_type):
+    # One indexed scan of the download type's primary-key range
+    qry = f"""  select dataset_id, dataset_name, field_id, status
+                from table_mapping_audit
+                where download_type = '{dl_type}';"""
+    tracing.execute(cursor, qry, "mapping_audit_materialized", download_type=dl_type)
+    return {(dataset_id, dataset_name, field_id): status for dataset_id, dataset_name, field_id, status
+            in cursor.fetchall()}
@@ -0,0 +1,218 @@
+# --- Imports ---
+import datetime
+import gzip
+import hashlib
+import math
+import os
+
+from Automation_Scripts.mapping_automation.src.jsonfile import write_json, write_text
+from Automation_Scripts.mapping_automation.src.main import origin_insert_names, origin_update_names
+
+
+# --- Offline Bundle ---
+# Export mode for the four insert/update generators: instead of executing statements, the planned changes are
+# streamed into COPY text files (one per staging table) next to a single merge script, apply.sql, which loads them
+# into temporary staging tables and merges them with set-based statements. A DBA applies the bundle with
+#
+#   cd <bundle_dir> && psql -v ON_ERROR_STOP=1 -f apply.sql
+#
+# Rows are written as they are planned, so memory stays flat however many origin fields a bundle holds. The merge
+# statements reproduce the generators' rules: existing mappings and origin fields are skipped, matching
+# transformations are only re-activated, and origin fields resolve their mapping ids inside the database.
+
+STAGING_TABLES = {
+    "staging_mapping_insert": ("field_id integer", "dataset_id integer", "dataset_name text",
+                               "dataset_description text", "download_type text", "custom_transformation text"),
+    "staging_origin_insert": ("field_id integer", "dataset_id integer", "dataset_name text", "source_field text",
+                              "long_name text"),
+    "staging_mapping_update": ("field_id integer", "dataset_id integer", "dataset_name text", "download_type text",
+                               "custom_transformation text"),
+    "staging_origin_update": ("field_id integer", "dataset_id integer", "source_field text", "long_name text"),
+}
+
+MERGE_SQL = """
+-- canonical inserts: skip mappings that already exist for the download type
+INSERT INTO table_mapping
+(field_id, dataset_id, column_transformation_id, custom_transformation, is_active, last_update_ts, create_ts, download_type, dataset_name, dataset_description, auto_mapped)
+SELECT DISTINCT s.field_id, s.dataset_id, 3, s.custom_transformation, true, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, s.download_type, s.dataset_name, s.dataset_description, true
+FROM staging_mapping_insert s
+WHERE NOT EXISTS (
+    SELECT 1 FROM table_mapping m
+    WHERE m.field_id = s.field_id AND m.dataset_id = s.dataset_id
+    AND m.dataset_name = s.dataset_name AND m.download_type = s.download_type
+);
+
+-- origin inserts: attach to every mapping with the same field, dataset and class
+INSERT INTO table_origin_field
+(mapping_id, source_field, dataset_id, is_active, last_update_ts, create_ts, short_name, long_name)
+SELECT DISTINCT m.id, s.source_field, s.dataset_id, true, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, s.source_field, s.long_name
+FROM staging_origin_insert s
+JOIN table_mapping m ON m.field_id = s.field_id AND m.dataset_id = s.dataset_id AND m.dataset_name = s.dataset_name
+WHERE NOT EXISTS (
+    SELECT 1 FROM table_origin_field o
+    WHERE o.mapping_id = m.id AND o.source_field = s.source_field AND o.dataset_id = s.dataset_id
+);
+
+-- canonical updates: re-activate, replacing the transformation only when it changed
+UPDATE table_mapping AS m
+SET custom_transformation = CASE WHEN trim(m.custom_transformation) = trim(s.custom_transformation)
+                                 THEN m.custom_transformation ELSE s.custom_transformation END,
+    is_active = true,
+    last_update_ts = CURRENT_TIMESTAMP
+FROM staging_mapping_update s
+WHERE m.field_id = s.field_id AND m.dataset_id = s.dataset_id
+AND m.dataset_name = s.dataset_name AND m.download_type = s.download_type;
+
+-- origin updates: resolve the mapping id once, re-activate existing origin fields and insert missing ones
+CREATE TEMP TABLE resolved_origin_update AS
+SELECT DISTINCT
+    (SELECT min(m.id) FROM table_mapping m WHERE m.field_id = s.field_id AND m.dataset_id = s.dataset_id) AS mapping_id,
+    s.source_field, s.dataset_id, s.long_name
+FROM staging_origin_update s;
+
+DELETE FROM resolved_origin_update WHERE mapping_id IS NULL;
+
+UPDATE table_origin_field AS o
+SET is_active = true, last_update_ts = CURRENT_TIMESTAMP
+FROM resolved_origin_update r
+WHERE o.mapping_id = r.mapping_id AND o.source_field = r.source_field AND o.dataset_id = r.dataset_id;
+
+INSERT INTO table_origin_field
+(mapping_id, source_field, dataset_id, is_active, last_update_ts, create_ts, short_name, long_name)
+SELECT r.mapping_id, r.source_field, r.dataset_id, true, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, r.source_field, min(r.long_name)
+FROM resolved_origin_update r
+WHERE NOT EXISTS (
+    SELECT 1 FROM table_origin_field o
+    WHERE o.mapping_id = r.mapping_id AND o.source_field = r.source_field AND o.dataset_id = r.dataset_id
+)
+GROUP BY r.mapping_id, r.source_field, r.dataset_id;
+"""
+
+
+def copy_escape(value):
+    # PostgreSQL COPY text format: \N is NULL, backslash and control characters are escaped
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "\\N"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # ids read back from a spreadsheet with blanks arrive as floats
+    text = str(value)
+    return (text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def literal_value(value):
+    # the generators interpolate text into '...' literals, so definitions already write a quote as ''
+    return value.replace("''", "'") if isinstance(value, str) else value
+
+
+def copy_line(values):
+    return "\t".join(copy_escape(value) for value in values) + "\n"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    # data files can be larger than memory, so they are hashed a chunk at a time
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BundleWriter:
+    def __init__(self, out_dir, download_type, compress=False):
+        self.out_dir = out_dir
+        self.download_type = download_type
+        self.compress = compress
+        self.rows = {table: 0 for table in STAGING_TABLES}
+        self._files = {}
+        self._mapping_keys = set()  # canonical inserts keep the first row per (field, dataset, class), as the generator
+        os.makedirs(out_dir, exist_ok=True)
+
+    def _data_file(self, table):
+        return f"{table}.copy.gz" if self.compress else f"{table}.copy"
+
+    def write(self, table, values):
+        f = self._files.get(table)
+        if f is None:
+            path = os.path.join(self.out_dir, self._data_file(table))
+            f = gzip.open(path, "wt", encoding="utf-8", newline="") if self.compress else \
+                open(path, "w", encoding="utf-8", newline="")
+            self._files[table] = f
+        f.write(copy_line(literal_value(value) for value in values))
+        self.rows[table] += 1
+
+    # planners: one staging row per statement the matching generator would run
+    def add_unmapped(self, df):
+        for _, row in df.iterrows():
+            field_id, dataset_id, dataset_name = row['Field ID'], row['Dataset ID'], row['Class']
+            if (field_id, dataset_id, dataset_name) not in self._mapping_keys:
+                self._mapping_keys.add((field_id, dataset_id, dataset_name))
+                self.write("staging_mapping_insert", (field_id, dataset_id, dataset_name,
+                                                      row['Class Description'], self.download_type,
+                                                      row['Finalized Transformation']))
+            for source_field, long_name in origin_insert_names(row):
+                self.write("staging_origin_insert", (field_id, dataset_id, dataset_name, source_field, long_name))
+
+    def add_deactivated(self, df):
+        for _, row in df.iterrows():
+            field_id, dataset_id = row['Field ID'], row['Dataset ID']
+            self.write("staging_mapping_update", (field_id, dataset_id, row['Class'], row['Download Type'],
+                                                  row['Finalized Transformation']))
+            for source_field, long_name in origin_update_names(row):
+                self.write("staging_origin_update", (field_id, dataset_id, source_field, long_name))
+
+    def apply_script(self):
+        lines = ["-- Generated mapping bundle; run from this directory:",
+                 "--   psql -v ON_ERROR_STOP=1 -f apply.sql",
+                 "\\set ON_ERROR_STOP on",
+                 "BEGIN;", ""]
+        for table, columns in STAGING_TABLES.items():
+            lines.append(f"CREATE TEMP TABLE {table} ({', '.join(columns)});")
+        for table in STAGING_TABLES:
+            if not self.rows[table]:
+                continue
+            source = f"PROGRAM 'gzip -dc {self._data_file(table)}'" if self.compress else f"'{self._data_file(table)}'"
+            lines.append(f"\\copy {table} FROM {source}")
+        lines.extend(f"ANALYZE {table};" for table in STAGING_TABLES if self.rows[table])
+        lines.append(MERGE_SQL)
+        lines.append("COMMIT;")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+        # apply.sql and the manifest are replaced atomically, and the manifest goes last: a bundle with a manifest
+        # is complete
+        write_text(os.path.join(self.out_dir, "apply.sql"), self.apply_script())
+
+        files = {}
+        for table, count in self.rows.items():
+            if count:
+                files[self._data_file(table)] = {"table": table, "rows": count,
+                                                 "sha256": file_sha256(os.path.join(self.out_dir,
+                                                                                    self._data_file(table)))}
+        manifest = {"download_type": self.download_type,
+                    "created": datetime.datetime.now().isoformat(timespec="seconds"), "files": files}
+        write_json(os.path.join(self.out_dir, "manifest.json"), manifest, indent=2)
+        return manifest
+
+
+def write_bundle(out_dir, audit_df_with_es, download_type, compress=False):
+    # Same row selection as apply_audit_results; accepts one DataFrame or an iterable of DataFrame chunks
+    frames = [audit_df_with_es] if hasattr(audit_df_with_es, "iterrows") else audit_df_with_es
+    writer = BundleWriter(out_dir, download_type, compress)
+    unmapped = deactivated = 0
+    for df in frames:
+        passed = df[df['es_Pass'] == 'Y']
+        unmapped_df = passed[passed['Mapping Status'] == 'Not Mapped']
+        deactivated_df = passed[passed['Mapping Status'] == 'Deactivated']
+        writer.add_unmapped(unmapped_df)
+        writer.add_deactivated(deactivated_df)
+        unmapped += len(unmapped_df)
+        deactivated += len(deactivated_df)
+    manifest = writer.close()
+
+    print(f"Bundle written to '{out_dir}': " +
+          ", ".join(f"{info['table']}={info['rows']}" for info in manifest["files"].values()))
+    return {"bundle": out_dir, "unmapped": unmapped, "deactivated": deactivated,
+            **{f"{table}_rows": count for table, count in writer.rows.items()}}
@@ -0,0 +1,172 @@
+# --- Imports ---
+import datetime
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+from Automation_Scripts.mapping_automation.src.jsonfile import read_json, write_json
+from Automation_Scripts.mapping_automation.src.lazy import LazyModule
+
+pd = LazyModule("pandas")
+
+
+# --- Checkpoint Store ---
+# Each stage output is written as column-oriented JSON (no pickle) under {root}/{run_id}/, and the
+# manifest records which stages completed for which input fingerprint. A restarted run with the same
+# inputs skips completed stages and resumes batched stages at the first missing batch.
+#
+# Without an explicit run_id, a run is identified by its input fingerprint and the time it started. The start is
+# kept in {root}/{download_type}-{fingerprint}.started until the run finishes, so a restart resumes the same run
+# no matter when it happens, and the next run of a finished job starts afresh.
+
+PART_SUFFIX = ".part{batch:05d}"
+PART_PATTERN = ".part[0-9]*"
+
+def fingerprint_inputs(**inputs):
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def run_marker_path(root, download_type, fingerprint):
+    return os.path.join(root, f"{download_type}-{fingerprint}.started")
+
+
+def default_run_id(root, download_type, fingerprint):
+    # the unfinished run with these inputs, else a new one started now
+    marker_path = run_marker_path(root, download_type, fingerprint)
+    if os.path.exists(marker_path):
+        return read_json(marker_path)["run_id"]
+    started = datetime.datetime.now()
+    run_id = f"{download_type}-{fingerprint}-{started:%Y%m%dT%H%M%S}"
+    os.makedirs(root, exist_ok=True)
+    write_json(marker_path, {"run_id": run_id, "started": started.isoformat(timespec="seconds")})
+    return run_id
+
+
+def _encode(value):
+    if value is None:
+        return {"kind": "none"}
+    if isinstance(value, pd.DataFrame):
+        return {"kind": "frame", "columns": [str(c) for c in value.columns],
+                "data": {str(c): value[c].astype(object).tolist() for c in value.columns}}
+    return {"kind": "rows", "data": [list(row) for row in value]}
+
+
+def _decode(payload):
+    if payload["kind"] == "frame":
+        return pd.DataFrame({c: payload["data"][c] for c in payload["columns"]}, columns=payload["columns"])
+    if payload["kind"] == "rows":
+        return [tuple(row) for row in payload["data"]]
+    return None
+
+
+class CheckpointStore:
+    def __init__(self, root, run_id, fingerprint, marker_path=None):
+        self.run_id = run_id
+        self.fingerprint = fingerprint
+        self.marker_path = marker_path  # run-start marker written by default_run_id, removed by finish()
+        self.path = os.path.join(root, run_id)
+        os.makedirs(self.path, exist_ok=True)
+        self._manifest_path = os.path.join(self.path, "manifest.json")
+
+        manifest = read_json(self._manifest_path) if os.path.exists(self._manifest_path) else None
+        if manifest is None or manifest.get("fingerprint") != fingerprint:
+            if manifest is not None:
+                print(f"Checkpoint inputs changed for run '{run_id}', starting over")
+                self._clear_files()
+            manifest = {"run_id": run_id, "fingerprint": fingerprint, "stages": {}}
+            write_json(self._manifest_path, manifest)
+        self.manifest = manifest
+
+    def _clear_files(self):
+        for path in glob.glob(os.path.join(self.path, "*.json")):
+            os.remove(path)
+
+    def _stage_path(self, name, batch=None):
+        suffix = "" if batch is None else PART_SUFFIX.format(batch=batch)
+        return os.path.join(self.path, f"{name}{suffix}.json")
+
+    def _part_paths(self, name):
+        return glob.glob(os.path.join(glob.escape(self.path), f"{glob.escape(name)}{PART_PATTERN}.json"))
+
+    def is_done(self, name):
+        return name in self.manifest["stages"]
+
+    def mark_done(self, name, **details):
+        self.manifest["stages"][name] = dict(details, completed=datetime.datetime.now().isoformat(timespec="seconds"))
+        write_json(self._manifest_path, self.manifest)
+
+    def save(self, name, value):
+        write_json(self._stage_path(name), _encode(value))
+        self.mark_done(name)
+
+    def load(self, name):
+        if not self.is_done(name) or not os.path.exists(self._stage_path(name)):
+            return None
+        return _decode(read_json(self._stage_path(name)))
+
+    def stage(self, name, fn):
+        if self.is_done(name):
+            print(f"Resuming: stage '{name}' loaded from checkpoint")
+            return self.load(name)
+        value = fn()
+        self.save(name, value)
+        return value
+
+    def batched(self, name, df, fn, batch_size=500):
+        if self.is_done(name):
+            print(f"Resuming: stage '{name}' loaded from checkpoint")
+            return self.load(name)
+
+        n_batches = max(1, -(-len(df) // batch_size))
+        parts = []
+        for batch in range(n_batches):
+            part_path = self._stage_path(name, batch)
+            if os.path.exists(part_path):
+                parts.append(_decode(read_json(part_path)))
+                continue
+            part = fn(df.iloc[batch * batch_size:(batch + 1) * batch_size])
+            write_json(part_path, _encode(part))
+            parts.append(part)
+
+        parts = [part for part in parts if part is not None and not part.empty]
+        result = pd.concat(parts, ignore_index=True) if parts else fn(df.iloc[0:0])
+        self.save(name, result)
+        for path in self._part_paths(name):
+            os.remove(path)
+        return result
+
+    def finish(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        if self.marker_path and os.path.exists(self.marker_path):
+            os.remove(self.marker_path)
+
+
+class NullCheckpointStore:
+    # Used when checkpointing is off: every stage simply runs
+    def is_done(self, name):
+        return False
+
+    def mark_done(self, name, **details):
+        pass
+
+    def stage(self, name, fn):
+        return fn()
+
+    def batched(self, name, df, fn, batch_size=500):
+        return fn(df)
+
+    def finish(self):
+        pass
+
+
+def open_checkpoint(root, download_type, run_id=None, **inputs):
+    if not root:
+        return NullCheckpointStore()
+    fingerprint = fingerprint_inputs(download_type=download_type, **inputs)
+    if run_id:
+        return CheckpointStore(root, run_id, fingerprint)
+    return CheckpointStore(root, default_run_id(root, download_type, fingerprint), fingerprint,
+                           marker_path=run_marker_path(root, download_type, fingerprint))
@@ -0,0 +1,290 @@
+# --- Imports ---
+import argparse
+import json
+import os
+import sys
+import time
+
+from Automation_Scripts.mapping_automation.src import main as mapping
+from Automation_Scripts.mapping_automation.src import fanout, memory, tracing
+from Automation_Scripts.mapping_automation.src.bundle import write_bundle
+from Automation_Scripts.mapping_automation.src.history import open_history
+from Automation_Scripts.mapping_automation.src.index_advisor import advise
+
+pd = mapping.pd
+
+
+# --- Job Config ---
+# A config file (JSON, or YAML when PyYAML is installed) holds `defaults` merged into every entry of `jobs`:
+#
+#   defaults: {auth_url: "https://...", out_path: "/reports/", checkpoint_dir: "/reports/checkpoints/"}
+#   jobs:
+#     - {name: agent_nightly, sources: [SRC_A, SRC_B], download_type: agent}
+#     - {name: listing_rets, sources: [SRC_C], download_type: listing, fields: [IS_ACTIVE]}
+#
+# A job's optional `writes` ({chunk_size: 500, savepoints: true, atomic: false}) configures the WriteExecutor.
+# `materialized_audit: true` reads statuses from the delta-refreshed table_mapping_audit and refreshes it after writes.
+# `diff_state_dir` adds a delta report of rows added/removed/changed since the job's previous run.
+# `explain: plan|analyze` adds index_advisor plan summaries to the job's result (and so to --summary).
+# A job's optional `bundle_dir` exports its inserts/updates as an offline psql bundle instead of executing them.
+# `targets: [us_east, eu_west]` runs the job against each named database concurrently (fanout.py).
+
+REQUIRED_JOB_KEYS = ("sources", "download_type", "auth_url")
+
+
+def load_config(path):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError(f"PyYAML is required to read '{path}'; install it or use a JSON config")
+        config = yaml.safe_load(text)
+    else:
+        config = json.loads(text)
+
+    if isinstance(config, list):
+        config = {"jobs": config}
+    defaults = config.get("defaults", {})
+    return [normalize_job(dict(defaults, **job), idx) for idx, job in enumerate(config.get("jobs", []))]
+
+
+def normalize_job(job, idx=0):
+    missing = [key for key in REQUIRED_JOB_KEYS if not job.get(key)]
+    if missing:
+        raise ValueError(f"Job #{idx} ({job.get('name', 'unnamed')}) is missing {', '.join(missing)}")
+    if isinstance(job["sources"], str):
+        job["sources"] = [job["sources"]]
+    job.setdefault("name", job["download_type"])
+    job.setdefault("report_path", os.path.join(job.get("out_path", "."), f"Canonical_Audit_{job['name']}_results.xlsx"))
+    if job.get("fields"):
+        job["fields"] = tuple(job["fields"])
+    if job.get("targets"):
+        job["targets"] = fanout.normalize_targets(job["targets"])
+    return job
+
+
+# --- Approvals ---
+# An approval file lists the names of jobs whose reviewed report may be applied, one per line
+# (`#` starts a comment, `*` approves every job). --approve approves everything.
+
+def load_approvals(path):
+    approved = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            name = line.split("#", 1)[0].strip()
+            if name:
+                approved.add(name)
+    return approved
+
+
+def is_approved(job, approve_all, approvals):
+    # approving a fan-out job approves all of its targets
+    return approve_all or "*" in approvals or job["name"] in approvals or job.get("parent") in approvals
+
+
+def read_audit_report(path):
+    df = pd.read_excel(path, sheet_name="Audit Results")
+    return df.astype(object).where(df.notna(), None)
+
+
+# --- Job Runner ---
+def run_job(command, job, approve_all=False, approvals=frozenset(), on_audit=None):
+    if job.get("targets"):
+        return run_fanout_job(command, job, approve_all, approvals)
+    result = {"job": job["name"], "command": command, "report": job["report_path"], "status": "ok"}
+    started = time.perf_counter()
+    conn = None
+    try:
+        # an unreachable database or definitions that fail to load fail this job only; the batch goes on
+        checkpoint = mapping.job_checkpoint(job)
+        conn = mapping.get_connection(job.get("target"))
+        with tracing.span("job", job=job["name"], command=command, download_type=job["download_type"]):
+            audit_df = None
+            if command in ("audit", "audit-and-apply"):
+                audit_df = mapping.audit_job(conn, job, checkpoint)
+                result["audited_rows"] = len(audit_df)
+                if "diff" in audit_df.attrs:
+                    result["diff"] = audit_df.attrs["diff"]
+                if "es_lookups" in audit_df.attrs:
+                    result["es_lookups"] = audit_df.attrs["es_lookups"]
+                if on_audit is not None:
+                    on_audit(audit_df)
+
+            if command in ("apply", "audit-and-apply"):
+                if not is_approved(job, approve_all, approvals):
+                    print(f"Job '{job['name']}' is not approved, skipping inserts/updates")
+                    result["status"] = "awaiting_approval"
+                else:
+                    if command == "apply":
+                        audit_df = read_audit_report(job["report_path"])
+                    if job.get("bundle_dir"):
+                        result.update(write_bundle(job["bundle_dir"], audit_df, job["download_type"],
+                                                   job.get("bundle_compress", False)))
+                    else:
+                        write_config = mapping.WriteConfig(**job["writes"]) if job.get("writes") else None
+                        result.update(mapping.apply_audit_results(conn, audit_df, job["download_type"], checkpoint,
+                                                                  write_config))
+                        if job.get("materialized_audit"):
+                            mapping.refresh_audit_table(conn, job["download_type"])
+
+            # rows plus this run's metrics (stage timings, write summary) go to the audit history
+            if job.get("history_db") and command != "apply":
+                history = open_history(job["history_db"], conn)
+                try:
+                    metrics = dict(result, stage_seconds=audit_df.attrs.get("stage_seconds", {}),
+                                   seconds=round(time.perf_counter() - started, 3), memory=memory.report())
+                    result["history_run"] = history.record_run(audit_df, job["download_type"], job["name"],
+                                                               metrics=metrics)
+                finally:
+                    history.close()
+
+            # the run completed, so its checkpoint is dropped and the next run of this job audits afresh; only
+            # failed runs keep theirs to resume
+            checkpoint.finish()
+        if job.get("explain"):
+            result["query_plans"] = advise(conn, analyze=job["explain"] == "analyze")
+            flagged = [entry["kind"] for entry in result["query_plans"] if entry["flagged"]]
+            if flagged:
+                print(f"Job '{job['name']}': query shapes without a supporting index: {', '.join(flagged)}")
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        print(f"Job '{job['name']}' failed: {e}")
+        result.update(status="failed", error=str(e))
+    finally:
+        if conn is not None:
+            mapping.release_connection(conn, job.get("target"))
+
+    if memory.is_enabled():
+        result["memory"] = memory.report(reset=True)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def run_fanout_job(command, job, approve_all=False, approvals=frozenset()):
+    # one run_job per target, all at once; the result lists them under "targets" and compares audited statuses
+    started = time.perf_counter()
+    frames = {}
+
+    def run_target(target_job):
+        def keep_frame(audit_df):
+            frames[target_job["target"]["name"]] = audit_df
+        # a target that fails, or cannot connect, returns a failed result; the others still run
+        return run_job(command, target_job, approve_all, approvals, on_audit=keep_frame)
+
+    results, es_stats = fanout.run_targets(job, run_target)
+    statuses = {target_result["status"] for target_result in results}
+    result = {"job": job["name"], "command": command, "report": job["report_path"],
+              "status": next((status for status in ("failed", "awaiting_approval") if status in statuses), "ok"),
+              "targets": results}
+    if es_stats["requested"]:
+        result["es_lookups"] = es_stats
+
+    if frames:
+        # only environments whose audit finished are compared
+        names = [target["name"] for target in job["targets"] if target["name"] in frames]
+        comparison = fanout.status_comparison({name: frames[name] for name in names})
+        result["comparison"] = fanout.comparison_path(job)
+        result["status_mismatches"] = fanout.write_comparison(comparison, result["comparison"])
+        print(f"Job '{job['name']}': {result['status_mismatches']} of {len(comparison)} fields differ between "
+              f"{', '.join(names)}")
+
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def run_jobs(command, jobs, approve_all=False, approvals=frozenset(), fail_fast=False):
+    results = []
+    for job in jobs:
+        targets = f", {len(job['targets'])} databases" if job.get("targets") else ""
+        print(f"\n=== {command}: {job['name']} ({job['download_type']}, {len(job['sources'])} sources{targets}) ===")
+        results.append(run_job(command, job, approve_all, approvals))
+        if fail_fast and results[-1]["status"] == "failed":
+            break
+    return results
+
+
+# --- Command Line ---
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run mapping audit jobs unattended from a JSON/YAML config.")
+    parser.add_argument("command", choices=("audit", "apply", "audit-and-apply"))
+    parser.add_argument("config", help="JSON or YAML job config")
+    parser.add_argument("--job", action="append", dest="job_names", help="only run the named job (repeatable)")
+    parser.add_argument("--approve", action="store_true", help="approve inserts/updates for every job")
+    parser.add_argument("--approval-file", help="file listing approved job names, one per line")
+    parser.add_argument("--summary", help="write a JSON summary of every job to this path")
+    parser.add_argument("--trace", help="record spans for all jobs to this JSONL file")
+    parser.add_argument("--fail-fast", action="store_true", help="stop at the first failed job")
+    parser.add_argument("--reference-cache", help="keep validated reference-data snapshots in this directory")
+    parser.add_argument("--explain", choices=("plan", "analyze"),
+                        help="add EXPLAIN summaries of every query shape to each job's result")
+    parser.add_argument("--bundle-dir", help="export inserts/updates as psql bundles in <dir>/<job> instead of "
+                                             "executing them")
+    parser.add_argument("--lean-es", action="store_true", help="send lean ES searches (one hit, filter_path, gzip)")
+    parser.add_argument("--suggest", type=int, metavar="K", help="suggest the K closest tableSystemName values for "
+                                                                  "NF fields in each report")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="record RSS and the top allocation sites of every stage in each job's result")
+    parser.add_argument("--memory-budget", type=float, metavar="MB",
+                        help="fail a job at the first stage whose peak RSS exceeds MB (implies --profile-memory)")
+    parser.add_argument("--targets", help="comma-separated db_creds.DB_TARGETS names to run every job against "
+                                          "(overrides the jobs' own targets)")
+    parser.add_argument("--definitions", help="load field definitions from a JSON/YAML/CSV file or 'db' "
+                                              "(table_field_definitions) for jobs without their own")
+    parser.add_argument("--history-db", help="append every audited run to this SQLite file (or 'postgres' for the "
+                                             "job's database)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    jobs = load_config(args.config)
+    if args.job_names:
+        jobs = [job for job in jobs if job["name"] in args.job_names]
+    approvals = load_approvals(args.approval_file) if args.approval_file else set()
+    if args.explain:
+        for job in jobs:
+            job["explain"] = args.explain
+    if args.bundle_dir:
+        for job in jobs:
+            job["bundle_dir"] = os.path.join(args.bundle_dir, job["name"])
+    if args.suggest:
+        for job in jobs:
+            job["suggest_long_names"] = args.suggest
+    if args.history_db:
+        for job in jobs:
+            job["history_db"] = args.history_db
+    if args.targets:
+        targets = fanout.normalize_targets(name.strip() for name in args.targets.split(",") if name.strip())
+        for job in jobs:
+            job["targets"] = targets
+
+    if args.lean_es:
+        mapping.lean_es = True
+    if args.reference_cache:
+        mapping.reference_cache = mapping.ReferenceCache(args.reference_cache)
+    if args.definitions:
+        mapping.definition_registry = mapping.DefinitionRegistry(args.definitions)
+    if args.trace:
+        tracing.enable(args.trace)
+    if args.profile_memory or args.memory_budget:
+        memory.enable(budget_mb=args.memory_budget)
+    try:
+        results = run_jobs(args.command, jobs, args.approve, approvals, args.fail_fast)
+    finally:
+        tracing.disable()
+        memory.disable()
+
+    for result in results:
+        print(f"{result['job']:<30} {result['status']:<18} {result['seconds']:.1f}s")
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    return 1 if any(result["status"] == "failed" for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+# --- Imports ---
+import csv
+import functools
+import json
+import os
+import re
+import threading
+import time
+
+from Automation_Scripts.mapping_automation.src import tracing
+
+
+# --- Transformation Templates ---
+# A definition proposes ES long names (comma-separated `long_name`) and a transformation that uses them; once the ES
+# check has found each name's tableSystemName, the names in the transformation are replaced by those. A template
+# splits the transformation at the proposed names once, longest name first, so rendering it is a join and a name
+# that is part of another ("Fld1" in "Fld10") or of a replacement is never replaced twice.
+
+class TransformationTemplate:
+    def __init__(self, transformation, names):
+        self.transformation = transformation
+        self.names = tuple(name for name in dict.fromkeys(names) if name)
+        if self.names:
+            pattern = "|".join(re.escape(name) for name in sorted(self.names, key=len, reverse=True))
+            self.parts = re.split(f"({pattern})", transformation)
+        else:
+            self.parts = [transformation]
+        used = set(self.parts[1::2])
+        self.missing = [name for name in self.names if name not in used]
+
+    def render(self, replacements):
+        parts = list(self.parts)
+        for idx in range(1, len(parts), 2):
+            parts[idx] = replacements.get(parts[idx], parts[idx])
+        return "".join(parts)
+
+
+@functools.lru_cache(maxsize=16384)
+def compile_template(transformation, names):
+    # names: tuple of proposed names; registries compile every definition on load, so audits find them here
+    return TransformationTemplate(transformation, names)
+
+
+def proposed_names(long_name):
+    return tuple(dict.fromkeys(name.strip() for name in long_name.split(",")))
+
+
+# --- Loading ---
+# Definitions come from a JSON, YAML (PyYAML) or CSV file, or from a database table. A file holds either the
+# field_mapping_definitions shape ({field: {long_name, transformation}}, for every download type) or a list of
+# records {download_type, field, long_name, transformation}; a record without download_type applies to every type
+# unless the type has its own. CSV files have those four columns. The table is read with DEFINITIONS_QUERY and
+# checked for changes with DEFINITIONS_SIGNATURE.
+
+ALL_TYPES = "*"
+DB_SOURCE = "db"
+DEFINITIONS_TABLE = "table_field_definitions"
+DEFINITIONS_QUERY = """  select download_type, field, long_name, transformation
+                         from {table};"""
+DEFINITIONS_SIGNATURE = """  select count(*), max(last_update_ts)
+                             from {table};"""
+MAX_REPORTED_ERRORS = 20
+
+
+class DefinitionError(ValueError):
+    pass
+
+
+def load_file(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            return list(csv.DictReader(f))
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError(f"PyYAML is required to read '{path}'; install it or use JSON or CSV definitions")
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+def load_table(cursor, table=DEFINITIONS_TABLE):
+    tracing.execute(cursor, DEFINITIONS_QUERY.format(table=table), "definitions")
+    return [dict(zip(("download_type", "field", "long_name", "transformation"), row)) for row in cursor.fetchall()]
+
+
+def records_from(data):
+    if isinstance(data, dict):
+        return [dict(entry, field=field) if isinstance(entry, dict) else entry for field, entry in data.items()]
+    return list(data or [])
+
+
+# --- Validation ---
+def validate(records):
+    # {(download_type, field): {"long_name", "transformation"}}; every problem is collected before raising
+    index, errors = {}, []
+    for idx, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append(f"#{idx}: {record!r} is not a definition")
+            continue
+        download_type = str(record.get("download_type") or ALL_TYPES).strip()
+        field = str(record.get("field") or "").strip()
+        long_name = str(record.get("long_name") or "").strip()
+        transformation = str(record.get("transformation") or "").strip()
+        label = f"#{idx} ({download_type}, {field or '?'})"
+
+        if not field or not long_name or not transformation:
+            missing = [key for key, value in (("field", field), ("long_name", long_name),
+                                              ("transformation", transformation)) if not value]
+            errors.append(f"{label}: missing {', '.join(missing)}")
+            continue
+        if (download_type, field) in index:
+            errors.append(f"{label}: defined more than once")
+            continue
+        # transformations are interpolated into '...' literals, so a quote must already be written as ''
+        if "'" in transformation.replace("''", ""):
+            errors.append(f"{label}: unescaped quote in transformation (write ' as '')")
+        template = compile_template(transformation, proposed_names(long_name))
+        if template.missing:
+            errors.append(f"{label}: transformation does not use {', '.join(template.missing)}")
+        index[(download_type, field)] = {"long_name": long_name, "transformation": transformation}
+
+    if errors:
+        shown = errors[:MAX_REPORTED_ERRORS]
+        more = f" (and {len(errors) - len(shown)} more)" if len(errors) > len(shown) else ""
+        raise DefinitionError(f"{len(errors)} invalid definitions{more}: " + "; ".join(shown))
+    return index
+
+
+# --- Registry ---
+# Indexes validated definitions by (download_type, canonical field). refresh() reloads them when the file's mtime and
+# size or the table's row count and max(last_update_ts) changed; the service calls it before every job, so edited
+# definitions apply to the next job without a restart. A reload that fails validation keeps the loaded definitions
+# and is reported in stats(). The per-type dicts handed to audits are built once per load and never mutated.
+
+class DefinitionRegistry:
+    def __init__(self, source, connection=None, table=DEFINITIONS_TABLE):
+        # source: a file path, or "db" to read `table` through connection() (a context manager yielding a
+        # connection; by default one from main's pool)
+        self.source = source
+        self.connection = connection
+        self.table = table
+        self.version = 0
+        self.loaded_at = None
+        self.last_error = None
+        self._signature = None
+        self._index = {}
+        self._by_type = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # one reload at a time when several jobs start together
+        self.refresh()
+
+    def _connect(self):
+        if self.connection is not None:
+            return self.connection()
+        from Automation_Scripts.mapping_automation.src.main import pooled_connection
+        return pooled_connection()
+
+    def _read(self, with_rows):
+        # (signature, records or None)
+        if self.source != DB_SOURCE:
+            stat = os.stat(self.source)
+            return (stat.st_mtime_ns, stat.st_size), records_from(load_file(self.source)) if with_rows else None
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            tracing.execute(cursor, DEFINITIONS_SIGNATURE.format(table=self.table), "definitions_signature")
+            signature = tuple(str(value) if value is not None else None for value in cursor.fetchone())
+            records = load_table(cursor, self.table) if with_rows else None
+            cursor.close()
+        return signature, records
+
+    def refresh(self):
+        # True when the definitions were (re)loaded
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self):
+        # Only the first load raises. Later a failed read keeps the loaded definitions: the file can be missing for
+        # a moment while it is replaced, the table briefly unreachable, or an edit invalid.
+        try:
+            signature, _ = self._read(with_rows=False)
+        except Exception as e:
+            if self._signature is None:
+                raise
+            self.last_error = str(e)
+            print(f"Definitions in '{self.source}' could not be checked for changes: {e}")
+            return False
+        if signature == self._signature:
+            return False
+        try:
+            signature, records = self._read(with_rows=True)
+            index = validate(records)
+        except Exception as e:
+            if self._signature is None:
+                raise
+            self._signature = signature  # reported once; the next change is tried again
+            self.last_error = str(e)
+            print(f"Definitions in '{self.source}' were not reloaded: {e}")
+            return False
+
+        by_type = {}
+        for (download_type, field), entry in index.items():
+            by_type.setdefault(download_type, {})[field] = entry
+        defaults = by_type.get(ALL_TYPES, {})
+        with self._lock:
+            self._index = index
+            self._by_type = {download_type: dict(defaults, **entries) for download_type, entries in by_type.items()}
+            self._signature = signature
+            self.version += 1
+            self.loaded_at = time.time()
+            self.last_error = None
+        print(f"Loaded {len(index)} field definitions from '{self.source}' (version {self.version})")
+        return True
+
+    def for_download_type(self, download_type):
+        # {field: {"long_name", "transformation"}}, the shape of field_mapping_definitions
+        with self._lock:
+            return self._by_type.get(download_type, self._by_type.get(ALL_TYPES, {}))
+
+    def get(self, download_type, field):
+        return self.for_download_type(download_type).get(field)
+
+    def __len__(self):
+        return len(self._index)
+
+    def stats(self):
+        return {"source": self.source, "definitions": len(self._index), "version": self.version,
+                "download_types": sorted(self._by_type), "last_error": self.last_error}
@@ -0,0 +1,131 @@
+# --- Imports ---
+import hashlib
+import json
+import os
+import shutil
+
+from Automation_Scripts.mapping_automation.src import tracing
+from Automation_Scripts.mapping_automation.src.jsonfile import json_default, read_json, write_json
+
+
+# --- Run-to-Run Diff ---
+# Every audited row is hashed by key (Source, Dataset ID, Class, Field ID) and by content. A run's rows are
+# streamed into a snapshot of hash partitions ({state_dir}/{name}/part-NN.jsonl, one [key, content_hash, values]
+# line per row), so comparing two runs holds one partition in memory at a time and is linear in the row count.
+# Only added, removed and changed rows are written to the delta report.
+
+KEY_COLUMNS = ('Source', 'Dataset ID', 'Class', 'Field ID')
+DELTA_HEADERS = ['Change', 'Changed Columns']
+
+
+def _digest(payload):
+    return hashlib.blake2b(json.dumps(payload, default=json_default).encode(), digest_size=8).hexdigest()
+
+
+class Snapshot:
+    def __init__(self, path, partitions=16):
+        self.path = path
+        self.partitions = partitions
+
+    def _part(self, idx):
+        return os.path.join(self.path, f"part-{idx:02d}.jsonl")
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.path, "meta.json"))
+
+    def meta(self):
+        return read_json(os.path.join(self.path, "meta.json"))
+
+    def write(self, frames):
+        # frames: DataFrames (or chunks of one run) sharing the same columns
+        os.makedirs(self.path, exist_ok=True)
+        files = [open(self._part(idx), "w", encoding="utf-8") for idx in range(self.partitions)]
+        columns, rows = None, 0
+        try:
+            for df in frames:
+                columns = list(df.columns)
+                key_idx = [columns.index(column) for column in KEY_COLUMNS]
+                for values in df.itertuples(index=False, name=None):
+                    key = [values[idx] for idx in key_idx]
+                    key_hash = _digest(key)
+                    line = json.dumps([key, _digest(values), values], default=json_default)
+                    files[int(key_hash, 16) % self.partitions].write(line + "\n")
+                    rows += 1
+        finally:
+            for f in files:
+                f.close()
+        # meta.json marks the snapshot as complete, so it is written last
+        write_json(os.path.join(self.path, "meta.json"),
+                   {"columns": columns, "rows": rows, "partitions": self.partitions})
+        return rows
+
+    def read(self, idx):
+        with open(self._part(idx), encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def _same(a, b):
+    return a == b or (a != a and b != b)  # NaN cells compare equal
+
+
+def diff_snapshots(previous, current):
+    # Yields (change, changed_columns, values) in partition order, with values laid out in the current columns
+    columns = current.meta()["columns"]
+    previous_columns = previous.meta()["columns"]
+    layout = [previous_columns.index(column) if column in previous_columns else None for column in columns]
+
+    def relayout(values):
+        return [values[idx] if idx is not None else None for idx in layout]
+
+    for idx in range(current.partitions):
+        before = {tuple(key): (content_hash, values) for key, content_hash, values in previous.read(idx)}
+        for key, content_hash, values in current.read(idx):
+            old = before.pop(tuple(key), None)
+            if old is None:
+                yield "added", [], values
+            elif old[0] != content_hash:
+                changed = [column for column, a, b in zip(columns, relayout(old[1]), values) if not _same(a, b)]
+                yield "changed", changed, values
+        for _, values in before.values():
+            yield "removed", [], relayout(values)
+
+
+def audit_diff(frames, state_dir, name, delta_path=None, partitions=16):
+    # Compares this run's rows with the stored previous run, writes the delta report and stores this run as the
+    # next baseline. Returns {"added": n, "removed": n, "changed": n, "unchanged": n, "delta": path or None}.
+    frames = [frames] if hasattr(frames, "itertuples") else frames
+    baseline_path = os.path.join(state_dir, name)
+    previous = Snapshot(baseline_path, partitions)
+    if not previous.exists() or previous.meta()["partitions"] != partitions:
+        previous = None
+    current = Snapshot(f"{baseline_path}.new", partitions)
+    shutil.rmtree(current.path, ignore_errors=True)
+
+    with tracing.span("diff.snapshot", run=name):
+        rows = current.write(frames)
+    columns = current.meta()["columns"] or []
+
+    counts = {"added": 0, "removed": 0, "changed": 0, "unchanged": rows, "delta": None}
+    if previous is None:
+        print(f"Diff: no previous run stored for '{name}', this run becomes the baseline")
+    else:
+        delta = []
+        with tracing.span("diff.compare", run=name, rows=rows):
+            for change, changed_columns, values in diff_snapshots(previous, current):
+                counts[change] += 1
+                delta.append([change, ", ".join(changed_columns)] + list(values))
+        counts["unchanged"] = rows - counts["added"] - counts["changed"]
+        print(f"Diff vs previous run: {counts['added']} added, {counts['removed']} removed, "
+              f"{counts['changed']} changed, {counts['unchanged']} unchanged")
+
+        if delta and delta_path:
+            key_idx = [len(DELTA_HEADERS) + columns.index(column) for column in KEY_COLUMNS]
+            delta.sort(key=lambda row: tuple(str(row[idx]) for idx in key_idx))
+            from Automation_Scripts.mapping_automation.src.main import write_updated_audit_to_excel
+            write_updated_audit_to_excel(DELTA_HEADERS + columns, delta, delta_path)
+            counts["delta"] = delta_path
+
+    shutil.rmtree(baseline_path, ignore_errors=True)
+    os.replace(current.path, baseline_path)
+    return counts
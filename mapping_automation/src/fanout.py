@@ -0,0 +1,102 @@
+# --- Imports ---
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from Automation_Scripts.mapping_automation.src import main as mapping
+from Automation_Scripts.mapping_automation.src.singleflight import SingleFlight
+
+pd = mapping.pd
+
+
+# --- Database Fan-Out ---
+# The same mapping schema runs in several regional databases. A job with `targets` is run once per target, all
+# targets concurrently, each on a connection from that target's own pool. A target is a name from
+# db_creds.DB_TARGETS or a dict with a name and any of database/host/user/password/port; keys it leaves out come
+# from DB_TARGETS and then from the default credentials.
+#
+# Every target gets its own report and state directories, and its name in results and the audit history is
+# "<job>@<target>". All targets share one single-flight group, so an ES lookup needed by several environments runs
+# once and the fan-out costs about as much as its slowest environment. The audited statuses are compared in
+# "<report>_comparison.xlsx", one status column per target.
+
+STATE_DIRS = ("incremental_state_dir", "checkpoint_dir", "diff_state_dir", "bundle_dir")
+COMPARISON_KEYS = ['Source', 'Protocol', 'Provider', 'Class', 'Download Type', 'Canonical Field Name']
+MISSING_STATUS = 'Missing'
+
+
+def normalize_targets(targets):
+    normalized = []
+    for target in targets:
+        target = {"name": target} if isinstance(target, str) else dict(target)
+        if not target.get("name"):
+            raise ValueError(f"Database target {target} has no name")
+        normalized.append(target)
+    names = [target["name"] for target in normalized]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Database targets are listed more than once: {', '.join(duplicates)}")
+    return normalized
+
+
+def target_job(job, target):
+    # the job as run against one target; environments never share a report, checkpoint or baseline
+    root, ext = os.path.splitext(job["report_path"])
+    scoped = {key: value for key, value in job.items() if key != "targets"}
+    scoped.update(name=f"{job['name']}@{target['name']}", parent=job["name"], target=target,
+                  report_path=f"{root}_{target['name']}{ext}")
+    for key in STATE_DIRS:
+        if job.get(key):
+            scoped[key] = os.path.join(job[key], target["name"])
+    return scoped
+
+
+def comparison_path(job):
+    root, ext = os.path.splitext(job["report_path"])
+    return f"{root}_comparison{ext}"
+
+
+def _run_target(run_one, scoped):
+    mapping.db_target.set(scoped["target"]["name"])
+    return run_one(scoped)
+
+
+def run_targets(job, run_one):
+    # run_one(target job) for every target at once; returns the results in target order and the shared ES stats
+    targets = normalize_targets(job["targets"])
+    lookups = SingleFlight(keep=lambda result: "error" not in result)
+    token = mapping.es_lookups.set(lookups)
+    try:
+        # one copy of this context per target: each carries the shared group and its own db_target
+        contexts = [contextvars.copy_context() for _ in targets]
+    finally:
+        mapping.es_lookups.reset(token)
+
+    with ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix="target") as executor:
+        futures = [executor.submit(context.run, _run_target, run_one, target_job(job, target))
+                   for context, target in zip(contexts, targets)]
+        results = [future.result() for future in futures]
+    return results, lookups.stats()
+
+
+# --- Status Comparison ---
+def status_comparison(frames):
+    # frames: {target name: audited frame}; one row per (source, class, canonical field), one status column per
+    # target ('Missing' where a target has no such row) and 'Consistent' = Y when every target agrees.
+    # Dataset and field ids are assigned per database, so rows are matched on names.
+    comparison = None
+    for name, audit_df in frames.items():
+        statuses = (audit_df[COMPARISON_KEYS + ['Mapping Status']]
+                    .drop_duplicates(COMPARISON_KEYS)
+                    .rename(columns={'Mapping Status': name}))
+        comparison = statuses if comparison is None else comparison.merge(statuses, on=COMPARISON_KEYS, how="outer")
+
+    names = list(frames)
+    comparison[names] = comparison[names].fillna(MISSING_STATUS)
+    comparison['Consistent'] = (comparison[names].nunique(axis=1) == 1).map({True: 'Y', False: 'N'})
+    return comparison.sort_values(COMPARISON_KEYS, ignore_index=True)
+
+
+def write_comparison(comparison, path):
+    mapping.write_updated_audit_to_excel(list(comparison.columns), comparison.values.tolist(), path)
+    return int((comparison['Consistent'] == 'N').sum())
@@ -0,0 +1,169 @@
+# --- Imports ---
+import datetime
+import io
+import json
+import sqlite3
+import uuid
+
+from Automation_Scripts.mapping_automation.src import tracing
+
+
+# --- Audit History ---
+# Every audit run is appended to three tables: audit_runs (one row per run with its metrics), audit_history (one
+# row per audited dataset/field pair) and audit_source_summary (per-source counts, written at load time so
+# coverage trends never scan the row table). Rows are bulk loaded: COPY FROM STDIN on Postgres, one executemany
+# in a single transaction on SQLite.
+#
+# history_db is either a path to a local SQLite file or "postgres", which stores history next to the mapping
+# tables on the job's connection.
+
+HISTORY_DDL = [
+    """CREATE TABLE IF NOT EXISTS audit_runs (
+        run_id TEXT PRIMARY KEY,
+        job TEXT,
+        download_type TEXT NOT NULL,
+        recorded_ts TIMESTAMP NOT NULL,
+        row_count INTEGER,
+        metrics TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS audit_history (
+        run_id TEXT NOT NULL,
+        recorded_ts TIMESTAMP NOT NULL,
+        download_type TEXT NOT NULL,
+        source TEXT,
+        dataset_id INTEGER,
+        dataset_name TEXT,
+        field_id INTEGER,
+        field_name TEXT,
+        mapping_status TEXT,
+        es_pass TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS audit_source_summary (
+        run_id TEXT NOT NULL,
+        recorded_ts TIMESTAMP NOT NULL,
+        download_type TEXT NOT NULL,
+        source TEXT NOT NULL,
+        total INTEGER,
+        mapped INTEGER,
+        deactivated INTEGER,
+        not_mapped INTEGER,
+        es_pass INTEGER
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_audit_runs_type_ts ON audit_runs (download_type, recorded_ts)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_history_run ON audit_history (run_id)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_history_pair_ts ON audit_history (dataset_id, field_id, recorded_ts)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_source_summary_ts ON audit_source_summary (download_type, source, recorded_ts)",
+]
+
+HISTORY_COLUMNS = ("run_id", "recorded_ts", "download_type", "source", "dataset_id", "dataset_name", "field_id",
+                   "field_name", "mapping_status", "es_pass")
+ROW_COLUMNS = ('Source', 'Dataset ID', 'Class', 'Field ID', 'Canonical Field Name', 'Mapping Status', 'es_Pass')
+
+
+def new_run_id(name):
+    return f"{name}-{datetime.datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+def _plain(value):
+    # numpy scalars and NaN from the audit DataFrame
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class HistoryStore:
+    def __init__(self, conn, owned=False):
+        self.conn = conn
+        self.owned = owned  # a local SQLite file is closed with the store; the job's connection is not
+        self.postgres = hasattr(conn, "server_version")
+        cursor = conn.cursor()
+        for stmt in HISTORY_DDL:
+            tracing.execute(cursor, stmt, "history_ddl")
+        conn.commit()
+
+    def close(self):
+        if self.owned:
+            self.conn.close()
+
+    def _params(self, count):
+        return ", ".join(["%s" if self.postgres else "?"] * count)
+
+    def record_run(self, audit_df, download_type, job=None, run_id=None, metrics=None, recorded_ts=None):
+        # recorded_ts defaults to now; pass one to backfill history from older reports
+        run_id = run_id or new_run_id(job or download_type)
+        recorded_ts = recorded_ts or datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+        rows = [(run_id, recorded_ts, download_type) + tuple(_plain(value) for value in values)
+                for values in audit_df[list(ROW_COLUMNS)].itertuples(index=False, name=None)]
+
+        summary = {}
+        for row in rows:
+            counts = summary.setdefault(row[3], [0, 0, 0, 0, 0])
+            counts[0] += 1
+            counts[1] += row[8] == 'Mapped'
+            counts[2] += row[8] == 'Deactivated'
+            counts[3] += row[8] == 'Not Mapped'
+            counts[4] += row[9] == 'Y'
+
+        cursor = self.conn.cursor()
+        with tracing.span("history.record", run_id=run_id, rows=len(rows)):
+            cursor.execute(f"INSERT INTO audit_runs (run_id, job, download_type, recorded_ts, row_count, metrics) "
+                           f"VALUES ({self._params(6)})",
+                           (run_id, job, download_type, recorded_ts, len(rows), json.dumps(metrics or {}, default=str)))
+            if self.postgres:
+                from Automation_Scripts.mapping_automation.src.bundle import copy_line  # bundle imports main
+                buffer = io.StringIO("".join(copy_line(row) for row in rows))
+                cursor.copy_expert(f"COPY audit_history ({', '.join(HISTORY_COLUMNS)}) FROM STDIN", buffer)
+            else:
+                cursor.executemany(f"INSERT INTO audit_history ({', '.join(HISTORY_COLUMNS)}) "
+                                   f"VALUES ({self._params(len(HISTORY_COLUMNS))})", rows)
+            cursor.executemany(f"INSERT INTO audit_source_summary (run_id, recorded_ts, download_type, source, total, "
+                               f"mapped, deactivated, not_mapped, es_pass) VALUES ({self._params(9)})",
+                               [(run_id, recorded_ts, download_type, source, *counts)
+                                for source, counts in summary.items()])
+        self.conn.commit()
+        print(f"Audit history: stored run '{run_id}' ({len(rows)} rows)")
+        return run_id
+
+    # trend queries
+    def coverage_by_source(self, download_type, source=None, since=None):
+        # [(recorded_ts, source, total, mapped, coverage)] ordered by time; reads only audit_source_summary
+        qry = f"""  select recorded_ts, source, total, mapped
+                    from audit_source_summary
+                    where download_type = {self._params(1)}"""
+        params = [download_type]
+        if source:
+            qry += f" and source = {self._params(1)}"
+            params.append(source)
+        if since:
+            qry += f" and recorded_ts >= {self._params(1)}"
+            params.append(since)
+        cursor = self.conn.cursor()
+        cursor.execute(qry + " order by recorded_ts, source", params)
+        return [(str(ts), src, total, mapped, round(mapped / total, 4) if total else 0.0)
+                for ts, src, total, mapped in cursor.fetchall()]
+
+    def status_history(self, dataset_id, field_id):
+        # [(recorded_ts, run_id, mapping_status, es_pass)] for one dataset/field pair
+        cursor = self.conn.cursor()
+        cursor.execute(f"""  select recorded_ts, run_id, mapping_status, es_pass
+                             from audit_history
+                             where dataset_id = {self._params(1)} and field_id = {self._params(1)}
+                             order by recorded_ts""", (dataset_id, field_id))
+        return [(str(row[0]),) + tuple(row[1:]) for row in cursor.fetchall()]
+
+    def runs(self, download_type, limit=20):
+        cursor = self.conn.cursor()
+        cursor.execute(f"""  select run_id, job, recorded_ts, row_count, metrics
+                             from audit_runs
+                             where download_type = {self._params(1)}
+                             order by recorded_ts desc limit {int(limit)}""", (download_type,))
+        return [(run_id, job, str(ts), rows, json.loads(metrics or "{}"))
+                for run_id, job, ts, rows, metrics in cursor.fetchall()]
+
+
+def open_history(history_db, conn=None):
+    if history_db == "postgres":
+        return HistoryStore(conn)
+    return HistoryStore(sqlite3.connect(history_db, check_same_thread=False), owned=True)
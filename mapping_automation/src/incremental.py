@@ -0,0 +1,219 @@
+# --- Imports ---
+import datetime
+import os
+
+from Automation_Scripts.mapping_automation.src import tracing
+from Automation_Scripts.mapping_automation.src.jsonfile import read_json, write_json
+from Automation_Scripts.mapping_automation.src.lazy import LazyModule
+
+pd = LazyModule("pandas")
+
+
+# --- Watermarks & Stored Results ---
+# State lives in one directory: watermarks.json holds the last_update_ts high-water mark per
+# (download_type, source), and audit_{download_type}.json holds the previous run's audited rows together with the
+# fingerprint of the definitions and ES endpoint they were audited with. The watermarks only track database changes,
+# so stored rows from another fingerprint are never reused. Deleted rows leave no last_update_ts behind, so the
+# results file also keeps the row count of every table the audit reads; see rows_deleted().
+
+def _ts_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat(sep=" ")
+
+
+class IncrementalState:
+    def __init__(self, state_dir, download_type):
+        self.state_dir = state_dir
+        self.download_type = download_type
+        os.makedirs(state_dir, exist_ok=True)
+        self._watermarks_path = os.path.join(state_dir, "watermarks.json")
+        self._results_path = os.path.join(state_dir, f"audit_{download_type}.json")
+        self.watermarks = {}
+        self.row_counts = {}
+        self.counted_at = None
+        if os.path.exists(self._watermarks_path):
+            self.watermarks = read_json(self._watermarks_path)
+
+    def watermark(self, source):
+        return self.watermarks.get(f"{self.download_type}|{source}", {}).get("watermark")
+
+    def set_watermark(self, source, watermark):
+        self.watermarks[f"{self.download_type}|{source}"] = {
+            "watermark": _ts_text(watermark),
+            "updated": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        }
+
+    def load_results(self, fingerprint=None):
+        # None when nothing is stored or the stored rows were audited under another fingerprint
+        if not os.path.exists(self._results_path):
+            return None
+        stored = read_json(self._results_path)
+        if stored.get("fingerprint") != fingerprint:
+            print(f"Incremental state for '{self.download_type}' was audited with other definitions or another "
+                  f"ES endpoint, re-auditing everything")
+            return None
+        self.row_counts = stored.get("row_counts", {})
+        self.counted_at = stored.get("counted_at")
+        return pd.DataFrame(stored["data"], columns=stored["columns"])
+
+    def save(self, results_df, fingerprint=None, row_counts=None, counted_at=None):
+        write_json(self._results_path, {"fingerprint": fingerprint, "row_counts": row_counts or {},
+                                         "counted_at": _ts_text(counted_at), "columns": list(results_df.columns),
+                                         "data": results_df.astype(object).values.tolist()})
+        write_json(self._watermarks_path, self.watermarks)
+
+
+# --- Change Detection ---
+def get_high_water_mark(cursor, dl_type):
+    qry = f"""  select max(ts) from (
+                    select max(last_update_ts) as ts from table_mapping where download_type = '{dl_type}'
+                    union all
+                    select max(last_update_ts) from table_dataset_config where download_type = '{dl_type}'
+                    union all
+                    select max(last_update_ts) from table_canonical_fields where download_type = '{dl_type}'
+                    union all
+                    select max(last_update_ts) from table_source_info
+                ) wm;"""
+
+    tracing.execute(cursor, qry, "high_water_mark", download_type=dl_type)
+    result = cursor.fetchone()
+    return _ts_text(result[0]) if result else None
+
+
+def get_row_counts(cursor, dl_type, since=None):
+    # {table: (rows, rows created after since)}; only table_mapping and table_origin_field have a create_ts
+    since = since or '9999-12-31 23:59:59'
+    qry = f"""  select 'table_mapping', count(*), sum(case when create_ts > '{since}' then 1 else 0 end)
+                    from table_mapping where download_type = '{dl_type}'
+                    union all
+                    select 'table_origin_field', count(*), sum(case when o.create_ts > '{since}' then 1 else 0 end)
+                    from table_origin_field o join table_mapping m on m.id = o.mapping_id
+                    where m.download_type = '{dl_type}'
+                    union all
+                    select 'table_dataset_config', count(*), 0
+                    from table_dataset_config where download_type = '{dl_type}'
+                    union all
+                    select 'table_canonical_fields', count(*), 0
+                    from table_canonical_fields where download_type = '{dl_type}'
+                    union all
+                    select 'table_source_info', count(*), 0 from table_source_info;"""
+
+    tracing.execute(cursor, qry, "row_counts", download_type=dl_type)
+    return {table: (int(rows), int(created or 0)) for table, rows, created in cursor.fetchall()}
+
+
+def rows_deleted(state, row_counts):
+    # Without deletions a table holds at least its stored rows plus the rows created since they were counted.
+    # Tables without a create_ts only show deletions that outnumber the inserts.
+    for table, (rows, created) in row_counts.items():
+        stored = state.row_counts.get(table)
+        if stored is None or rows < stored + created:
+            return True
+    return False
+
+
+def get_changed_pairs(cursor, state, source_info, field_info, dl_type):
+    # Pairs whose mapping, dataset or canonical field row changed after the owning source's watermark.
+    # Sources without a watermark are left out here; their pairs are missing from the stored results anyway.
+    watermarks = {row[0]: state.watermark(row[0]) for row in source_info}
+    known = [wm for wm in watermarks.values() if wm]
+    if not known:
+        return set()
+    since = min(known)
+    srcs_str = "', '".join(sorted(source for source, wm in watermarks.items() if wm))
+    field_ids = {field_id for field_id, _ in field_info}
+    datasets_by_source = {}
+    for row in source_info:
+        datasets_by_source.setdefault(row[0], []).append(row[3])
+
+    changed = set()
+
+    mapping_qry = f"""  select m.dataset_id, m.field_id, info.source, m.last_update_ts
+                        from table_mapping m
+                                join table_source_info info on info.id = m.dataset_id
+                        where m.download_type = '{dl_type}'
+                                and info.source in ('{srcs_str}')
+                                and m.last_update_ts > '{since}';"""
+    tracing.execute(cursor, mapping_qry, "changed_mappings", download_type=dl_type)
+    for dataset_id, field_id, source, ts in cursor.fetchall():
+        if field_id in field_ids and _ts_text(ts) > watermarks[source]:
+            changed.add((dataset_id, field_id))
+
+    dataset_qry = f"""  select cls.dataset_id, info.source, cls.last_update_ts, info.last_update_ts
+                        from table_dataset_config cls
+                                join table_source_info info on info.id = cls.dataset_id
+                        where cls.download_type = '{dl_type}'
+                                and info.source in ('{srcs_str}')
+                                and (cls.last_update_ts > '{since}' or info.last_update_ts > '{since}');"""
+    tracing.execute(cursor, dataset_qry, "changed_datasets", download_type=dl_type)
+    for dataset_id, source, cls_ts, info_ts in cursor.fetchall():
+        latest = max(_ts_text(ts) for ts in (cls_ts, info_ts) if ts is not None)
+        if latest > watermarks[source]:
+            changed.update((dataset_id, field_id) for field_id in field_ids)
+
+    field_qry = f"""  select id, last_update_ts
+                      from table_canonical_fields
+                      where download_type = '{dl_type}'
+                              and last_update_ts > '{since}';"""
+    tracing.execute(cursor, field_qry, "changed_fields", download_type=dl_type)
+    for field_id, ts in cursor.fetchall():
+        if field_id not in field_ids:
+            continue
+        for source, wm in watermarks.items():
+            if wm and _ts_text(ts) > wm:
+                changed.update((dataset_id, field_id) for dataset_id in datasets_by_source[source])
+
+    return changed
+
+
+# --- Incremental Audit ---
+def incremental_audit(cursor, source_info, field_info, dl_type, state_dir, audit_fn, full_refresh=False,
+                      fingerprint=None):
+    # audit_fn(master_list) runs the audit/ES/transformation stages and returns the audited DataFrame;
+    # fingerprint identifies the definitions and ES endpoint, and a different one forces a full re-audit
+    state = IncrementalState(state_dir, dl_type)
+    high_water = get_high_water_mark(cursor, dl_type)
+    master_list = [l1 + l2 for l1 in source_info for l2 in field_info]
+
+    previous = None if full_refresh else state.load_results(fingerprint)
+    row_counts = get_row_counts(cursor, dl_type, state.counted_at)
+    if previous is not None and not previous.empty and rows_deleted(state, row_counts):
+        print(f"Incremental audit: rows were deleted since the last '{dl_type}' run, re-auditing everything")
+        previous = None
+    if previous is None or previous.empty:
+        pending, reused = master_list, None
+    else:
+        changed = get_changed_pairs(cursor, state, source_info, field_info, dl_type)
+        previous_keys = list(zip(previous['Dataset ID'], previous['Field ID']))
+        known = set(previous_keys)
+        pending = [row for row in master_list if (row[3], row[7]) in changed or (row[3], row[7]) not in known]
+        pending_keys = {(row[3], row[7]) for row in pending}
+        current_keys = {(row[3], row[7]) for row in master_list}
+        reused = previous[[key in current_keys and key not in pending_keys for key in previous_keys]]
+
+    print(f"Incremental audit: re-auditing {len(pending)} of {len(master_list)} dataset/field pairs")
+    audited = audit_fn(pending) if pending else None
+
+    frames = [frame for frame in (reused, audited) if frame is not None and not frame.empty]
+    results = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if not results.empty:
+        position = {(row[3], row[7]): idx for idx, row in enumerate(master_list)}
+        order = [position[key] for key in zip(results['Dataset ID'], results['Field ID'])]
+        results = results.iloc[sorted(range(len(order)), key=order.__getitem__)].reset_index(drop=True)
+
+    # keep stored rows of sources that were not part of this run
+    stored = results
+    run_sources = {row[0] for row in source_info}
+    if previous is not None and not previous.empty:
+        others = previous[~previous['Source'].isin(run_sources)]
+        if not others.empty:
+            stored = pd.concat([others, results], ignore_index=True)
+
+    if high_water:
+        for source in run_sources:
+            state.set_watermark(source, high_water)
+    state.save(stored, fingerprint, row_counts={table: rows for table, (rows, _) in row_counts.items()},
+               counted_at=high_water)
+
+    return results
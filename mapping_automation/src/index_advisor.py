@@ -0,0 +1,223 @@
+# --- Imports ---
+import argparse
+import json
+import sys
+
+from Automation_Scripts.mapping_automation.src import tracing
+
+
+# --- Query Shapes ---
+# One representative of every lookup the tool issues, with the composite index that serves it. Sample values are
+# taken from existing rows so the planner sees realistic selectivity.
+
+QUERY_SHAPES = [
+    {"kind": "src_info", "table": "table_dataset_config", "columns": ("download_type", "dataset_id"),
+     "aliases": {"cls": "table_dataset_config", "info": "table_source_info"},
+     "sql": """select info.source, cls.dataset_id, cls.dataset_name from table_dataset_config cls
+               join table_source_info info on info.id = cls.dataset_id
+               where info.source in ('{source}') and cls.download_type = '{download_type}'"""},
+    {"kind": "field_info", "table": "table_canonical_fields", "columns": ("download_type", "name"),
+     "sql": """select id, name from table_canonical_fields
+               where download_type = '{download_type}' and name in ('{field_name}')"""},
+    {"kind": "mapping_audit", "table": "table_mapping",
+     "columns": ("field_id", "dataset_id", "dataset_name", "download_type"),
+     "sql": """select is_active from table_mapping where field_id = {field_id} and dataset_id = {dataset_id}
+               and dataset_name = '{dataset_name}' and download_type = '{download_type}'"""},
+    {"kind": "canonical_insert_check", "table": "table_mapping", "columns": ("field_id", "dataset_id"),
+     "sql": """SELECT id, field_id, dataset_id, dataset_name, download_type FROM table_mapping
+               WHERE (field_id, dataset_id) IN (VALUES ({field_id}, {dataset_id}))"""},
+    {"kind": "origin_mapping_lookup", "table": "table_mapping", "columns": ("field_id", "dataset_id"),
+     "sql": """SELECT id, dataset_name FROM table_mapping WHERE field_id = {field_id} AND dataset_id = {dataset_id}"""},
+    {"kind": "origin_field_prefetch", "table": "table_origin_field",
+     "columns": ("mapping_id", "source_field", "dataset_id"),
+     "sql": """SELECT mapping_id, source_field, dataset_id FROM table_origin_field
+               WHERE (mapping_id, source_field, dataset_id)
+               IN (VALUES ({mapping_id}, '{source_field}', {dataset_id}))"""},
+]
+
+SAMPLE_QUERIES = [
+    ("select field_id, dataset_id, dataset_name, download_type from table_mapping limit 1",
+     ("field_id", "dataset_id", "dataset_name", "download_type")),
+    ("select mapping_id, source_field from table_origin_field limit 1", ("mapping_id", "source_field")),
+    ("select source from table_source_info limit 1", ("source",)),
+    ("select name from table_canonical_fields limit 1", ("field_name",)),
+]
+
+DEFAULT_SAMPLE = {"field_id": 0, "dataset_id": 0, "dataset_name": "", "download_type": "", "mapping_id": 0,
+                  "source_field": "", "source": "", "field_name": ""}
+
+
+def dialect(conn):
+    # psycopg2 connections expose server_version; anything else is treated as sqlite (the local harness)
+    return "postgres" if hasattr(conn, "server_version") else "sqlite"
+
+
+def sample_values(cursor):
+    values = dict(DEFAULT_SAMPLE)
+    for qry, names in SAMPLE_QUERIES:
+        tracing.execute(cursor, qry, "advisor_sample")
+        row = cursor.fetchone()
+        if row:
+            values.update((name, value.replace("'", "''") if isinstance(value, str) else value)
+                          for name, value in zip(names, row))
+    return values
+
+
+# --- Plans ---
+def _walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+def explain(cursor, qry, db, analyze=False):
+    # Returns (summary lines, tables read by sequential scan)
+    if db == "postgres":
+        options = "FORMAT JSON, ANALYZE, BUFFERS" if analyze else "FORMAT JSON"
+        tracing.execute(cursor, f"EXPLAIN ({options}) {qry}", "advisor_explain")
+        plan = cursor.fetchone()[0]
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        nodes = list(_walk(plan[0]["Plan"]))
+        lines = []
+        for node in nodes:
+            line = f"{node['Node Type']}"
+            if node.get("Relation Name"):
+                line += f" on {node['Relation Name']}"
+            if node.get("Index Name"):
+                line += f" using {node['Index Name']}"
+            line += f" (rows={node.get('Actual Rows', node.get('Plan Rows'))}"
+            line += f", time={node['Actual Total Time']}ms)" if "Actual Total Time" in node else ")"
+            lines.append(line)
+        seq_scans = {node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"}
+        return lines, seq_scans
+
+    tracing.execute(cursor, f"EXPLAIN QUERY PLAN {qry}", "advisor_explain")
+    lines = [row[3] for row in cursor.fetchall()]
+    seq_scans = {line.split()[1] for line in lines if line.startswith("SCAN ") and len(line.split()) > 1}
+    return lines, seq_scans
+
+
+def table_rows(cursor, table, db):
+    if db == "postgres":
+        # planner estimate; cheap on large tables
+        tracing.execute(cursor, f"select reltuples::bigint from pg_class where relname = '{table}'", "advisor_rows")
+    else:
+        tracing.execute(cursor, f"select count(*) from {table}", "advisor_rows")
+    row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None else 0
+
+
+def existing_indexes(cursor, table, db):
+    # {index_name: (column, ...)} in index order
+    indexes = {}
+    if db == "postgres":
+        tracing.execute(cursor, f"""select i.relname, a.attname
+                                    from pg_index x
+                                            join pg_class t on t.oid = x.indrelid
+                                            join pg_class i on i.oid = x.indexrelid
+                                            join pg_attribute a on a.attrelid = t.oid and a.attnum = any(x.indkey)
+                                    where t.relname = '{table}'
+                                    order by i.relname, array_position(x.indkey::int2[], a.attnum)""",
+                        "advisor_indexes")
+        for name, column in cursor.fetchall():
+            indexes[name] = indexes.get(name, ()) + (column,)
+        return indexes
+
+    tracing.execute(cursor, f"PRAGMA index_list({table})", "advisor_indexes")
+    for row in cursor.fetchall():
+        tracing.execute(cursor, f"PRAGMA index_info({row[1]})", "advisor_indexes")
+        indexes[row[1]] = tuple(column for _, _, column in sorted(cursor.fetchall()))
+    return indexes
+
+
+def covering_index(indexes, columns):
+    # an index serves the lookup when its leading columns are exactly the filtered columns, in any order
+    for name, index_columns in indexes.items():
+        if set(index_columns[:len(columns)]) == set(columns):
+            return name
+    return None
+
+
+def index_name(table, columns):
+    return f"idx_{table.replace('table_', '')}_{'_'.join(columns)}"
+
+
+# --- Advisor ---
+def advise(conn, analyze=False, create=False, large_rows=10000):
+    # Returns one entry per query shape; with create=True the suggested indexes are built and the shape re-planned
+    db = dialect(conn)
+    cursor = conn.cursor()
+    values = sample_values(cursor)
+    rows, indexes = {}, {}
+    report = []
+
+    for shape in QUERY_SHAPES:
+        table = shape["table"]
+        if table not in rows:
+            rows[table] = table_rows(cursor, table, db)
+            indexes[table] = existing_indexes(cursor, table, db)
+        qry = shape["sql"].format(**values)
+        aliases = shape.get("aliases", {})
+        with tracing.span("advisor.shape", kind=shape["kind"], table=table):
+            plan, seq_scans = explain(cursor, qry, db, analyze)
+        seq_scans = {aliases.get(name, name) for name in seq_scans}
+
+        index = covering_index(indexes[table], shape["columns"])
+        entry = {"kind": shape["kind"], "table": table, "columns": list(shape["columns"]), "table_rows": rows[table],
+                 "seq_scan": table in seq_scans, "index": index, "plan": plan, "suggestion": None, "created": False}
+        entry["flagged"] = index is None or (entry["seq_scan"] and rows[table] >= large_rows)
+        if index is None:
+            entry["suggestion"] = (f"CREATE INDEX IF NOT EXISTS {index_name(table, shape['columns'])} "
+                                   f"ON {table} ({', '.join(shape['columns'])});")
+            if create:
+                tracing.execute(cursor, entry["suggestion"], "advisor_create_index", table=table)
+                conn.commit()
+                indexes[table] = existing_indexes(cursor, table, db)
+                entry.update(created=True, index=covering_index(indexes[table], shape["columns"]))
+                entry["plan"], seq_scans = explain(cursor, qry, db, analyze)
+                entry["seq_scan"] = table in {aliases.get(name, name) for name in seq_scans}
+        report.append(entry)
+
+    if db == "postgres":
+        conn.rollback()  # EXPLAIN ANALYZE and catalog reads leave a transaction open
+    cursor.close()
+    return report
+
+
+def print_report(report):
+    for entry in report:
+        status = "FLAG" if entry["flagged"] else "ok"
+        print(f"[{status:>4}] {entry['kind']:<24} {entry['table']} ({entry['table_rows']} rows) "
+              f"index={entry['index'] or '-'} seq_scan={entry['seq_scan']}")
+        for line in entry["plan"]:
+            print(f"         {line}")
+        if entry["suggestion"]:
+            print(f"         {'created' if entry['created'] else 'suggest'}: {entry['suggestion']}")
+
+
+# --- Command Line ---
+def main(argv=None):
+    from Automation_Scripts.mapping_automation.src.main import get_connection, release_connection
+
+    parser = argparse.ArgumentParser(description="EXPLAIN every query shape the mapping tool issues and flag "
+                                                 "sequential scans and missing composite indexes.")
+    parser.add_argument("--analyze", action="store_true", help="use EXPLAIN ANALYZE (runs the lookups)")
+    parser.add_argument("--create", action="store_true", help="create the suggested indexes")
+    parser.add_argument("--large-rows", type=int, default=10000, help="flag sequential scans on tables this large")
+    parser.add_argument("--report", help="write the plans as JSON to this path")
+    args = parser.parse_args(argv)
+
+    conn = get_connection()
+    try:
+        report = advise(conn, args.analyze, args.create, args.large_rows)
+    finally:
+        release_connection(conn)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(entry["flagged"] and not entry["created"] for entry in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+# --- Imports ---
+import json
+import os
+import threading
+
+
+# --- Atomic JSON Files ---
+# State files (checkpoints, incremental results, diff snapshots, reference snapshots, the service spool) and bundle
+# scripts are written to a temporary file next to the target and renamed over it, so readers and restarted runs never
+# see half a file.
+# numpy/pandas scalars are stored as plain values and anything else JSON cannot hold as its text.
+
+def json_default(value):
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _tmp_path(path):
+    # the temporary name is unique per process and thread, so concurrent writers of one path never share it
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def write_json(path, payload, **dump_options):
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, default=json_default, **dump_options)
+    os.replace(tmp_path, path)
+
+
+def write_text(path, text):
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,36 @@
+# --- Imports ---
+import importlib
+
+
+# --- Lazy Modules ---
+# Heavy dependencies (pandas, requests, psycopg2) are bound at module level through LazyModule so importing the
+# scripts stays cheap; the real module is imported on first attribute access, i.e. in the stage that needs it.
+
+class LazyModule:
+    def __init__(self, name, *submodules):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_submodules", submodules)
+        object.__setattr__(self, "_module", None)
+
+    def _load(self):
+        module = object.__getattribute__(self, "_module")
+        if module is None:
+            module = importlib.import_module(self._name)
+            for submodule in self._submodules:
+                importlib.import_module(submodule)
+            object.__setattr__(self, "_module", module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    # writes go to the real module so mock.patch("...main.requests.get") keeps working
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if object.__getattribute__(self, "_module") is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
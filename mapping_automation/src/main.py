@@ -1,16 +1,50 @@
 # --- Imports ---
-import psycopg2.pool
-from Automation_Scripts import db_creds
-
-import requests
+# pandas, requests and psycopg2 are loaded on first use and openpyxl only when the Excel report is written,
+# so importing this module (or the CLI built on it) stays fast.
+import contextlib
+import contextvars
+import functools
+import gzip
 import json
-import pandas as pd
-
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.table import Table, TableStyleInfo
-
-# Example of generic field mapping definitions
+import os
+import threading
+import time
+
+from Automation_Scripts.mapping_automation.src import memory, tracing
+from Automation_Scripts.mapping_automation.src.audit_table import read_audit_statuses, refresh_audit_table
+from Automation_Scripts.mapping_automation.src.checkpoint import NullCheckpointStore, fingerprint_inputs, open_checkpoint
+from Automation_Scripts.mapping_automation.src.definitions import DefinitionRegistry, compile_template
+from Automation_Scripts.mapping_automation.src.diff import audit_diff
+from Automation_Scripts.mapping_automation.src.history import open_history
+from Automation_Scripts.mapping_automation.src.incremental import incremental_audit
+from Automation_Scripts.mapping_automation.src.lazy import LazyModule
+from Automation_Scripts.mapping_automation.src.reference import ReferenceCache
+from Automation_Scripts.mapping_automation.src.singleflight import SingleFlight
+from Automation_Scripts.mapping_automation.src.suggest import TrigramIndex
+from Automation_Scripts.mapping_automation.src.writes import WriteConfig, WriteExecutor
+
+pd = LazyModule("pandas")
+requests = LazyModule("requests")
+psycopg2 = LazyModule("psycopg2", "psycopg2.pool")
+
+EXCEL_NAMES = ("Workbook", "get_column_letter", "Table", "TableStyleInfo")
+
+
+def _load_excel():
+    global Workbook, get_column_letter, Table, TableStyleInfo
+    if "Workbook" not in globals():
+        from openpyxl import Workbook
+        from openpyxl.utils import get_column_letter
+        from openpyxl.worksheet.table import Table, TableStyleInfo
+
+
+def __getattr__(name):
+    if name in EXCEL_NAMES:
+        _load_excel()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Example of generic field mapping definitions; real ones are loaded into a definitions.DefinitionRegistry
 field_mapping_definitions = {
     "IS_ACTIVE": {
         "long_name": "StatusFlag",
@@ -18,29 +52,110 @@ field_mapping_definitions = {
     }
 }
 
+INITIAL_HEADERS = ['Source', 'Protocol', 'Provider', 'Dataset ID', 'Class', 'Class Description', 'Download Type',
+                   'Field ID', 'Canonical Field Name', 'Mapping Status', 'Proposed Fields Short Name',
+                   'Proposed Transformation']
+FINAL_HEADERS = INITIAL_HEADERS + ['es_Pass', 'Proposed Fields Long Name', 'Finalized Transformation']
 
-pool = None  # global placeholder
+# Proposed names are comma-separated lists. Every stage reads them through the helpers below, which parse each
+# distinct list once and hand the same tuple to all rows proposing it. 'Proposed Field Short Name' is the spelling
+# of older callers and is read when the report column is missing.
+PROPOSED_SHORT_NAMES = 'Proposed Fields Short Name'
+PROPOSED_LONG_NAMES = 'Proposed Fields Long Name'
+LEGACY_SHORT_NAMES = 'Proposed Field Short Name'
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_proposed(value):
+    return tuple(name.strip() for name in value.split(','))
+
+
+@functools.lru_cache(maxsize=4096)
+def proposed_pairs(short_value, long_value):
+    return tuple(zip(parse_proposed(short_value), parse_proposed(long_value)))
 
-def create_pool():
-    return psycopg2.pool.SimpleConnectionPool(
+
+def proposed_short_value(row, default=None):
+    if PROPOSED_SHORT_NAMES in row:
+        return row[PROPOSED_SHORT_NAMES]
+    return row.get(LEGACY_SHORT_NAMES, default)
+
+
+pool = None  # global placeholder
+target_pools = {}  # one threaded pool per named database target (see fanout.py), created on first use
+http_session = None  # requests.Session kept warm by long-running callers (see service.py); None uses requests directly
+metadata_cache = None  # optional cache of ES lookups exposing get(key) / set(key, value)
+reference_cache = None  # optional reference.ReferenceCache answering get_src_info / get_field_info from memory
+definition_registry = None  # optional definitions.DefinitionRegistry used by jobs without their own definitions
+lean_es = False  # True sends lean ES searches (one hit, filter_path, gzip both ways); see _search_metadata
+# single-flight group of the audit running in this context (set by run_audit_stages); each service job runs in its
+# own thread and context, so concurrent jobs keep separate groups and metrics
+es_lookups = contextvars.ContextVar("es_lookups", default=None)
+# name of the database target audited in this context (set by fanout.py); keeps reference snapshots per database
+db_target = contextvars.ContextVar("db_target", default=None)
+_target_pools_lock = threading.Lock()
+
+DB_SETTINGS = ("database", "host", "user", "password", "port")
+
+
+def db_settings(target=None):
+    from Automation_Scripts import db_creds  # credentials are resolved when the first connection is needed
+
+    settings = {"database": db_creds.DB_MAIN, "host": db_creds.DB_HOST, "user": db_creds.DB_USER,
+                "password": db_creds.DB_PASS, "port": db_creds.DB_PORT}
+    if target is not None:
+        # a named target overrides the defaults with its db_creds.DB_TARGETS entry, then with its own keys
+        settings.update(getattr(db_creds, "DB_TARGETS", {}).get(target["name"], {}))
+        settings.update({key: target[key] for key in DB_SETTINGS if key in target})
+    return settings
+
+def create_pool(threaded=False, target=None):
+    # the threaded pool is needed when jobs run concurrently in one process
+    pool_class = psycopg2.pool.ThreadedConnectionPool if threaded else psycopg2.pool.SimpleConnectionPool
+    return pool_class(
         minconn=1,
         maxconn=10,
-        database=db_creds.DB_MAIN,
-        host=db_creds.DB_HOST,
-        user=db_creds.DB_USER,
-        password=db_creds.DB_PASS,
-        port=db_creds.DB_PORT
+        **db_settings(target)
     )
 
-def get_connection():
+def get_connection(target=None):
     global pool
+    if target is not None:
+        conn_pool = target_pools.get(target["name"])
+        if conn_pool is None:
+            # opened outside the lock, so a slow or unreachable target never holds up the other targets' pools;
+            # when two threads race for one target, the pool stored first wins and the other is closed
+            created = create_pool(threaded=True, target=target)
+            with _target_pools_lock:
+                conn_pool = target_pools.setdefault(target["name"], created)
+            if conn_pool is not created:
+                created.closeall()
+        return conn_pool.getconn()
     if pool is None:
         pool = create_pool()
     return pool.getconn()
 
+def release_connection(conn, target=None):
+    # return a connection to the pool so the next job reuses it instead of opening a new one
+    conn_pool = target_pools.get(target["name"]) if target is not None else pool
+    if conn_pool is not None:
+        conn_pool.putconn(conn)
+    else:
+        conn.close()
+
+@contextlib.contextmanager
+def pooled_connection(target=None):
+    conn = get_connection(target)
+    try:
+        yield conn
+    finally:
+        release_connection(conn, target)
+
 
 # --- Base Data Collection ---
 def get_src_info(cursor, src_list, dl_type):
+    if reference_cache is not None:
+        return reference_cache.src_info(cursor, src_list, dl_type, scope=db_target.get())
     srcs_str = "', '".join(src_list)
     qry = f"""  select  info.source, info.protocol, info.provider, cls.dataset_id, cls.dataset_name, cls.dataset_description, '{dl_type}' AS download_type
                 from table_dataset_config cls
@@ -49,23 +164,29 @@ def get_src_info(cursor, src_list, dl_type):
                         and cls.download_type = '{dl_type}'
                 ;"""
 
-    cursor.execute(qry)
+    tracing.execute(cursor, qry, "src_info", download_type=dl_type, sources=len(src_list))
     return  [item for item in cursor.fetchall()]
 
 
 def get_field_info(cursor, fields, dl_type):
+    if reference_cache is not None:
+        return reference_cache.field_info(cursor, fields, dl_type, scope=db_target.get())
     field_str = "', '".join(fields)
     qry = f"""  select id, name
                 from table_canonical_fields
                 where download_type = '{dl_type}'
                         and name in ('{field_str}');"""
 
-    cursor.execute(qry)
+    tracing.execute(cursor, qry, "field_info", download_type=dl_type, fields=len(fields))
     return [item for item in cursor.fetchall()]
 
 
 # --- Mapping Audit & Excel Write ---
-def mapping_audit(cursor, tup_list):
+def mapping_audit(cursor, tup_list, statuses=None):
+    if statuses is not None:
+        # statuses read from the materialized audit table in one scan (see audit_table.py)
+        return [i + (statuses.get((i[3], i[4], i[7]), 'Not Mapped'),) for i in tup_list]
+
     updated_list = []
 
     for i in tup_list:
@@ -81,7 +202,7 @@ def mapping_audit(cursor, tup_list):
                             and dataset_name = '{dataset_name}'
                             and download_type = '{download_type}';"""
 
-        cursor.execute(qry)
+        tracing.execute(cursor, qry, "mapping_audit", source=i[0], dataset_id=dataset_id, field_id=field_id)
         result = cursor.fetchall()
 
         if not result:
@@ -97,21 +218,25 @@ def mapping_audit(cursor, tup_list):
 
 
 def append_proposed_fields(audit_data, field_mapping_definitions):
+    # the (long_name, transformation) pair of each definition is built once and shared by all of its rows
+    proposals = {field: (definition.get("long_name", ""), definition.get("transformation", ""))
+                 for field, definition in field_mapping_definitions.items()}
+    not_applicable = ("N/A", "N/A")
     updated_data = []
     for row in audit_data:
-        status = row[9]
-        canonical_field = row[8]
-        if status != 'Mapped' and canonical_field in field_mapping_definitions:
-            long_name = field_mapping_definitions[canonical_field].get("long_name", "")
-            transformation = field_mapping_definitions[canonical_field].get("transformation", "")
-        else:
-            long_name = "N/A"
-            transformation = "N/A"
-        updated_data.append(row + (long_name, transformation))
+        proposal = proposals.get(row[8], not_applicable) if row[9] != 'Mapped' else not_applicable
+        updated_data.append(row + proposal)
     return updated_data
 
 
 def get_metadata_elastic_search(source, dataset_name, field_name, resource, auth_url):
+    lookups = es_lookups.get()
+    if lookups is not None:
+        return lookups.call(_search_metadata, source, dataset_name, field_name, resource, auth_url)
+    return _search_metadata(source, dataset_name, field_name, resource, auth_url)
+
+
+def _search_metadata(source, dataset_name, field_name, resource, auth_url):
     query = {
         "_source": ["documentId", "className", "longName", "tableSystemName"],
         "query": {
@@ -128,13 +253,71 @@ def get_metadata_elastic_search(source, dataset_name, field_name, resource, auth
     if resource:
         query["query"]["bool"]["must"].insert(2, {"term": {"resource": {"value": resource.lower()}}})
 
+    cache_key = (source, dataset_name, field_name, resource, auth_url)
+    if metadata_cache is not None:
+        cached = metadata_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     headers = {"Content-Type": "application/json"}
-    try:
-        response = requests.get(auth_url, headers=headers, data=json.dumps(query))
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
+    client = http_session if http_session is not None else requests
+    with tracing.span("http.es_search", source=source, dataset_name=dataset_name, field=field_name,
+                      resource=resource) as span:
+        try:
+            if lean_es:
+                response = client.get(auth_url, **lean_search_request(query))
+            else:
+                response = client.get(auth_url, headers=headers, data=json.dumps(query))
+            span.set(status_code=response.status_code)
+            response.raise_for_status()
+            result = _json_loads(response.content) if lean_es else response.json()
+            if tracing.is_enabled():
+                span.set(rows=len(result.get("hits", {}).get("hits", [])))
+            if metadata_cache is not None:
+                metadata_cache.set(cache_key, result)
+            return result
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # ValueError: a body that is not JSON (e.g. a proxy's HTML error page) is a failed lookup too
+            span.set(error=str(e))
+            return {"error": str(e)}
+
+
+# --- Lean ES Searches ---
+# Only hits[0]._source.tableSystemName is ever read, so lean searches stop after the first match, return that one
+# hit, strip the response envelope with filter_path and gzip both bodies. Without hits the filtered response is {}.
+# With several matching documents the first one collected is returned rather than the best scored one.
+LEAN_FILTER_PATH = "hits.hits._source"
+_fast_loads = None
+
+
+def lean_search_request(query):
+    query = dict(query, _source=["tableSystemName"], size=1, terminate_after=1)
+    headers = {"Content-Type": "application/json", "Content-Encoding": "gzip", "Accept-Encoding": "gzip"}
+    return {"headers": headers, "params": {"filter_path": LEAN_FILTER_PATH},
+            "data": gzip.compress(json.dumps(query, separators=(",", ":")).encode(), compresslevel=1)}
+
+
+def _json_loads(content):
+    # orjson is optional; json is used when it is not installed
+    global _fast_loads
+    if _fast_loads is None:
+        try:
+            import orjson
+            _fast_loads = orjson.loads
+        except ImportError:
+            _fast_loads = json.loads
+    return _fast_loads(content)
+
+
+def es_resource(download_type, protocol):
+    download_type_lower = download_type.lower()
+    if 'listing' in download_type_lower:
+        return "Property" if protocol == "RETS" else "EntityType" if protocol == "WEBAPI" else ""
+    elif download_type_lower == "openhouse":
+        return "OpenHouse" if protocol == "RETS" else "EntityType" if protocol == "WEBAPI" else ""
+    elif download_type_lower in {"agent", "office"}:
+        return None
+    return ""
 
 
 def elasticsearch_check_from_df(df, auth_url):
@@ -144,7 +327,7 @@ def elasticsearch_check_from_df(df, auth_url):
         status = row['Mapping Status']
         if status == 'Mapped':
             row['es_Pass'] = 'N/A'
-            row['Proposed Fields Long Name'] = 'N/A'
+            row[PROPOSED_LONG_NAMES] = 'N/A'
             updated_rows.append(row)
             continue
 
@@ -152,25 +335,16 @@ def elasticsearch_check_from_df(df, auth_url):
         dataset_name = row['Class']
         protocol = row['Protocol']
         download_type = row['Download Type']
-        proposed_fields = row['Proposed Field Short Name']
+        proposed_fields = proposed_short_value(row)
 
         if not proposed_fields or pd.isna(proposed_fields):
             row['es_Pass'] = 'N'
-            row['Proposed Fields Long Name'] = 'NF'
+            row[PROPOSED_LONG_NAMES] = 'NF'
             updated_rows.append(row)
             continue
 
-        download_type_lower = download_type.lower()
-        if 'listing' in download_type_lower:
-            resource = "Property" if protocol == "RETS" else "EntityType" if protocol == "WEBAPI" else ""
-        elif download_type_lower == "openhouse":
-            resource = "OpenHouse" if protocol == "RETS" else "EntityType" if protocol == "WEBAPI" else ""
-        elif download_type_lower in {"agent", "office"}:
-            resource = None
-        else:
-            resource = ""
-
-        fields = [f.strip() for f in str(proposed_fields).split(',')]
+        resource = es_resource(download_type, protocol)
+        fields = parse_proposed(str(proposed_fields))
         all_found = True
         long_names = []
 
@@ -185,23 +359,98 @@ def elasticsearch_check_from_df(df, auth_url):
                 all_found = False
 
         row['es_Pass'] = 'Y' if all_found else 'N'
-        row['Proposed Fields Long Name'] = ','.join(long_names)
+        row[PROPOSED_LONG_NAMES] = ','.join(long_names)
         updated_rows.append(row)
 
     return pd.DataFrame(updated_rows)
 
 
+# --- Long Name Suggestions ---
+# Optional stage for rows with NF fields: the metadata of each such class is fetched once (paged with search_after)
+# into a trigram index, and every NF field gets the closest tableSystemName values in SUGGESTION_HEADER.
+SUGGESTION_HEADER = 'Suggested Long Names'
+CLASS_METADATA_PAGE = 5000
+
+
+def get_class_metadata(source, dataset_name, resource, auth_url):
+    must = [{"term": {"documentId": {"value": source.lower()}}},
+            {"term": {"className": {"value": dataset_name.lower()}}}]
+    if resource:
+        must.append({"term": {"resource": {"value": resource.lower()}}})
+    query = {"_source": ["longName", "tableSystemName"], "size": CLASS_METADATA_PAGE,
+             # text fields cannot be sorted on, and search_after needs a unique last sort key
+             "sort": [{"longName.keyword": "asc"}, {"_id": "asc"}], "query": {"bool": {"must": must}}}
+
+    headers = {"Content-Type": "application/json"}
+    client = http_session if http_session is not None else requests
+    docs = []
+    with tracing.span("http.es_class_metadata", source=source, dataset_name=dataset_name, resource=resource) as span:
+        try:
+            while True:
+                response = client.get(auth_url, headers=headers, data=json.dumps(query),
+                                      params={"filter_path": "hits.hits._source,hits.hits.sort"})
+                response.raise_for_status()
+                hits = response.json().get("hits", {}).get("hits", [])
+                docs.extend(hit["_source"] for hit in hits)
+                if len(hits) < CLASS_METADATA_PAGE:
+                    break
+                query["search_after"] = hits[-1]["sort"]
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # a failed page or a body that is not JSON leaves the class without metadata
+            docs = []
+            span.set(error=str(e))
+            print(f"Suggestions: metadata for {source}/{dataset_name} unavailable: {e}")
+        span.set(rows=len(docs))
+    return docs
+
+
+def class_index(docs):
+    # a document is found by its long name and by its system name
+    return TrigramIndex((text, doc.get("tableSystemName")) for doc in docs if doc.get("tableSystemName")
+                        for text in (doc.get("longName"), doc["tableSystemName"]))
+
+
+def add_long_name_suggestions(df, auth_url, top_k=3, min_score=0.3):
+    indexes = {}
+    suggestions = []
+    for _, row in df.iterrows():
+        short_value = proposed_short_value(row)
+        long_value = str(row.get(PROPOSED_LONG_NAMES, ''))
+        if row['Mapping Status'] == 'Mapped' or not short_value or pd.isna(short_value) \
+                or 'NF' not in parse_proposed(long_value):
+            suggestions.append('N/A')
+            continue
+
+        key = (row['Source'], row['Class'], es_resource(row['Download Type'], row['Protocol']))
+        if key not in indexes:
+            indexes[key] = class_index(get_class_metadata(*key, auth_url))
+        parts = []
+        for short, long in proposed_pairs(str(short_value), long_value):
+            if long == 'NF':
+                matches = indexes[key].search(short, top_k, min_score)
+                parts.append(f"{short}: {', '.join(value for value, _ in matches) or '-'}")
+        suggestions.append('; '.join(parts))
+
+    print(f"Suggestions: {sum(value != 'N/A' for value in suggestions)} rows with NF fields, "
+          f"{len(indexes)} classes indexed")
+    return df.assign(**{SUGGESTION_HEADER: suggestions})
+
+
+@functools.lru_cache(maxsize=4096)
+def finalize_transformation(transformation, short_value, long_value):
+    # rows proposing the same names for the same definition share the result; registry definitions are compiled
+    # into templates when they are loaded (definitions.py)
+    replacements = dict(proposed_pairs(short_value, long_value))
+    return compile_template(transformation, tuple(replacements)).render(replacements)
+
+
 def add_finalized_transformation(df):
     finalized = []
     for _, row in df.iterrows():
         if row.get('es_Pass') == 'Y':
-            short_names = [s.strip() for s in str(row.get('Proposed Field Short Name', '')).split(',')]
-            long_names = [l.strip() for l in str(row.get('Proposed Fields Long Name', '')).split(',')]
-            mapping = dict(zip(short_names, long_names))
-            transformation = row.get('Proposed Transformation', '')
-            for short, long in mapping.items():
-                transformation = transformation.replace(short, long)
-            row['Finalized Transformation'] = transformation
+            row['Finalized Transformation'] = finalize_transformation(row.get('Proposed Transformation', ''),
+                                                                      str(proposed_short_value(row, '')),
+                                                                      str(row.get(PROPOSED_LONG_NAMES, '')))
         else:
             row['Finalized Transformation'] = 'N/A'
         finalized.append(row)
@@ -209,6 +458,7 @@ def add_finalized_transformation(df):
 
 
 def write_updated_audit_to_excel(headers, rows, file_path):
+    _load_excel()
     wb = Workbook()
     ws = wb.active
     ws.title = "Audit Results"
@@ -232,108 +482,173 @@ def write_updated_audit_to_excel(headers, rows, file_path):
 
 
 # --- Insert Statement Generators ---
-def canonical_inserts_from_df(df, conn, download_type):
-    inserts = []
+KEY_BATCH_SIZE = 1000  # rows per multi-row INSERT / keyed lookup statement
+
+
+def _batches(items, size=KEY_BATCH_SIZE):
+    for idx in range(0, len(items), size):
+        yield items[idx:idx + size]
+
+
+def canonical_inserts_from_df(df, conn, download_type, executor=None):
+    # Returns {(field_id, dataset_id): [(mapping_id, dataset_name), ...]} for every row, covering existing and newly
+    # inserted mappings, so origin_inserts_from_df needs no per-row lookups
+    executor = executor or WriteExecutor(conn)
     cursor = conn.cursor()
 
+    rows = {}
     for _, row in df.iterrows():
-        field_id = row['Field ID']
-        dataset_id = row['Dataset ID']
-        dataset_name = row['Class']
-        dataset_desc = row['Class Description']
-        mapping = row['Finalized Transformation']
+        key = (row['Field ID'], row['Dataset ID'], row['Class'])
+        rows.setdefault(key, (row['Class Description'], row['Finalized Transformation']))
 
+    mapping_ids = {(field_id, dataset_id): [] for field_id, dataset_id, _ in rows}
+    existing = set()
+    for batch in _batches(list(mapping_ids)):
+        values = ", ".join(f"({field_id}, {dataset_id})" for field_id, dataset_id in batch)
         check_qry = f"""
-        SELECT 1 FROM table_mapping
-        WHERE field_id = {field_id}
-        AND dataset_id = {dataset_id}
-        AND dataset_name = '{dataset_name}'
-        AND download_type = '{download_type}';
+        SELECT id, field_id, dataset_id, dataset_name, download_type FROM table_mapping
+        WHERE (field_id, dataset_id) IN (VALUES {values});
         """
-        cursor.execute(check_qry)
-        if cursor.fetchone():
+        tracing.execute(cursor, check_qry, "canonical_insert_check", rows=len(batch))
+        for mapping_id, field_id, dataset_id, db_class, db_download_type in cursor.fetchall():
+            mapping_ids.setdefault((field_id, dataset_id), []).append((mapping_id, db_class))
+            if db_download_type == download_type:
+                existing.add((field_id, dataset_id, db_class))
+
+    inserts = []
+    for (field_id, dataset_id, dataset_name), (dataset_desc, mapping) in rows.items():
+        if (field_id, dataset_id, dataset_name) in existing:
             print(f"Skipping existing mapping: field_id={field_id}, dataset_id={dataset_id}, dataset_name={dataset_name}")
             continue
+        inserts.append((f"({field_id}, {dataset_id}, 3, '{mapping}', true, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, "
+                        f"'{download_type}', '{dataset_name}', '{dataset_desc}', true)",
+                        {"field_id": field_id, "dataset_id": dataset_id, "dataset_name": dataset_name}))
 
-        insert_stmt = f"""
+    def insert_stmt(values):
+        return f"""
         INSERT INTO table_mapping
         (field_id, dataset_id, column_transformation_id, custom_transformation, is_active, last_update_ts, create_ts, download_type, dataset_name, dataset_description, auto_mapped)
-        VALUES ({field_id}, {dataset_id}, 3, '{mapping}', true, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, '{download_type}', '{dataset_name}', '{dataset_desc}', true);
+        VALUES {", ".join(values)}
+        RETURNING id, field_id, dataset_id, dataset_name;
         """
-        inserts.append(insert_stmt)
 
-    for stmt in inserts:
-        cursor.execute(stmt)
-    conn.commit()
-
-    if inserts:
+    failures = len(executor.failures)
+    inserted = 0
+    for batch in _batches(inserts):
+        for mapping_id, field_id, dataset_id, db_class in executor.execute_batch(cursor, batch, insert_stmt,
+                                                                                 "canonical_insert", fetch=True):
+            mapping_ids.setdefault((field_id, dataset_id), []).append((mapping_id, db_class))
+            inserted += 1
+    executor.commit()
+
+    failed = len(executor.failures) - failures
+    if failed:
+        print(f"{failed} of {len(inserts)} canonical inserts failed and were rolled back")
+    if inserted:
         print("Canonical Inserts Created")
-    else:
+    elif not inserts:
         print("No new canonical inserts created")
 
+    return mapping_ids
+
+
+def origin_insert_names(row):
+    # (source_field, long_name) pairs written by origin_inserts_from_df; shared with the bundle export
+    return proposed_pairs(str(row[PROPOSED_LONG_NAMES]), str(proposed_short_value(row)))
+
+
+def origin_update_names(row):
+    return proposed_pairs(str(proposed_short_value(row)), str(row[PROPOSED_LONG_NAMES]))
+
 
-def origin_inserts_from_df(df, conn):
+def _existing_origin_fields(cursor, keys):
+    # Loads which (mapping_id, source_field, dataset_id) keys already exist with one query per KEY_BATCH_SIZE keys,
+    # so the per-field loops become set membership checks instead of a SELECT 1 each
+    existing = set()
+    for batch in _batches(list(dict.fromkeys(keys))):
+        values = ", ".join(f"({mapping_id}, '{source_field}', {dataset_id})"
+                           for mapping_id, source_field, dataset_id in batch)
+        prefetch_qry = f"""
+            SELECT mapping_id, source_field, dataset_id FROM table_origin_field
+            WHERE (mapping_id, source_field, dataset_id) IN (VALUES {values});
+        """
+        tracing.execute(cursor, prefetch_qry, "origin_field_prefetch", rows=len(batch))
+        existing.update(tuple(row) for row in cursor.fetchall())
+    return existing
+
+
+def origin_inserts_from_df(df, conn, executor=None, mapping_ids=None):
+    # mapping_ids is the keyed result of canonical_inserts_from_df; rows missing from it are looked up
+    executor = executor or WriteExecutor(conn)
     inserts = []
+    candidates = []
     cursor = conn.cursor()
 
     for _, row in df.iterrows():
         field_id = row['Field ID']
         dataset_id = row['Dataset ID']
         dataset_name = row['Class']
-        short_names = [s.strip() for s in str(row['Proposed Fields Long Name']).split(',')]
-        long_names = [l.strip() for l in str(row['Proposed Field Short Name']).split(',')]
+        names = origin_insert_names(row)
 
-        mapping_id_qry = f"""
-            SELECT id, dataset_name FROM table_mapping
-            WHERE field_id = {field_id} AND dataset_id = {dataset_id};
-        """
-        cursor.execute(mapping_id_qry)
-        results = cursor.fetchall()
+        if mapping_ids is not None and (field_id, dataset_id) in mapping_ids:
+            results = mapping_ids[(field_id, dataset_id)]
+        else:
+            mapping_id_qry = f"""
+                SELECT id, dataset_name FROM table_mapping
+                WHERE field_id = {field_id} AND dataset_id = {dataset_id};
+            """
+            tracing.execute(cursor, mapping_id_qry, "origin_mapping_lookup", dataset_id=dataset_id, field_id=field_id)
+            results = cursor.fetchall()
 
         if not results:
             print(f"No mapping IDs found for field_id={field_id}, dataset_id={dataset_id}")
             continue
 
-        matched = False
-        for mapping_id, db_class in results:
-            if db_class != dataset_name:
-                continue
-
-            matched = True
-            for short_name, long_name in zip(short_names, long_names):
-                check_qry = f"""
-                    SELECT 1 FROM table_origin_field
-                    WHERE mapping_id = {mapping_id}
-                    AND source_field = '{short_name}'
-                    AND dataset_id = {dataset_id};
-                """
-                cursor.execute(check_qry)
-                if cursor.fetchone():
+        matched_ids = [mapping_id for mapping_id, db_class in results if db_class == dataset_name]
+        if not matched_ids:
+            print(f"No matching dataset found for field_id={field_id}, dataset_id={dataset_id}, dataset_name={dataset_name}")
+            continue
+        candidates.append((field_id, dataset_id, matched_ids, names))
+
+    existing = _existing_origin_fields(cursor, [(mapping_id, short_name, dataset_id)
+                                                for _, dataset_id, matched_ids, names in candidates
+                                                for mapping_id in matched_ids for short_name, _ in names])
+
+    for field_id, dataset_id, matched_ids, names in candidates:
+        for mapping_id in matched_ids:
+            for short_name, long_name in names:
+                if (mapping_id, short_name, dataset_id) in existing:
                     print(f"Skipping existing origin field: mapping_id={mapping_id}, source_field={short_name}, dataset_id={dataset_id}")
                     continue
+                existing.add((mapping_id, short_name, dataset_id))
+                inserts.append((f"({mapping_id}, '{short_name}', {dataset_id}, true, CURRENT_TIMESTAMP, "
+                                f"CURRENT_TIMESTAMP, '{short_name}', '{long_name}')",
+                                {"dataset_id": dataset_id, "field_id": field_id}))
 
-                origin_stmt = f"""
+    def origin_stmt(values):
+        return f"""
                     INSERT INTO table_origin_field
                     (mapping_id, source_field, dataset_id, is_active, last_update_ts, create_ts, short_name, long_name)
-                    VALUES ({mapping_id}, '{short_name}', {dataset_id}, true, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, '{short_name}', '{long_name}');
+                    VALUES {", ".join(values)};
                 """
-                inserts.append(origin_stmt)
 
-        if not matched:
-            print(f"No matching dataset found for field_id={field_id}, dataset_id={dataset_id}, dataset_name={dataset_name}")
-
-    for stmt in inserts:
-        cursor.execute(stmt)
-    conn.commit()
+    failures = len(executor.failures)
+    for batch in _batches(inserts):
+        executor.execute_batch(cursor, batch, origin_stmt, "origin_insert")
+    executor.commit()
 
-    if inserts:
+    failed = len(executor.failures) - failures
+    if failed:
+        print(f"{failed} of {len(inserts)} origin inserts failed and were rolled back")
+    if len(inserts) > failed:
         print("Origin Inserts Created")
-    else:
+    elif not inserts:
         print("No new origin inserts created")
 
 
 # --- Update Statement Generators ---
-def canonical_updates_from_df(df, conn):
+def canonical_updates_from_df(df, conn, executor=None):
+    executor = executor or WriteExecutor(conn)
     cursor = conn.cursor()
 
     updates_executed = False
@@ -352,7 +667,7 @@ def canonical_updates_from_df(df, conn):
         AND dataset_name = '{dataset_name}'
         AND download_type = '{download_type}';
         """
-        cursor.execute(qry)
+        tracing.execute(cursor, qry, "canonical_update_lookup", dataset_id=dataset_id, field_id=field_id)
         result = cursor.fetchone()
 
         if result:
@@ -377,12 +692,12 @@ def canonical_updates_from_df(df, conn):
                 AND dataset_name = '{dataset_name}'
                 AND download_type = '{download_type}';
                 """
-            cursor.execute(update_stmt)
+            executor.execute(cursor, update_stmt, "canonical_update", dataset_id=dataset_id, field_id=field_id)
             updates_executed = True
         else:
             print("Mapping not found")
 
-    conn.commit()
+    executor.commit()
 
     if updates_executed:
         print("Canonical Updates Created")
@@ -390,36 +705,35 @@ def canonical_updates_from_df(df, conn):
         print("No updates executed")
 
 
-def origin_updates_from_df(df, conn):
+def origin_updates_from_df(df, conn, executor=None):
+    executor = executor or WriteExecutor(conn)
     cursor = conn.cursor()
     updates_executed = False
+    candidates = []
 
     for _, row in df.iterrows():
         field_id = row['Field ID']
         dataset_id = row['Dataset ID']
-        short_names = [s.strip() for s in str(row['Proposed Fields Short Name']).split(',')]
-        long_names = [l.strip() for l in str(row['Proposed Fields Long Name']).split(',')]
+        names = origin_update_names(row)
 
         mapping_id_qry = f"""
         SELECT id FROM table_mapping
         WHERE field_id = {field_id} AND dataset_id = {dataset_id};
         """
-        cursor.execute(mapping_id_qry)
+        tracing.execute(cursor, mapping_id_qry, "origin_mapping_lookup", dataset_id=dataset_id, field_id=field_id)
         result = cursor.fetchone()
         if not result:
             print(f"Mapping ID not found for field_id={field_id}, dataset_id={dataset_id}")
             continue
-        mapping_id = result[0]
-
-        for short_name, long_name in zip(short_names, long_names):
-            check_qry = f"""
-            SELECT 1 FROM table_origin_field
-            WHERE mapping_id = {mapping_id}
-            AND source_field = '{short_name}'
-            AND dataset_id = {dataset_id};
-            """
-            cursor.execute(check_qry)
-            if cursor.fetchone():
+        candidates.append((field_id, dataset_id, result[0], names))
+
+    existing = _existing_origin_fields(cursor, [(mapping_id, short_name, dataset_id)
+                                                for _, dataset_id, mapping_id, names in candidates
+                                                for short_name, _ in names])
+
+    for field_id, dataset_id, mapping_id, names in candidates:
+        for short_name, long_name in names:
+            if (mapping_id, short_name, dataset_id) in existing:
                 # Row exists, update it
                 update_stmt = f"""
                 UPDATE table_origin_field
@@ -435,10 +749,11 @@ def origin_updates_from_df(df, conn):
                 (mapping_id, source_field, dataset_id, is_active, last_update_ts, create_ts, short_name, long_name)
                 VALUES ({mapping_id}, '{short_name}', {dataset_id}, true, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, '{short_name}', '{long_name}');
                 """
-            cursor.execute(update_stmt)
+                existing.add((mapping_id, short_name, dataset_id))
+            executor.execute(cursor, update_stmt, "origin_update", dataset_id=dataset_id, field_id=field_id)
             updates_executed = True
 
-    conn.commit()
+    executor.commit()
 
     if updates_executed:
         print("Origin Updates Created")
@@ -446,44 +761,157 @@ def origin_updates_from_df(df, conn):
         print("No updates executed")
 
 
-# --- Main Execution ---
-def main():
-    source_list = ['SRC_A', 'SRC_B', 'SRC_C']
-    download_type = 'agent'
-    canonical_fields = tuple(field_mapping_definitions.keys())
-    auth_url = "https://placeholder-opensearch-url.com/api/search"
-    out_path = '/path/to/output/'
-    out_file_name = f"{out_path}Canonical_Audit_{download_type}_results.xlsx"
-
-    conn = get_connection()
+# --- Audit Pipeline ---
+def run_audit_stages(cursor, master_list, auth_url, definitions=field_mapping_definitions, checkpoint=None,
+                     es_batch_size=500, statuses=None):
+    # with a checkpoint store each stage output is persisted, and the ES check resumes at the last finished batch
+    checkpoint = checkpoint or NullCheckpointStore()
+    with tracing.span("stage.mapping_audit", rows=len(master_list)), memory.stage("mapping_audit"):
+        audit_tups = checkpoint.stage("mapping_audit", lambda: mapping_audit(cursor, master_list, statuses))
+    with memory.stage("proposed_fields"):
+        audit_tups_with_proposals = append_proposed_fields(audit_tups, definitions)
+        audit_df = pd.DataFrame(audit_tups_with_proposals, columns=INITIAL_HEADERS)
+
+    # Run Elasticsearch check and add 'es_Pass' and 'Proposed Fields Long Name'; identical lookups run once per run,
+    # or once per fan-out when fanout.py already set a group shared by the audits of all database targets
+    lookups = es_lookups.get()
+    token = None
+    if lookups is None:
+        lookups = SingleFlight(keep=lambda result: "error" not in result)
+        token = es_lookups.set(lookups)
+    try:
+        with tracing.span("stage.elasticsearch_check", rows=len(audit_df)) as span, \
+                memory.stage("elasticsearch_check"):
+            audit_df_with_es = checkpoint.batched("elasticsearch_check", audit_df,
+                                                  lambda batch: elasticsearch_check_from_df(batch, auth_url),
+                                                  batch_size=es_batch_size)
+            span.set(**lookups.stats())
+    finally:
+        if token is not None:
+            es_lookups.reset(token)
+    if token is not None and lookups.requested:
+        stats = lookups.stats()
+        print(f"ES lookups: {stats['requested']} requested, {stats['executed']} executed "
+              f"(dedup ratio {stats['dedup_ratio']:.1%})")
+
+    with tracing.span("stage.finalized_transformation", rows=len(audit_df_with_es)), \
+            memory.stage("finalized_transformation"):
+        audit_df_with_es = checkpoint.stage("finalized_transformation",
+                                            lambda: add_finalized_transformation(audit_df_with_es))
+
+    audit_df_with_es.attrs["es_lookups"] = lookups.stats()
+    return audit_df_with_es
+
+
+# --- Audit Jobs ---
+# A job is a dict describing one audit run: sources, download_type, auth_url and report_path, plus optional
+# fields, definitions, incremental_state_dir (and incremental_full_refresh), checkpoint_dir, materialized_audit,
+# diff_state_dir, history_db and suggest_long_names (top-k). main() and the batch CLI both run jobs; the CLI also fans
+# a job with `targets` out to several databases (fanout.py).
+
+def job_definitions(job):
+    # a job's own definitions, else the registry's for its download type, else the example above
+    if job.get("definitions"):
+        return job["definitions"]
+    if definition_registry is not None:
+        return definition_registry.for_download_type(job["download_type"])
+    return field_mapping_definitions
+
+
+def job_checkpoint(job):
+    definitions = job_definitions(job)
+    return open_checkpoint(job.get("checkpoint_dir"), job["download_type"], sources=job["sources"],
+                           fields=job.get("fields") or tuple(definitions.keys()), auth_url=job["auth_url"],
+                           definitions=definitions, incremental=bool(job.get("incremental_state_dir")))
+
+
+def audit_job(conn, job, checkpoint=None):
+    checkpoint = checkpoint or NullCheckpointStore()
+    download_type = job["download_type"]
+    definitions = job_definitions(job)
+    canonical_fields = tuple(job.get("fields") or definitions.keys())
     cursor = conn.cursor()
+    stage_seconds = {}  # per-stage wall time, kept on the result for the audit history
+    started = time.perf_counter()
+
+    def lap(stage):
+        nonlocal started
+        now = time.perf_counter()
+        stage_seconds[stage] = round(now - started, 3)
+        started = now
+
+    with tracing.span("stage.reference_data", download_type=download_type), memory.stage("reference_data"):
+        source_info = checkpoint.stage("source_info", lambda: get_src_info(cursor, job["sources"], download_type))
+        field_info = checkpoint.stage("field_info", lambda: get_field_info(cursor, canonical_fields, download_type))
+    lap("reference_data")
+
+    statuses = None
+    if job.get("materialized_audit"):
+        with tracing.span("stage.audit_table", download_type=download_type):
+            refresh_audit_table(conn, download_type)
+            statuses = read_audit_statuses(cursor, download_type)
+
+    es_stats = {}
+
+    def audit_fn(pending):
+        result = run_audit_stages(cursor, pending, job["auth_url"], definitions=definitions, checkpoint=checkpoint,
+                                  statuses=statuses)
+        es_stats.update(result.attrs.get("es_lookups", {}))
+        return result
+
+    if job.get("incremental_state_dir"):
+        # stored rows are only reused while the definitions and the ES endpoint they were audited with are unchanged
+        audit_df_with_es = incremental_audit(cursor, source_info, field_info, download_type,
+                                             job["incremental_state_dir"], audit_fn,
+                                             full_refresh=bool(job.get("incremental_full_refresh")),
+                                             fingerprint=fingerprint_inputs(definitions=definitions,
+                                                                            auth_url=job["auth_url"]))
+    else:
+        with memory.stage("cross_product"):
+            master_list = [l1 + l2 for l1 in source_info for l2 in field_info]
+        audit_df_with_es = audit_fn(master_list)
+    lap("audit")
 
-    source_info = get_src_info(cursor, source_list, download_type)
-    field_info = get_field_info(cursor, canonical_fields, download_type)
-
-    master_list = [l1 + l2 for l1 in source_info for l2 in field_info]
-    audit_tups = mapping_audit(cursor, master_list)
-    audit_tups_with_proposals = append_proposed_fields(audit_tups, field_mapping_definitions)
-
-    initial_headers = ['Source', 'Protocol', 'Provider', 'Dataset ID', 'Class', 'Class Description', 'Download Type',
-                       'Field ID', 'Canonical Field Name', 'Mapping Status', 'Proposed Fields Short Name',
-                       'Proposed Transformation']
-    audit_df = pd.DataFrame(audit_tups_with_proposals, columns=initial_headers)
-
-    # Run Elasticsearch check and add 'es_Pass' and 'Proposed Fields Long Name'
-    audit_df_with_es = elasticsearch_check_from_df(audit_df, auth_url)
+    if job.get("suggest_long_names"):
+        with tracing.span("stage.suggestions", rows=len(audit_df_with_es)), memory.stage("suggestions"):
+            audit_df_with_es = add_long_name_suggestions(audit_df_with_es, job["auth_url"],
+                                                         top_k=int(job["suggest_long_names"]))
+        lap("suggestions")
 
-    audit_df_with_es = add_finalized_transformation(audit_df_with_es)
+    # Write final audit to Excel
+    if not checkpoint.is_done("excel_report"):
+        headers = FINAL_HEADERS + [SUGGESTION_HEADER] * (SUGGESTION_HEADER in audit_df_with_es.columns)
+        with tracing.span("stage.excel_report", rows=len(audit_df_with_es)), memory.stage("excel_report"):
+            write_updated_audit_to_excel(headers, audit_df_with_es[headers].values.tolist(), job["report_path"])
+        checkpoint.mark_done("excel_report", path=job["report_path"])
+    lap("excel_report")
+
+    # Delta report against the previous run; the stored baseline is replaced, so a resumed run must not repeat it
+    if job.get("diff_state_dir") and not checkpoint.is_done("diff"):
+        delta_path = f"{os.path.splitext(job['report_path'])[0]}_delta.xlsx"
+        with tracing.span("stage.diff", rows=len(audit_df_with_es)), memory.stage("diff"):
+            counts = audit_diff(audit_df_with_es, job["diff_state_dir"], job.get("name", download_type), delta_path)
+        audit_df_with_es.attrs["diff"] = counts
+        checkpoint.mark_done("diff", **counts)
+        lap("diff")
+
+    audit_df_with_es.attrs["stage_seconds"] = stage_seconds
+    audit_df_with_es.attrs["es_lookups"] = es_stats
+    cursor.close()
+    return audit_df_with_es
 
-    # Final headers for Excel output
-    final_headers = initial_headers + ['es_Pass', 'Proposed Fields Long Name', 'Finalized Transformation']
 
-    # Write final audit to Excel
-    write_updated_audit_to_excel(final_headers, audit_df_with_es.values.tolist(), out_file_name)
+def apply_audit_results(conn, audit_df_with_es, download_type, checkpoint=None, write_config=None):
+    checkpoint = checkpoint or NullCheckpointStore()
+    executor = WriteExecutor(conn, write_config)
+    completed = []
 
-    # Pause and prompt user to review the spreadsheet
-    input(
-        f"\n✅ Audit spreadsheet saved to '{out_file_name}'. Please review before continuing.\nPress Enter to proceed...")
+    def stage_done(name):
+        # in atomic mode nothing is durable before the final commit, so checkpoints wait for it
+        if executor.config.atomic:
+            completed.append(name)
+        else:
+            checkpoint.mark_done(name)
 
     # Generate Inserts and Updates for 'Not Mapped' Records
     unmapped_df = audit_df_with_es[
@@ -491,11 +919,18 @@ def main():
         (audit_df_with_es['es_Pass'] == 'Y')
         ]
     if not unmapped_df.empty:
+        mapping_ids = None  # stays None when a resumed run skips the canonical stage; origin inserts then look ids up
         print("\n--- Canonical Insert Statements ---")
-        canonical_inserts_from_df(unmapped_df, conn, download_type)
+        if not checkpoint.is_done("canonical_inserts"):
+            with tracing.span("stage.canonical_inserts", rows=len(unmapped_df)), memory.stage("canonical_inserts"):
+                mapping_ids = canonical_inserts_from_df(unmapped_df, conn, download_type, executor)
+            stage_done("canonical_inserts")
 
         print("\n--- Origin Insert Statements ---")
-        origin_inserts_from_df(unmapped_df, conn)
+        if not checkpoint.is_done("origin_inserts"):
+            with tracing.span("stage.origin_inserts", rows=len(unmapped_df)), memory.stage("origin_inserts"):
+                origin_inserts_from_df(unmapped_df, conn, executor, mapping_ids)
+            stage_done("origin_inserts")
 
     # Generate Updates for 'Deactivated' Records with valid metadata
     deactivated_df = audit_df_with_es[
@@ -504,13 +939,92 @@ def main():
         ]
     if not deactivated_df.empty:
         print("\n--- Canonical Update Statements ---")
-        canonical_updates_from_df(deactivated_df, conn)
+        if not checkpoint.is_done("canonical_updates"):
+            with tracing.span("stage.canonical_updates", rows=len(deactivated_df)), memory.stage("canonical_updates"):
+                canonical_updates_from_df(deactivated_df, conn, executor)
+            stage_done("canonical_updates")
 
         print("\n--- Origin Update Statements ---")
-        origin_updates_from_df(deactivated_df, conn)
+        if not checkpoint.is_done("origin_updates"):
+            with tracing.span("stage.origin_updates", rows=len(deactivated_df)), memory.stage("origin_updates"):
+                origin_updates_from_df(deactivated_df, conn, executor)
+            stage_done("origin_updates")
+
+    executor.finish()
+    for name in completed:
+        checkpoint.mark_done(name)
+
+    return dict(executor.summary(), unmapped=len(unmapped_df), deactivated=len(deactivated_df))
+
+
+# --- Main Execution ---
+def main():
+    global reference_cache, definition_registry
+    source_list = ['SRC_A', 'SRC_B', 'SRC_C']
+    download_type = 'agent'
+    canonical_fields = None  # None audits every defined field (field_mapping_definitions or the registry's)
+    auth_url = "https://placeholder-opensearch-url.com/api/search"
+    out_path = '/path/to/output/'
+    out_file_name = f"{out_path}Canonical_Audit_{download_type}_results.xlsx"
+    trace_file = None  # e.g. f"{out_path}Canonical_Audit_{download_type}_trace.jsonl" to record spans
+    incremental_state_dir = None  # e.g. f"{out_path}state/" to only re-audit pairs changed since the last run
+    checkpoint_dir = None  # e.g. f"{out_path}checkpoints/" to resume an interrupted run at its first incomplete stage
+    write_config = WriteConfig(chunk_size=500, savepoints=True)  # atomic=True applies every stage or none
+    diff_state_dir = None  # e.g. f"{out_path}diff/" to also write only the rows changed since the last run
+    materialized_audit = False  # True reads statuses from table_mapping_audit after a delta refresh (audit_table.py)
+    reference_cache_dir = None  # e.g. f"{out_path}reference/" to reuse reference data between runs while unchanged
+    bundle_dir = None  # e.g. f"{out_path}bundle_{download_type}/" to export a psql bundle instead of writing
+    history_db = None  # e.g. f"{out_path}audit_history.db" (or "postgres") to keep every run's rows for trends
+    suggest_long_names = 0  # e.g. 3 to suggest the closest tableSystemName values for NF fields in the report
+    profile_memory = False  # True records RSS and top allocation sites per stage (memory.py)
+    memory_budget_mb = None  # e.g. 4096 to stop at the first stage whose peak RSS goes over it (implies profiling)
+    definitions_source = None  # e.g. f"{out_path}definitions.csv" (or "db") instead of field_mapping_definitions
+    # For scheduled or unattended runs use the batch CLI instead: python -m ...mapping_automation.src.cli --help
+    # It also audits several databases at once: give a job `targets` (names in db_creds.DB_TARGETS), see fanout.py
+
+    if trace_file:
+        tracing.enable(trace_file)
+    if profile_memory or memory_budget_mb:
+        memory.enable(budget_mb=memory_budget_mb)
+    if reference_cache_dir:
+        reference_cache = ReferenceCache(reference_cache_dir)
+    if definitions_source:
+        definition_registry = DefinitionRegistry(definitions_source)
+
+    job = {"sources": source_list, "download_type": download_type, "fields": canonical_fields, "auth_url": auth_url,
+           "report_path": out_file_name, "incremental_state_dir": incremental_state_dir,
+           "checkpoint_dir": checkpoint_dir, "materialized_audit": materialized_audit,
+           "diff_state_dir": diff_state_dir, "suggest_long_names": suggest_long_names}
+    checkpoint = job_checkpoint(job)
+
+    conn = get_connection()
+    audit_df_with_es = audit_job(conn, job, checkpoint)
+    if history_db:
+        history = open_history(history_db, conn)
+        history.record_run(audit_df_with_es, download_type,
+                           metrics={"stage_seconds": audit_df_with_es.attrs["stage_seconds"],
+                                    "es_lookups": audit_df_with_es.attrs["es_lookups"], "memory": memory.report()})
+        history.close()
+
+    # Pause and prompt user to review the spreadsheet
+    input(
+        f"\n✅ Audit spreadsheet saved to '{out_file_name}'. Please review before continuing.\nPress Enter to proceed...")
+
+    if bundle_dir:
+        from Automation_Scripts.mapping_automation.src.bundle import write_bundle
+        write_bundle(bundle_dir, audit_df_with_es, download_type)
+    else:
+        apply_audit_results(conn, audit_df_with_es, download_type, checkpoint, write_config)
+        if materialized_audit:
+            refresh_audit_table(conn, download_type)
 
-    cursor.close()
     conn.close()
+    checkpoint.finish()
+    tracing.disable()
+    if memory.is_enabled():
+        print("\n--- Memory by Stage ---")
+        memory.print_report(memory.report())
+        memory.disable()
 
 
 if __name__ == "__main__":
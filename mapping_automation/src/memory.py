@@ -0,0 +1,148 @@
+# --- Imports ---
+import contextlib
+import linecache
+import os
+import resource
+import threading
+import time
+import tracemalloc
+
+
+# --- Memory Profiling ---
+# Opt-in like tracing: until enable() is called every stage() is a shared no-op context. When enabled, each stage
+# records RSS at its boundaries and its sampled peak RSS, the Python heap size and peak from tracemalloc, and the
+# allocation sites that grew the most between the tracemalloc snapshots taken at its start and end. With a budget,
+# a stage whose peak RSS went over it raises MemoryBudgetExceeded at its boundary, before the next stage adds to it.
+# RSS is process-wide, so profile one job at a time (main() or the batch CLI), not the multi-worker service.
+
+_profiler = None  # global placeholder, set by enable()
+_NULL_CONTEXT = contextlib.nullcontext()
+_IGNORED_FILES = (tracemalloc.__file__, linecache.__file__, "<frozen importlib._bootstrap>",
+                  "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    pass
+
+
+def current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # peak, where /proc is not available
+
+
+def _mb(n_bytes):
+    return round(n_bytes / (1024 * 1024), 1)
+
+
+class PeakRssSampler:
+    # samples RSS on a thread while its block runs; the benchmarks measure their stages with it too
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak_bytes = current_rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+        return False
+
+    @property
+    def peak_mb(self):
+        return _mb(self.peak_bytes)
+
+
+class MemoryProfiler:
+    def __init__(self, budget_mb=None, top=5, interval=0.01):
+        self.budget_mb = budget_mb
+        self.top = top
+        self.interval = interval
+        self.records = []
+
+    def _top_sites(self, before, after):
+        # grouped first and filtered after: Snapshot.filter_traces matches every trace in Python
+        stats = after.compare_to(before, "lineno")
+        growth = sorted((stat for stat in stats
+                         if stat.size_diff > 0 and stat.traceback[0].filename not in _IGNORED_FILES),
+                        key=lambda stat: stat.size_diff, reverse=True)
+        return [{"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 "size_kb": round(stat.size_diff / 1024, 1), "count": stat.count_diff}
+                for stat in growth[:self.top]]
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        rss_before = current_rss_bytes()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        started = time.perf_counter()
+        with PeakRssSampler(self.interval) as sampler:
+            yield
+
+        after = tracemalloc.take_snapshot()
+        py_current, py_peak = tracemalloc.get_traced_memory()
+        rss_after = current_rss_bytes()
+        record = {"stage": name, "seconds": round(time.perf_counter() - started, 3),
+                  "rss_mb": _mb(rss_after), "rss_delta_mb": _mb(rss_after - rss_before),
+                  "peak_rss_mb": _mb(sampler.peak_bytes), "py_current_mb": _mb(py_current),
+                  "py_peak_mb": _mb(py_peak), "top": self._top_sites(before, after)}
+        self.records.append(record)
+
+        if self.budget_mb is not None and record["peak_rss_mb"] > self.budget_mb:
+            sites = ", ".join(f"{site['site']} (+{site['size_kb']} KB)" for site in record["top"][:3]) or "-"
+            raise MemoryBudgetExceeded(f"Stage '{name}' peaked at {record['peak_rss_mb']} MB RSS, over the "
+                                       f"{self.budget_mb} MB budget; largest allocation sites: {sites}")
+
+
+def enable(budget_mb=None, top=5, frames=1):
+    global _profiler
+    disable()
+    tracemalloc.start(frames)
+    _profiler = MemoryProfiler(budget_mb, top)
+    return _profiler
+
+
+def disable():
+    global _profiler
+    if _profiler is not None:
+        _profiler = None
+        tracemalloc.stop()
+
+
+def is_enabled():
+    return _profiler is not None
+
+
+def stage(name):
+    if _profiler is None:
+        return _NULL_CONTEXT
+    return _profiler.stage(name)
+
+
+def report(reset=False):
+    # stage records since enable() (or the last reset)
+    if _profiler is None:
+        return []
+    records = list(_profiler.records)
+    if reset:
+        _profiler.records.clear()
+    return records
+
+
+def print_report(records):
+    for record in records:
+        print(f"  {record['stage']:<28} rss={record['rss_mb']:>8} MB  peak={record['peak_rss_mb']:>8} MB  "
+              f"delta={record['rss_delta_mb']:>7} MB  py_peak={record['py_peak_mb']:>7} MB")
+        for site in record["top"]:
+            print(f"      +{site['size_kb']:>10} KB  {site['count']:>+8}  {site['site']}")
@@ -0,0 +1,120 @@
+# --- Imports ---
+import os
+import threading
+import time
+
+from Automation_Scripts.mapping_automation.src import tracing
+from Automation_Scripts.mapping_automation.src.jsonfile import read_json, write_json
+
+
+# --- Reference Data Cache ---
+# Keeps the reference tables behind get_src_info / get_field_info in memory, one snapshot per (table, download_type):
+# every dataset/source row or canonical field of that download type. Before a snapshot is reused it is validated with
+# one aggregate query (row count and max(last_update_ts)); only a changed signature reloads it. Lookups for any mix
+# of sources, fields and download types are then answered from memory.
+#
+# One instance is safe to share between threads (service workers). With `path`, snapshots are also stored as JSON
+# files there, so separate processes (parallel CLI runs, service restarts) start from them and only validate.
+# `max_age` skips validation for snapshots checked less than that many seconds ago.
+
+SNAPSHOTS = {
+    "src_info": {
+        "signature": """  select count(*), max(cls.last_update_ts), max(info.last_update_ts)
+                          from table_dataset_config cls
+                                  join table_source_info info on info.id = cls.dataset_id
+                          where cls.download_type = '{dl_type}';""",
+        "rows": """  select  info.source, info.protocol, info.provider, cls.dataset_id, cls.dataset_name, cls.dataset_description, '{dl_type}' AS download_type
+                     from table_dataset_config cls
+                             join table_source_info info on info.id = cls.dataset_id
+                     where cls.download_type = '{dl_type}';""",
+    },
+    "field_info": {
+        "signature": """  select count(*), max(last_update_ts)
+                          from table_canonical_fields
+                          where download_type = '{dl_type}';""",
+        "rows": """  select id, name
+                     from table_canonical_fields
+                     where download_type = '{dl_type}';""",
+    },
+}
+
+
+class ReferenceCache:
+    def __init__(self, path=None, max_age=0):
+        self.path = path
+        self.max_age = max_age
+        self.hits = 0
+        self.reloads = 0
+        self._snapshots = {}  # (kind, dl_type, scope) -> {"signature": [...], "rows": [...], "checked": monotonic}
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    # scope names the database a cursor belongs to (a fan-out target); each scope keeps its own snapshots
+    def src_info(self, cursor, src_list, dl_type, scope=None):
+        sources = set(src_list)
+        return [row for row in self._rows(cursor, "src_info", dl_type, scope) if row[0] in sources]
+
+    def field_info(self, cursor, fields, dl_type, scope=None):
+        names = set(fields)
+        return [row for row in self._rows(cursor, "field_info", dl_type, scope) if row[1] in names]
+
+    def invalidate(self, dl_type=None):
+        with self._lock:
+            for key in [key for key in self._snapshots if dl_type is None or key[1] == dl_type]:
+                del self._snapshots[key]
+
+    def stats(self):
+        return {"snapshots": len(self._snapshots), "hits": self.hits, "reloads": self.reloads}
+
+    # snapshots
+    def _file(self, kind, dl_type, scope=None):
+        prefix = f"reference_{scope}_" if scope else "reference_"
+        return os.path.join(self.path, f"{prefix}{kind}_{dl_type}.json")
+
+    def _rows(self, cursor, kind, dl_type, scope=None):
+        # The lock only guards the snapshot dict and the counters. Queries and file I/O run outside it, so a slow
+        # database or disk never holds up lookups of other keys; two threads missing the same key may both load it.
+        key = (kind, dl_type, scope)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        if snapshot is None and self.path:
+            snapshot = self._load_file(kind, dl_type, scope)
+        if snapshot is not None and time.monotonic() - snapshot["checked"] < self.max_age:
+            with self._lock:
+                self.hits += 1
+            return snapshot["rows"]
+
+        queries = SNAPSHOTS[kind]
+        tracing.execute(cursor, queries["signature"].format(dl_type=dl_type), f"{kind}_signature",
+                        download_type=dl_type)
+        signature = [str(value) if value is not None else None for value in cursor.fetchone()]
+        reloaded = snapshot is None or snapshot["signature"] != signature
+        if reloaded:
+            tracing.execute(cursor, queries["rows"].format(dl_type=dl_type), f"{kind}_snapshot",
+                            download_type=dl_type)
+            snapshot = {"signature": signature, "rows": [tuple(row) for row in cursor.fetchall()]}
+            if self.path:
+                self._save_file(kind, dl_type, snapshot, scope)
+        # published snapshots are never mutated, other threads may be reading them
+        snapshot = dict(snapshot, checked=time.monotonic())
+
+        with self._lock:
+            self._snapshots[key] = snapshot
+            if reloaded:
+                self.reloads += 1
+            else:
+                self.hits += 1
+        return snapshot["rows"]
+
+    def _load_file(self, kind, dl_type, scope=None):
+        try:
+            stored = read_json(self._file(kind, dl_type, scope))
+        except (OSError, ValueError):
+            return None
+        # loaded snapshots are always validated once before use
+        return {"signature": stored["signature"], "rows": [tuple(row) for row in stored["rows"]],
+                "checked": float("-inf")}
+
+    def _save_file(self, kind, dl_type, snapshot, scope=None):
+        write_json(self._file(kind, dl_type, scope), {"signature": snapshot["signature"], "rows": snapshot["rows"]})
@@ -0,0 +1,280 @@
+# --- Imports ---
+import argparse
+import datetime
+import json
+import os
+import re
+import signal
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Automation_Scripts.mapping_automation.src import main as mapping
+from Automation_Scripts.mapping_automation.src.cli import load_approvals, normalize_job, run_job
+from Automation_Scripts.mapping_automation.src.jsonfile import write_json
+
+
+# --- Metadata Cache ---
+class MetadataCache:
+    # LRU of ES lookup results shared by every job in the service; entries expire after ttl seconds
+    def __init__(self, max_entries=100000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# --- Audit Service ---
+# Jobs are queued as JSON files in {spool_dir}/incoming/ (written directly or through the HTTP API), claimed by
+# renaming them into running/, and moved to done/ or failed/ once finished. Every job gets a report in reports/.
+# A job file holds one job dict as accepted by the batch CLI, plus an optional "command" (default "audit").
+
+SPOOL_DIRS = ("incoming", "running", "done", "failed", "reports")
+JOB_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")  # ids become spool file names, so no dots or separators
+
+
+def new_job_id():
+    return f"{datetime.datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+class AuditService:
+    def __init__(self, spool_dir, workers=4, defaults=None, approve_all=False, approval_file=None,
+                 poll_interval=1.0, host="127.0.0.1", port=None):
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self.defaults = defaults or {}
+        self.approve_all = approve_all
+        self.approval_file = approval_file
+        self.poll_interval = poll_interval
+        self.host = host
+        self.port = port
+        self.stats = Counter()
+        self.http_server = None
+        self._executor = None
+        self._running = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.reference_dir = os.path.join(spool_dir, "reference")  # validated snapshots survive restarts
+        for name in SPOOL_DIRS:
+            os.makedirs(os.path.join(spool_dir, name), exist_ok=True)
+
+    def _path(self, folder, job_id):
+        if not isinstance(job_id, str) or not JOB_ID_PATTERN.fullmatch(job_id):
+            raise ValueError(f"Invalid job id {job_id!r}: use letters, digits, '_' and '-' only")
+        return os.path.join(self.spool_dir, folder, f"{job_id}.json")
+
+    # warm state shared by all jobs
+    def warm_up(self):
+        if mapping.pool is None:
+            mapping.pool = mapping.create_pool(threaded=True)
+        if mapping.http_session is None:
+            mapping.http_session = mapping.requests.Session()
+        if mapping.metadata_cache is None:
+            mapping.metadata_cache = MetadataCache()
+        if mapping.reference_cache is None:
+            mapping.reference_cache = mapping.ReferenceCache(self.reference_dir)
+
+    # queue
+    def submit(self, job):
+        job_id = job.get("id") or new_job_id()
+        write_json(self._path("incoming", job_id), dict(job, id=job_id), indent=2)
+        return job_id
+
+    def requeue_interrupted(self):
+        # jobs left in running/ by a stopped service start over; checkpoint_dir makes that cheap
+        for name in os.listdir(os.path.join(self.spool_dir, "running")):
+            os.replace(os.path.join(self.spool_dir, "running", name), os.path.join(self.spool_dir, "incoming", name))
+
+    def poll_once(self):
+        incoming = os.path.join(self.spool_dir, "incoming")
+        names = sorted((name for name in os.listdir(incoming)
+                        if name.endswith(".json") and JOB_ID_PATTERN.fullmatch(name[:-len(".json")])),
+                       key=lambda name: os.path.getmtime(os.path.join(incoming, name)))
+        claimed = 0
+        for name in names:
+            job_id = name[:-len(".json")]
+            try:
+                os.replace(os.path.join(incoming, name), self._path("running", job_id))
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                self._running[job_id] = self._executor.submit(self._run, job_id)
+            claimed += 1
+        return claimed
+
+    def _run(self, job_id):
+        running_path = self._path("running", job_id)
+        try:
+            with open(running_path, encoding="utf-8") as f:
+                job = json.load(f)
+            command = job.pop("command", "audit")
+            job = normalize_job(dict(self.defaults, **job))
+            if mapping.definition_registry is not None:
+                mapping.definition_registry.refresh()  # edited definitions apply from the next job on
+            approvals = load_approvals(self.approval_file) if self.approval_file else set()
+            report = run_job(command, job, self.approve_all, approvals)
+        except Exception as e:
+            report = {"job": job_id, "status": "failed", "error": str(e)}
+
+        report.update(id=job_id, finished=datetime.datetime.now().isoformat(timespec="seconds"))
+        write_json(self._path("reports", job_id), report, indent=2)
+        os.replace(running_path, self._path("failed" if report["status"] == "failed" else "done", job_id))
+        with self._lock:
+            self.stats[report["status"]] += 1
+            self._running.pop(job_id, None)
+        return report
+
+    def status(self, job_id):
+        if os.path.exists(self._path("reports", job_id)):
+            with open(self._path("reports", job_id), encoding="utf-8") as f:
+                return json.load(f)
+        for folder, state in (("running", "running"), ("incoming", "queued")):
+            if os.path.exists(self._path(folder, job_id)):
+                return {"id": job_id, "status": state}
+        return None
+
+    def health(self):
+        cache = mapping.metadata_cache
+        registry = mapping.definition_registry
+        with self._lock:
+            running = len(self._running)
+        return {"running": running, "completed": dict(self.stats),
+                "queued": len(os.listdir(os.path.join(self.spool_dir, "incoming"))),
+                "cache_entries": len(cache) if cache is not None else 0,
+                "cache_hits": getattr(cache, "hits", 0), "cache_misses": getattr(cache, "misses", 0),
+                "reference": mapping.reference_cache.stats() if mapping.reference_cache is not None else {},
+                "definitions": registry.stats() if registry is not None else {}}
+
+    # lifecycle
+    def start(self):
+        self.warm_up()
+        self.requeue_interrupted()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="audit-job")
+        if self.port is not None:
+            self.http_server = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+            self.port = self.http_server.server_address[1]
+            threading.Thread(target=self.http_server.serve_forever, daemon=True).start()
+            print(f"Audit service listening on http://{self.host}:{self.port}")
+        return self
+
+    def serve_forever(self):
+        self.start()
+        print(f"Audit service watching '{os.path.join(self.spool_dir, 'incoming')}' with {self.workers} workers")
+        while not self._stop.is_set():
+            if not self.poll_once():
+                self._stop.wait(self.poll_interval)
+        self.shutdown()
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def shutdown(self):
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.http_server = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# --- HTTP API ---
+# POST /jobs (job JSON) -> {"id": ...}; GET /jobs/<id> -> job report or queued/running status; GET /health
+
+def _make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                return self._send(404, {"error": "not found"})
+            try:
+                job = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                normalize_job(dict(service.defaults, **{k: v for k, v in job.items() if k != "command"}))
+                job_id = service.submit(job)
+            except (ValueError, TypeError) as e:
+                return self._send(400, {"error": str(e)})
+            self._send(202, {"id": job_id})
+
+        def do_GET(self):
+            if self.path == "/health":
+                return self._send(200, service.health())
+            if self.path.startswith("/jobs/"):
+                try:
+                    status = service.status(self.path[len("/jobs/"):])
+                except ValueError as e:
+                    return self._send(400, {"error": str(e)})
+                return self._send(200, status) if status else self._send(404, {"error": "unknown job"})
+            self._send(404, {"error": "not found"})
+
+    return Handler
+
+
+# --- Command Line ---
+def main():
+    parser = argparse.ArgumentParser(description="Run audit jobs from a spool directory and a localhost HTTP API.")
+    parser.add_argument("spool_dir")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, help="serve the HTTP API on 127.0.0.1:<port>")
+    parser.add_argument("--defaults", help="JSON file with defaults merged into every job (auth_url, out_path, ...)")
+    parser.add_argument("--approve", action="store_true", help="approve inserts/updates for every job")
+    parser.add_argument("--approval-file", help="file listing approved job names, re-read for every job")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--definitions", help="field definitions (JSON/YAML/CSV file or 'db'), reloaded when they "
+                                              "change")
+    args = parser.parse_args()
+
+    defaults = {}
+    if args.defaults:
+        with open(args.defaults, encoding="utf-8") as f:
+            defaults = json.load(f)
+    if args.definitions:
+        mapping.definition_registry = mapping.DefinitionRegistry(args.definitions)
+
+    service = AuditService(args.spool_dir, workers=args.workers, defaults=defaults, approve_all=args.approve,
+                           approval_file=args.approval_file, poll_interval=args.poll_interval, port=args.port)
+    signal.signal(signal.SIGTERM, service.stop)
+    signal.signal(signal.SIGINT, service.stop)
+    service.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
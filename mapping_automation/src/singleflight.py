@@ -0,0 +1,61 @@
+# --- Imports ---
+import threading
+
+
+# --- Single-Flight Lookups ---
+# Memoizes calls by their arguments for the lifetime of one run. The first caller of a key executes it; callers
+# arriving while it is in flight wait for that result instead of issuing their own, and later callers read it from
+# memory. Results for which keep(result) is false (ES error payloads) are handed to the waiters but not kept, so the
+# next caller retries. Exceptions are re-raised in every waiting caller.
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, keep=None):
+        self.keep = keep or (lambda result: True)
+        self.requested = 0
+        self.executed = 0
+        self._results = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def call(self, fn, *args):
+        with self._lock:
+            self.requested += 1
+            if args in self._results:
+                return self._results[args]
+            flight = self._flights.get(args)
+            leader = flight is None
+            if leader:
+                flight = self._flights[args] = _Flight()
+                self.executed += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn(*args)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None and self.keep(flight.result):
+                    self._results[args] = flight.result
+                del self._flights[args]
+            flight.done.set()
+        return flight.result
+
+    def stats(self):
+        with self._lock:
+            shared = self.requested - self.executed
+            return {"requested": self.requested, "executed": self.executed, "deduplicated": shared,
+                    "dedup_ratio": round(shared / self.requested, 4) if self.requested else 0.0}
@@ -0,0 +1,80 @@
+# --- Imports ---
+import re
+from collections import defaultdict
+
+
+# --- Trigram Index ---
+# Approximate matching of proposed names against the metadata of one class, the way pg_trgm does it: names are split
+# into words (camelCase and separators), lowercased and padded, and two names score by the Jaccard similarity of their
+# trigram sets. Posting lists map each trigram to the entries containing it; on the first search they are frozen into
+# numpy arrays, and a lookup counts shared trigrams for all entries with one bincount, which keeps it in the
+# millisecond range with tens of thousands of fields per class.
+
+_CAMEL = re.compile(r"([a-z0-9])([A-Z])")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def trigrams(name):
+    grams = set()
+    for word in _WORD.findall(_CAMEL.sub(r"\1 \2", str(name)).lower()):
+        padded = f"  {word} "
+        grams.update(padded[idx:idx + 3] for idx in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    def __init__(self, entries=()):
+        # entries: (text, value) pairs; a value indexed under several texts scores by its best one
+        self._values = []
+        self._sizes = []
+        self._postings = defaultdict(list)
+        self._frozen = None
+        for text, value in entries:
+            self.add(text, value)
+
+    def add(self, text, value):
+        grams = trigrams(text) if text else set()
+        if not grams:
+            return
+        idx = len(self._values)
+        self._values.append(value)
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings[gram].append(idx)
+        self._frozen = None
+
+    def __len__(self):
+        return len(self._values)
+
+    def _freeze(self):
+        import numpy as np  # loaded with pandas; only needed once an index is searched
+        if self._frozen is None:
+            self._frozen = (np, {gram: np.array(ids, dtype=np.int32) for gram, ids in self._postings.items()},
+                            np.array(self._sizes, dtype=np.float64))
+        return self._frozen
+
+    def search(self, name, top_k=3, min_score=0.3):
+        # [(value, score)] best first
+        grams = trigrams(name)
+        if not grams or not self._values:
+            return []
+        np, postings, sizes = self._freeze()
+        hits = [postings[gram] for gram in grams if gram in postings]
+        if not hits:
+            return []
+
+        shared = np.bincount(np.concatenate(hits), minlength=len(self._values))
+        candidates = np.flatnonzero(shared)
+        scores = shared[candidates] / (len(grams) + sizes[candidates] - shared[candidates])
+        keep = scores >= min_score
+        candidates, scores = candidates[keep], scores[keep]
+
+        results, seen = [], set()
+        for pos in np.argsort(-scores, kind="stable"):
+            value = self._values[candidates[pos]]
+            if value not in seen:
+                seen.add(value)
+                results.append((value, round(float(scores[pos]), 3)))
+                if len(results) == top_k:
+                    break
+        return results
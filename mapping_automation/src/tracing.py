@@ -0,0 +1,202 @@
+# --- Imports ---
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+
+# --- Span Tracing ---
+# Tracing is opt-in: until enable() is called every span() is a shared no-op context
+# and execute() is a plain cursor.execute(), so leaving the calls in the hot loops is free.
+
+_sink = None  # global placeholder, set by enable()
+_trace_id = None
+_span_ids = itertools.count(1)
+_local = threading.local()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_NULL_CONTEXT = contextlib.nullcontext(_NULL_SPAN)
+
+
+class JsonlSink:
+    def __init__(self, path, buffer_size=1 << 20):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8", buffering=buffer_size)
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=str, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Span:
+    __slots__ = ("name", "attributes", "span_id", "parent_id", "start_ns", "_t0", "status")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.status = "OK"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent_id = stack[-1].span_id if stack else None
+        self.span_id = f"{next(_span_ids):016x}"
+        self.start_ns = time.time_ns()
+        self._t0 = time.perf_counter_ns()
+        stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ns = time.perf_counter_ns() - self._t0
+        _stack().pop()
+        if exc_type is not None:
+            self.status = "ERROR"
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        sink = _sink
+        if sink is not None:
+            sink.write({
+                "traceId": _trace_id,
+                "spanId": self.span_id,
+                "parentSpanId": self.parent_id,
+                "name": self.name,
+                "startTimeUnixNano": self.start_ns,
+                "endTimeUnixNano": self.start_ns + duration_ns,
+                "durationMs": round(duration_ns / 1e6, 3),
+                "status": self.status,
+                "threadId": threading.get_ident(),
+                "attributes": self.attributes,
+            })
+        return False
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def enable(path):
+    global _sink, _trace_id
+    disable()
+    _trace_id = os.urandom(16).hex()
+    _sink = JsonlSink(path)
+    return _trace_id
+
+
+def disable():
+    global _sink
+    sink, _sink = _sink, None
+    if sink is not None:
+        sink.close()
+
+
+def is_enabled():
+    return _sink is not None
+
+
+def span(name, **attributes):
+    if _sink is None:
+        return _NULL_CONTEXT
+    return Span(name, attributes)
+
+
+def _rowcount(cursor):
+    rowcount = getattr(cursor, "rowcount", None)
+    return rowcount if isinstance(rowcount, int) and rowcount >= 0 else None
+
+
+def execute(cursor, qry, kind, **attributes):
+    if _sink is None:
+        return cursor.execute(qry)
+    with Span(f"sql.{kind}", attributes) as s:
+        result = cursor.execute(qry)
+        s.attributes["rows"] = _rowcount(cursor)
+        return result
+
+
+# --- Offline Analysis ---
+def load_spans(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def to_chrome_trace(spans, out_path):
+    # Chrome trace-event format, viewable as a flame-style timeline in Perfetto or chrome://tracing
+    events = []
+    for s in spans:
+        events.append({
+            "name": s["name"],
+            "cat": s["name"].split(".", 1)[0],
+            "ph": "X",
+            "ts": s["startTimeUnixNano"] / 1000,
+            "dur": (s["endTimeUnixNano"] - s["startTimeUnixNano"]) / 1000,
+            "pid": s.get("traceId") or 0,
+            "tid": s.get("threadId", 0),
+            "args": s.get("attributes", {}),
+        })
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
+
+
+def summarize(spans, group_by=None):
+    children_ms = defaultdict(float)
+    for s in spans:
+        if s.get("parentSpanId"):
+            children_ms[s["parentSpanId"]] += s["durationMs"]
+
+    summary = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "self_ms": 0.0, "max_ms": 0.0})
+    for s in spans:
+        key = s["name"]
+        if group_by:
+            key = (key, s.get("attributes", {}).get(group_by))
+        entry = summary[key]
+        entry["count"] += 1
+        entry["total_ms"] += s["durationMs"]
+        entry["self_ms"] += s["durationMs"] - children_ms.get(s["spanId"], 0.0)
+        entry["max_ms"] = max(entry["max_ms"], s["durationMs"])
+
+    return sorted(summary.items(), key=lambda item: item[1]["self_ms"], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a span trace written by tracing.enable().")
+    parser.add_argument("trace_file")
+    parser.add_argument("--group-by", help="span attribute to break totals down by, e.g. dataset_id")
+    parser.add_argument("--chrome", help="also write a Chrome trace-event timeline to this path")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    spans = load_spans(args.trace_file)
+    for key, entry in summarize(spans, args.group_by)[:args.top]:
+        print(f"{str(key):<60} count={entry['count']:<8} total={entry['total_ms']:.1f}ms "
+              f"self={entry['self_ms']:.1f}ms max={entry['max_ms']:.1f}ms")
+
+    if args.chrome:
+        count = to_chrome_trace(spans, args.chrome)
+        print(f"Timeline with {count} spans written to '{args.chrome}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# --- Imports ---
+from Automation_Scripts.mapping_automation.src import tracing
+
+
+# --- Write Executor ---
+# Shared by the four insert/update generators. With the default WriteConfig every statement runs directly and
+# each stage commits once at its end, as before. chunk_size commits every N written rows (a multi-row INSERT counts
+# each of its rows and is split so no chunk holds more than N), savepoints wraps each chunk in a SAVEPOINT so a
+# failing statement is rolled back on its own and reported instead of aborting the batch, and atomic keeps every
+# stage in one transaction that is committed by finish().
+
+class WriteConfig:
+    def __init__(self, chunk_size=None, savepoints=False, atomic=False):
+        self.chunk_size = chunk_size
+        self.savepoints = savepoints
+        self.atomic = atomic
+
+    def __repr__(self):
+        return f"WriteConfig(chunk_size={self.chunk_size}, savepoints={self.savepoints}, atomic={self.atomic})"
+
+
+class WriteExecutor:
+    def __init__(self, conn, config=None):
+        self.conn = conn
+        self.config = config or WriteConfig()
+        self.statements = 0
+        self.commits = 0
+        self.failures = []
+        self._cursor = None
+        self._savepoint = None
+        self._chunk_no = 0
+        self._in_chunk = 0
+        self._pending = []  # statements that succeeded inside the open savepoint, replayed after a rollback
+
+    def execute(self, cursor, stmt, kind, fetch=False, **attrs):
+        # fetch=True returns the statement's rows (e.g. INSERT ... RETURNING); [] if the statement failed.
+        # attrs["rows"] is the number of rows the statement writes (1 if not given)
+        self._cursor = cursor
+        rows = None
+        written = attrs.get("rows", 1)
+        if self.config.savepoints:
+            self._open_chunk()
+            entry = (stmt, kind, attrs)
+            try:
+                tracing.execute(cursor, stmt, kind, **attrs)
+                rows = cursor.fetchall() if fetch else None
+                self._pending.append(entry)
+            except Exception as e:
+                self._isolate(entry, e)
+                rows = [] if fetch else None
+                written = 0  # rolled back; a retry of its rows counts them again
+            if fetch:
+                # returned ids must stay valid, so a later failure in this chunk must not roll this statement back
+                self._release_savepoint()
+        else:
+            tracing.execute(cursor, stmt, kind, **attrs)
+            rows = cursor.fetchall() if fetch else None
+
+        self.statements += 1
+        self._in_chunk += written
+        if self.config.chunk_size and self._in_chunk >= self.config.chunk_size:
+            self._end_chunk(commit=not self.config.atomic)
+        return rows
+
+    def execute_batch(self, cursor, rows, build, kind, fetch=False):
+        # rows: [(values, attrs)] for multi-row statements, build([values, ...]) -> statement. With chunk_size the
+        # rows are split so each statement fits in what is left of the current chunk
+        result = [] if fetch else None
+        start = 0
+        while start < len(rows):
+            size = len(rows) - start
+            if self.config.chunk_size:
+                size = min(size, self.config.chunk_size - self._in_chunk)
+            returned = self._execute_rows(cursor, rows[start:start + size], build, kind, fetch)
+            if fetch:
+                result.extend(returned)
+            start += size
+        return result
+
+    def _execute_rows(self, cursor, rows, build, kind, fetch):
+        # Under savepoints a failing statement is retried row by row, so only the rows that fail themselves are
+        # rolled back and each one is reported with its own attrs instead of the whole batch being lost
+        stmt = build([values for values, _ in rows])
+        before = len(self.failures)
+        result = self.execute(cursor, stmt, kind, fetch=fetch, rows=len(rows))
+        if len(self.failures) == before or len(rows) == 1:
+            return result
+
+        self.failures[before:] = [failure for failure in self.failures[before:]
+                                  if failure["statement"] != stmt.strip()]
+        result = [] if fetch else None
+        for values, attrs in rows:
+            returned = self.execute(cursor, build([values]), kind, fetch=fetch, **attrs)
+            if fetch:
+                result.extend(returned)
+        return result
+
+    def commit(self):
+        # called at the end of each write stage
+        self._end_chunk(commit=not self.config.atomic)
+
+    def finish(self):
+        self._end_chunk(commit=True)
+        if self.failures:
+            print(f"{len(self.failures)} write statement(s) failed and were rolled back:")
+            for failure in self.failures:
+                print(f"  {failure['kind']} {failure['attrs']}: {failure['error']}")
+
+    def rollback(self):
+        self._savepoint = None
+        self._pending = []
+        self._in_chunk = 0
+        self.conn.rollback()
+
+    def summary(self):
+        return {"statements": self.statements, "commits": self.commits, "failed": len(self.failures)}
+
+    # chunks
+    def _open_chunk(self):
+        if self._savepoint is not None:
+            return
+        if getattr(self.conn, "in_transaction", True) is False:
+            # sqlite3 does not open a transaction for SAVEPOINT, and releasing an outermost savepoint commits
+            self._cursor.execute("BEGIN")
+        self._chunk_no += 1
+        self._savepoint = f"write_chunk_{self._chunk_no}"
+        self._cursor.execute(f"SAVEPOINT {self._savepoint}")
+
+    def _release_savepoint(self):
+        if self._savepoint is not None:
+            self._cursor.execute(f"RELEASE SAVEPOINT {self._savepoint}")
+            self._savepoint = None
+        self._pending = []
+
+    def _end_chunk(self, commit):
+        self._release_savepoint()
+        self._in_chunk = 0
+        if commit:
+            self.conn.commit()
+            self.commits += 1
+
+    def _isolate(self, failed, error):
+        # roll the chunk back to its savepoint and replay the statements that succeeded, dropping the failed one
+        todo = list(self._pending)
+        while True:
+            self.failures.append({"kind": failed[1], "attrs": failed[2], "error": str(error).strip(),
+                                  "statement": failed[0].strip()})
+            self._cursor.execute(f"ROLLBACK TO SAVEPOINT {self._savepoint}")
+            self._pending = []
+            for idx, entry in enumerate(todo):
+                try:
+                    tracing.execute(self._cursor, entry[0], entry[1], **entry[2])
+                    self._pending.append(entry)
+                except Exception as e:
+                    failed, error = entry, e
+                    todo = self._pending + todo[idx + 1:]
+                    break
+            else:
+                return
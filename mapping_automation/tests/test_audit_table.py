@@ -0,0 +1,84 @@
+# tests/test_audit_table.py
+import unittest
+from unittest.mock import MagicMock, patch
+from ..benchmarks.synthetic import generate
+from ..benchmarks.db_harness import LocalDatabase
+from ..src.audit_table import read_audit_statuses, refresh_audit_table
+from ..src.main import get_src_info, get_field_info, mapping_audit
+
+
+@patch("builtins.print")
+class TestAuditTable(unittest.TestCase):
+
+    def setUp(self):
+        self.data = generate(200, download_type="listing", seed=5)
+        self.db = LocalDatabase("sqlite").start().load(self.data)
+        self.db.execute("UPDATE table_mapping SET last_update_ts = '2020-01-01 00:00:00'")
+        self.conn = self.db.connection()
+        self.cursor = self.conn.cursor()
+        source_info = get_src_info(self.cursor, self.data.sources, "listing")
+        field_info = get_field_info(self.cursor, self.data.canonical_fields, "listing")
+        self.master_list = [l1 + l2 for l1 in source_info for l2 in field_info]
+
+    def tearDown(self):
+        self.db.stop()
+
+    def test_first_refresh_installs_table_and_matches_row_by_row_audit(self, mock_print):
+        # Act
+        refreshed = refresh_audit_table(self.conn, "listing")
+        with self.db.stage("read"):
+            statuses = read_audit_statuses(self.cursor, "listing")
+
+        # Assert
+        self.assertEqual(refreshed, len(self.data.mappings))
+        self.assertEqual(mapping_audit(self.cursor, self.master_list, statuses),
+                         mapping_audit(self.cursor, self.master_list))
+        self.assertEqual(self.db.statements("read"), 1)
+
+    def test_delta_refresh_recomputes_only_changed_keys(self, mock_print):
+        # Arrange
+        self.db.execute(f"UPDATE table_mapping SET last_update_ts = '2021-01-01 00:00:00' "
+                        f"WHERE id = {self.data.mappings[-1][0]}")
+        refresh_audit_table(self.conn, "listing")
+        mapping_id = self.data.mappings[0][0]
+        self.db.execute(f"UPDATE table_mapping SET is_active = NOT is_active, last_update_ts = '2030-01-01 00:00:00' "
+                        f"WHERE id = {mapping_id}")
+
+        # Act
+        refreshed = refresh_audit_table(self.conn, "listing")
+        statuses = read_audit_statuses(self.cursor, "listing")
+
+        # Assert: the changed key plus the key stamped at the previous watermark
+        self.assertEqual(refreshed, 2)
+        self.assertEqual(mapping_audit(self.cursor, self.master_list, statuses),
+                         mapping_audit(self.cursor, self.master_list))
+
+    def test_view_reports_every_dataset_field_pair(self, mock_print):
+        # Act
+        refresh_audit_table(self.conn, "listing")
+
+        # Assert
+        self.assertEqual(self.db.scalar("SELECT COUNT(*) FROM view_mapping_audit WHERE download_type = 'listing'"),
+                         len(self.master_list))
+        self.assertEqual(self.db.scalar("SELECT COUNT(*) FROM view_mapping_audit WHERE status = 'Not Mapped'"),
+                         len(self.master_list) - len(self.data.mappings))
+
+
+class TestMappingAuditStatuses(unittest.TestCase):
+
+    def test_statuses_skip_per_row_queries(self):
+        # Arrange
+        cursor = MagicMock()
+        rows = [('SRC_A', 'RETS', 'P', 1, 'Class', 'Desc', 'agent', 10, 'IS_ACTIVE'),
+                ('SRC_A', 'RETS', 'P', 2, 'Class', 'Desc', 'agent', 10, 'IS_ACTIVE')]
+
+        # Act
+        result = mapping_audit(cursor, rows, {(1, 'Class', 10): 'Deactivated'})
+
+        # Assert
+        self.assertEqual([row[-1] for row in result], ['Deactivated', 'Not Mapped'])
+        cursor.execute.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# tests/test_benchmarks.py
+import json
+import unittest
+from ..benchmarks.synthetic import generate, parse_scale
+from ..benchmarks.run_benchmarks import StandInSearch, run_suite
+
+
+class TestSyntheticData(unittest.TestCase):
+
+    def test_parse_scale(self):
+        self.assertEqual(parse_scale("1k"), 1_000)
+        self.assertEqual(parse_scale("100K"), 100_000)
+        self.assertEqual(parse_scale("1M"), 1_000_000)
+        self.assertEqual(parse_scale("250"), 250)
+
+    def test_generate_matches_scale_and_row_shapes(self):
+        # Act
+        data = generate(1_000, download_type="listing", seed=1)
+
+        # Assert
+        self.assertEqual(data.audit_rows, 1_000)
+        self.assertEqual(len(data.source_info[0]), 7)
+        self.assertEqual(len(data.field_info[0]), 2)
+        self.assertEqual(set(data.canonical_fields), set(data.definitions))
+
+    def test_generate_is_deterministic_for_seed(self):
+        self.assertEqual(generate(200, seed=3).mappings, generate(200, seed=3).mappings)
+
+
+class TestStandInSearch(unittest.TestCase):
+
+    def test_term_and_phrase_lookup(self):
+        # Arrange
+        search = StandInSearch([{"documentId": "src_a", "className": "class1", "resource": "property",
+                                 "longName": "Fld1A", "tableSystemName": "tbl_1"}])
+        query = {"query": {"bool": {"must": [
+            {"term": {"documentId": {"value": "src_a"}}},
+            {"term": {"className": {"value": "class1"}}},
+            {"term": {"resource": {"value": "property"}}},
+            {"match_phrase": {"longName": "Fld1A"}},
+        ]}}}
+
+        # Act
+        hits = search.get("http://standin", data=json.dumps(query)).json()["hits"]["hits"]
+
+        # Assert
+        self.assertEqual(hits[0]["_source"]["tableSystemName"], "tbl_1")
+        self.assertEqual(search.requests, 1)
+
+
+class TestRunSuite(unittest.TestCase):
+
+    def test_run_suite_records_every_stage(self):
+        # Act
+        records = run_suite(100, "test", excel=True)
+
+        # Assert
+        stages = [record["stage"] for record in records]
+        for stage in ("mapping_audit", "elasticsearch_check_from_df", "add_finalized_transformation",
+                      "write_updated_audit_to_excel", "canonical_inserts_from_df", "origin_inserts_from_df",
+                      "canonical_updates_from_df", "origin_updates_from_df"):
+            self.assertIn(stage, stages)
+        self.assertTrue(all(record["peak_rss_mb"] > 0 for record in records))
+        self.assertEqual(records[0]["audit_rows"], 100)
+        self.assertEqual(records[0]["statements"], 1)
+
+    def test_lean_es_sends_fewer_bytes_per_search(self):
+        # Act
+        default = {r["stage"]: r for r in run_suite(100, "test", excel=False)}["elasticsearch_check_from_df"]
+        lean = {r["stage"]: r for r in run_suite(100, "test", excel=False, lean_es=True)}["elasticsearch_check_from_df"]
+
+        # Assert
+        self.assertTrue(lean["lean_es"])
+        self.assertEqual(lean["es_stats"]["searches"], default["es_stats"]["searches"])
+        self.assertLess(lean["bytes_per_search"], default["bytes_per_search"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+# tests/test_bundle.py
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from ..benchmarks.synthetic import generate
+from ..benchmarks.db_harness import LocalDatabase
+from ..src.bundle import BundleWriter, copy_escape, copy_line, file_sha256, write_bundle
+from ..src.main import get_src_info, get_field_info, mapping_audit, apply_audit_results
+
+COPY_ESCAPES = {"N": None, "t": "\t", "n": "\n", "r": "\r", "\\": "\\"}
+
+
+def read_copy_rows(path):
+    rows = []
+    with open(path, encoding="utf-8", newline="") as f:
+        for line in f:
+            rows.append([None if field == "\\N" else re.sub(r"\\(.)", lambda m: COPY_ESCAPES[m.group(1)], field)
+                         for field in line.rstrip("\n").split("\t")])
+    return rows
+
+
+def apply_bundle_sqlite(conn, bundle_dir):
+    # Runs apply.sql the way psql would: \copy lines load the data files, everything else is plain SQL
+    cursor = conn.cursor()
+    with open(os.path.join(bundle_dir, "apply.sql"), encoding="utf-8") as f:
+        script = f.read()
+    sql = []
+
+    def flush():
+        for stmt in "\n".join(sql).split(";"):
+            if stmt.strip():
+                cursor.execute(stmt)
+        sql.clear()
+
+    for line in script.splitlines():
+        if line.startswith("\\copy"):
+            flush()
+            table, path = re.match(r"\\copy (\w+) FROM '(.+)'", line).groups()
+            for row in read_copy_rows(os.path.join(bundle_dir, path)):
+                cursor.execute(f"INSERT INTO {table} VALUES ({', '.join('?' * len(row))})", row)
+        elif not line.startswith(("\\", "--")) and line not in ("BEGIN;", "COMMIT;"):
+            sql.append(line)
+    flush()
+    conn.commit()
+
+
+class TestCopyFormat(unittest.TestCase):
+
+    def test_copy_escape_handles_nulls_and_control_characters(self):
+        self.assertEqual(copy_escape(None), "\\N")
+        self.assertEqual(copy_escape(float("nan")), "\\N")
+        self.assertEqual(copy_escape(10.0), "10")
+        self.assertEqual(copy_escape("a\tb\nc\\d"), "a\\tb\\nc\\\\d")
+
+    def test_copy_line_round_trips(self):
+        # Arrange
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, "rows.copy")
+        values = [10, "CASE WHEN x\tTHEN 'y'\nEND", None, "C:\\path"]
+
+        # Act
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(copy_line(values))
+
+        # Assert
+        self.assertEqual(read_copy_rows(path), [["10", values[1], None, values[3]]])
+
+    def test_file_sha256_hashes_in_chunks(self):
+        # Arrange
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, "rows.copy")
+        data = os.urandom(10000)
+        with open(path, "wb") as f:
+            f.write(data)
+
+        # Act / Assert
+        self.assertEqual(file_sha256(path, chunk_size=4096), hashlib.sha256(data).hexdigest())
+
+
+class TestBundleApply(unittest.TestCase):
+
+    def setUp(self):
+        self.data = generate(60, download_type="listing", seed=11)
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def start_db(self):
+        db = LocalDatabase("sqlite").start().load(self.data)
+        self.addCleanup(db.stop)
+        return db
+
+    def audit_df(self, db):
+        cursor = db.connection().cursor()
+        source_info = get_src_info(cursor, self.data.sources, "listing")
+        field_info = get_field_info(cursor, self.data.canonical_fields, "listing")
+        audit = mapping_audit(cursor, [l1 + l2 for l1 in source_info for l2 in field_info])
+        df = pd.DataFrame(audit, columns=['Source', 'Protocol', 'Provider', 'Dataset ID', 'Class',
+                                          'Class Description', 'Download Type', 'Field ID', 'Canonical Field Name',
+                                          'Mapping Status'])
+        names = df['Canonical Field Name'].map(lambda name: self.data.definitions[name]["long_name"])
+        df['Proposed Field Short Name'] = names
+        df['Proposed Fields Short Name'] = names
+        df['Proposed Fields Long Name'] = names
+        df['Finalized Transformation'] = df['Canonical Field Name'].map(
+            lambda name: self.data.definitions[name]["transformation"])
+        df['es_Pass'] = 'Y'
+        return df
+
+    def snapshot(self, db):
+        mappings = db.connection().cursor()
+        # the synthetic seed stores transformations still escaped (''), so compare them unescaped
+        mappings.execute("""SELECT field_id, dataset_id, dataset_name, download_type,
+                            replace(custom_transformation, '''''', ''''), is_active FROM table_mapping
+                            ORDER BY 1, 2, 3, 4""")
+        origins = db.connection().cursor()
+        origins.execute("""SELECT m.field_id, m.dataset_id, m.dataset_name, o.source_field, o.long_name, o.is_active
+                           FROM table_origin_field o JOIN table_mapping m ON m.id = o.mapping_id
+                           ORDER BY 1, 2, 3, 4""")
+        return mappings.fetchall(), origins.fetchall()
+
+    @patch("builtins.print")
+    def test_bundle_matches_executed_generators(self, mock_print):
+        # Arrange
+        executed_db, bundle_db = self.start_db(), self.start_db()
+        audit_df = self.audit_df(executed_db)
+        self.assertTrue({'Not Mapped', 'Deactivated'} <= set(audit_df['Mapping Status']))
+
+        # Act
+        apply_audit_results(executed_db.connection(), audit_df, "listing")
+        result = write_bundle(self.tmp, audit_df, "listing")
+        apply_bundle_sqlite(bundle_db.connection(), self.tmp)
+
+        # Assert
+        self.assertEqual(self.snapshot(bundle_db), self.snapshot(executed_db))
+        self.assertEqual(result["unmapped"], (audit_df['Mapping Status'] == 'Not Mapped').sum())
+
+    @patch("builtins.print")
+    def test_bundle_streams_chunks_and_writes_manifest(self, mock_print):
+        # Arrange
+        db = self.start_db()
+        audit_df = self.audit_df(db)
+        chunks = (audit_df.iloc[start:start + 7] for start in range(0, len(audit_df), 7))
+
+        # Act
+        result = write_bundle(self.tmp, chunks, "listing")
+
+        # Assert
+        with open(os.path.join(self.tmp, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        origin_file = manifest["files"]["staging_origin_insert.copy"]
+        self.assertEqual(origin_file["rows"], result["staging_origin_insert_rows"])
+        self.assertEqual(len(read_copy_rows(os.path.join(self.tmp, "staging_origin_insert.copy"))),
+                         origin_file["rows"])
+        with open(os.path.join(self.tmp, "apply.sql"), encoding="utf-8") as f:
+            script = f.read()
+        self.assertIn("\\copy staging_origin_insert FROM 'staging_origin_insert.copy'", script)
+        self.assertEqual(script.count("BEGIN;"), 1)
+
+    @patch("builtins.print")
+    def test_failed_close_leaves_no_partial_script_or_manifest(self, mock_print):
+        # Arrange
+        db = self.start_db()
+        audit_df = self.audit_df(db)
+        writer = BundleWriter(self.tmp, "listing")
+        writer.add_unmapped(audit_df[audit_df['Mapping Status'] == 'Not Mapped'])
+
+        # Act
+        with patch.object(BundleWriter, "apply_script", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                writer.close()
+
+        # Assert
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, "apply.sql")))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, "manifest.json")))
+        self.assertFalse([name for name in os.listdir(self.tmp) if name.endswith(".tmp")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+# tests/test_checkpoint.py
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import pandas as pd
+from ..src.checkpoint import CheckpointStore, NullCheckpointStore, fingerprint_inputs, open_checkpoint
+from ..src.main import INITIAL_HEADERS, run_audit_stages
+
+
+class TestCheckpointStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @patch("builtins.print")
+    def test_completed_stage_is_loaded_instead_of_rerun(self, mock_print):
+        # Arrange
+        fn = MagicMock(return_value=[("SRC_A", "RETS", "Provider A", 1)])
+        CheckpointStore(self.root, "run-1", "abc").stage("source_info", fn)
+
+        # Act
+        result = CheckpointStore(self.root, "run-1", "abc").stage("source_info", fn)
+
+        # Assert
+        fn.assert_called_once()
+        self.assertEqual(result, [("SRC_A", "RETS", "Provider A", 1)])
+        mock_print.assert_called_with("Resuming: stage 'source_info' loaded from checkpoint")
+
+    def test_dataframe_round_trip_keeps_columns_and_values(self):
+        # Arrange
+        df = pd.DataFrame([[1, "Mapped", None], [2, "Not Mapped", "A,B"]], columns=["Dataset ID", "Status", "Names"])
+        store = CheckpointStore(self.root, "run-1", "abc")
+
+        # Act
+        store.save("audit", df)
+        loaded = CheckpointStore(self.root, "run-1", "abc").load("audit")
+
+        # Assert
+        self.assertEqual(list(loaded.columns), ["Dataset ID", "Status", "Names"])
+        self.assertEqual(loaded.values.tolist(), df.values.tolist())
+
+    @patch("builtins.print")
+    def test_changed_fingerprint_discards_previous_stages(self, mock_print):
+        # Arrange
+        CheckpointStore(self.root, "run-1", "abc").save("source_info", [("SRC_A",)])
+
+        # Act
+        store = CheckpointStore(self.root, "run-1", "def")
+
+        # Assert
+        self.assertFalse(store.is_done("source_info"))
+        self.assertIsNone(store.load("source_info"))
+        mock_print.assert_called_with("Checkpoint inputs changed for run 'run-1', starting over")
+
+    def test_batched_stage_resumes_at_first_missing_batch(self):
+        # Arrange
+        df = pd.DataFrame({"n": range(10)})
+        calls = []
+
+        def failing(batch):
+            calls.append(list(batch["n"]))
+            if batch["n"].iloc[0] == 6:
+                raise RuntimeError("ES timeout")
+            return batch.assign(doubled=batch["n"] * 2)
+
+        with self.assertRaises(RuntimeError):
+            CheckpointStore(self.root, "run-1", "abc").batched("es_check", df, failing, batch_size=3)
+        calls.clear()
+
+        # Act
+        result = CheckpointStore(self.root, "run-1", "abc").batched(
+            "es_check", df, lambda batch: batch.assign(doubled=batch["n"] * 2), batch_size=3)
+
+        # Assert
+        self.assertEqual(calls, [])
+        self.assertEqual(list(result["doubled"]), [n * 2 for n in range(10)])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.root, "run-1"))), ["es_check.json", "manifest.json"])
+
+    def test_finish_removes_run_directory(self):
+        store = CheckpointStore(self.root, "run-1", "abc")
+        store.mark_done("excel_report")
+        store.finish()
+        self.assertFalse(os.path.exists(os.path.join(self.root, "run-1")))
+
+    def test_restart_resumes_the_unfinished_run_on_a_later_day(self):
+        # Arrange
+        store = open_checkpoint(self.root, "agent", sources=["SRC_A"])
+        store.mark_done("source_info")
+
+        # Act
+        with patch("Automation_Scripts.mapping_automation.src.checkpoint.datetime") as mock_datetime:
+            mock_datetime.datetime.now.return_value = pd.Timestamp("2999-01-01").to_pydatetime()
+            resumed = open_checkpoint(self.root, "agent", sources=["SRC_A"])
+        resumed.finish()
+        restarted = open_checkpoint(self.root, "agent", sources=["SRC_A"])
+
+        # Assert
+        self.assertEqual(resumed.run_id, store.run_id)
+        self.assertTrue(resumed.is_done("source_info"))
+        self.assertFalse(restarted.is_done("source_info"))
+
+    def test_open_checkpoint_without_root_is_a_no_op(self):
+        self.assertIsInstance(open_checkpoint(None, "agent"), NullCheckpointStore)
+        self.assertEqual(NullCheckpointStore().stage("x", lambda: 5), 5)
+
+    def test_fingerprint_depends_on_inputs(self):
+        self.assertEqual(fingerprint_inputs(sources=["A"], fields=("X",)), fingerprint_inputs(fields=("X",), sources=["A"]))
+        self.assertNotEqual(fingerprint_inputs(sources=["A"]), fingerprint_inputs(sources=["B"]))
+
+
+class TestResumableAuditStages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.master_list = [("SRC_A", "RETS", "Provider A", n, f"Class{n}", "Desc", "listing", 10, "IS_ACTIVE")
+                            for n in range(5)]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def es_check(self, df, auth_url):
+        if self.fail_at is not None and self.fail_at in set(df['Dataset ID']):
+            raise ConnectionError("ES unavailable")
+        self.checked.extend(df['Dataset ID'])
+        return df.assign(**{'es_Pass': 'Y', 'Proposed Fields Long Name': 'StatusFlag'})
+
+    @patch("builtins.print")
+    def test_restart_skips_audit_and_finished_es_batches(self, mock_print):
+        # Arrange
+        cursor = MagicMock()
+        cursor.fetchone.return_value = None
+        self.checked, self.fail_at = [], 3
+        patcher = patch("Automation_Scripts.mapping_automation.src.main.elasticsearch_check_from_df",
+                        side_effect=self.es_check)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with self.assertRaises(ConnectionError):
+            run_audit_stages(cursor, self.master_list, "url",
+                             checkpoint=CheckpointStore(self.tmp_dir.name, "run", "fp"), es_batch_size=2)
+        audit_statements = cursor.execute.call_count
+        self.checked, self.fail_at = [], None
+
+        # Act
+        result = run_audit_stages(cursor, self.master_list, "url",
+                                  checkpoint=CheckpointStore(self.tmp_dir.name, "run", "fp"), es_batch_size=2)
+
+        # Assert
+        self.assertEqual(cursor.execute.call_count, audit_statements)
+        self.assertEqual(self.checked, [2, 3, 4])
+        self.assertEqual(list(result['Dataset ID']), [0, 1, 2, 3, 4])
+        self.assertEqual(list(result.columns), INITIAL_HEADERS + ['es_Pass', 'Proposed Fields Long Name',
+                                                                 'Finalized Transformation'])
+
+
+if __name__ == "__main__":
+    unittest.main()
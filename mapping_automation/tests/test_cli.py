@@ -0,0 +1,196 @@
+# tests/test_cli.py
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import pandas as pd
+from ..src.cli import load_config, load_approvals, run_jobs, main
+from ..src.main import FINAL_HEADERS, write_updated_audit_to_excel
+from .test_diff import audit_rows
+
+MAIN = "Automation_Scripts.mapping_automation.src.main"
+
+
+class TestJobConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_json_config_merges_defaults_into_jobs(self):
+        # Arrange
+        path = self.write("jobs.json", json.dumps({
+            "defaults": {"auth_url": "https://es", "out_path": "/reports"},
+            "jobs": [{"name": "nightly", "sources": ["SRC_A"], "download_type": "agent"},
+                     {"sources": "SRC_B", "download_type": "listing", "fields": ["IS_ACTIVE"]}]}))
+
+        # Act
+        jobs = load_config(path)
+
+        # Assert
+        self.assertEqual(jobs[0]["auth_url"], "https://es")
+        self.assertEqual(jobs[0]["report_path"], os.path.join("/reports", "Canonical_Audit_nightly_results.xlsx"))
+        self.assertEqual(jobs[1]["name"], "listing")
+        self.assertEqual(jobs[1]["sources"], ["SRC_B"])
+        self.assertEqual(jobs[1]["fields"], ("IS_ACTIVE",))
+
+    def test_yaml_config(self):
+        path = self.write("jobs.yaml", "jobs:\n  - {sources: [SRC_A], download_type: agent, auth_url: https://es}\n")
+        try:
+            import yaml  # noqa: F401
+        except ImportError:
+            self.skipTest("PyYAML not installed")
+        self.assertEqual(load_config(path)[0]["sources"], ["SRC_A"])
+
+    def test_missing_required_keys_raise(self):
+        path = self.write("jobs.json", json.dumps([{"name": "broken", "download_type": "agent"}]))
+        with self.assertRaises(ValueError) as ctx:
+            load_config(path)
+        self.assertIn("broken", str(ctx.exception))
+        self.assertIn("sources", str(ctx.exception))
+
+    def test_approval_file_ignores_comments(self):
+        path = self.write("approved.txt", "# reviewed 2024-05-01\nnightly\n\nlisting_rets  # ok\n")
+        self.assertEqual(load_approvals(path), {"nightly", "listing_rets"})
+
+
+@patch("builtins.print")
+@patch(f"{MAIN}.release_connection")
+@patch(f"{MAIN}.get_connection")
+class TestRunJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.jobs = [{"name": name, "sources": ["SRC_A"], "download_type": "agent", "auth_url": "https://es",
+                      "report_path": f"{name}.xlsx"} for name in ("first", "second")]
+        self.audit_df = pd.DataFrame([["Not Mapped", "Y"]], columns=["Mapping Status", "es_Pass"])
+
+    @patch(f"{MAIN}.apply_audit_results", return_value={"unmapped": 1, "deactivated": 0})
+    @patch(f"{MAIN}.audit_job")
+    def test_unapproved_jobs_are_audited_but_not_applied(self, mock_audit, mock_apply, mock_get_conn,
+                                                         mock_release, mock_print):
+        # Arrange
+        mock_audit.return_value = self.audit_df
+
+        # Act
+        results = run_jobs("audit-and-apply", self.jobs, approvals={"second"})
+
+        # Assert
+        self.assertEqual([r["status"] for r in results], ["awaiting_approval", "ok"])
+        mock_apply.assert_called_once()
+        self.assertEqual(mock_audit.call_count, 2)
+        self.assertEqual(mock_release.call_count, 2)
+
+    @patch(f"{MAIN}.apply_audit_results")
+    @patch(f"{MAIN}.audit_job")
+    def test_failed_job_is_rolled_back_and_next_job_runs(self, mock_audit, mock_apply, mock_get_conn,
+                                                         mock_release, mock_print):
+        # Arrange
+        conn = MagicMock()
+        mock_get_conn.return_value = conn
+        mock_audit.side_effect = [RuntimeError("ES unavailable"), self.audit_df]
+
+        # Act
+        results = run_jobs("audit", self.jobs)
+
+        # Assert
+        self.assertEqual(results[0]["status"], "failed")
+        self.assertEqual(results[0]["error"], "ES unavailable")
+        self.assertEqual(results[1]["status"], "ok")
+        conn.rollback.assert_called_once()
+        mock_apply.assert_not_called()
+        mock_release.assert_called_with(conn, None)
+
+    @patch(f"{MAIN}.audit_job")
+    def test_job_that_cannot_connect_fails_and_next_job_runs(self, mock_audit, mock_get_conn, mock_release,
+                                                             mock_print):
+        # Arrange
+        conn = MagicMock()
+        mock_get_conn.side_effect = [ConnectionError("db unreachable"), conn]
+        mock_audit.return_value = self.audit_df
+
+        # Act
+        results = run_jobs("audit", self.jobs)
+
+        # Assert
+        self.assertEqual([r["status"] for r in results], ["failed", "ok"])
+        self.assertEqual(results[0]["error"], "db unreachable")
+        mock_audit.assert_called_once()
+        mock_release.assert_called_once_with(conn, None)
+
+    @patch(f"{MAIN}.apply_audit_results", return_value={"unmapped": 1, "deactivated": 0})
+    def test_apply_reads_reviewed_report(self, mock_apply, mock_get_conn, mock_release, mock_print):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmp:
+            row = ['SRC_A', 'RETS', 'P', 1, 'Class', 'Desc', 'agent', 10, 'IS_ACTIVE', 'Not Mapped', 'StatusFlag',
+                   'T', 'Y', 'StatusFlag', 'T']
+            job = dict(self.jobs[0], report_path=os.path.join(tmp, "first.xlsx"))
+            write_updated_audit_to_excel(FINAL_HEADERS, [row], job["report_path"])
+
+            # Act
+            results = run_jobs("apply", [job], approve_all=True)
+
+        # Assert
+        applied_df = mock_apply.call_args[0][1]
+        self.assertEqual(list(applied_df.columns), FINAL_HEADERS)
+        self.assertEqual(applied_df.iloc[0]['es_Pass'], 'Y')
+        self.assertEqual(results[0]["unmapped"], 1)
+
+    @patch("Automation_Scripts.mapping_automation.src.cli.write_bundle", return_value={"bundle": "/tmp/b"})
+    @patch(f"{MAIN}.apply_audit_results")
+    @patch(f"{MAIN}.audit_job")
+    def test_bundle_dir_exports_instead_of_applying(self, mock_audit, mock_apply, mock_bundle, mock_get_conn,
+                                                    mock_release, mock_print):
+        # Act
+        results = run_jobs("audit-and-apply", [dict(self.jobs[0], bundle_dir="/tmp/b")], approve_all=True)
+
+        # Assert
+        mock_apply.assert_not_called()
+        mock_bundle.assert_called_once_with("/tmp/b", mock_audit.return_value, self.jobs[0]["download_type"], False)
+        self.assertEqual(results[0]["bundle"], "/tmp/b")
+
+    @patch(f"{MAIN}.write_updated_audit_to_excel")
+    @patch(f"{MAIN}.run_audit_stages", side_effect=lambda *args, **kwargs: audit_rows(2))
+    @patch(f"{MAIN}.get_field_info", return_value=[(10, 'IS_ACTIVE')])
+    @patch(f"{MAIN}.get_src_info", return_value=[('SRC_A', 'RETS', 'P', 1, 'Class1', 'Desc', 'agent')])
+    def test_completed_audit_drops_its_checkpoint_and_reruns_audit_again(self, mock_src, mock_field, mock_stages,
+                                                                         mock_excel, mock_get_conn, mock_release,
+                                                                         mock_print):
+        with tempfile.TemporaryDirectory() as tmp:
+            # Arrange
+            job = dict(self.jobs[0], checkpoint_dir=tmp)
+
+            # Act
+            results = run_jobs("audit", [job, dict(job)])
+
+            # Assert
+            self.assertEqual([r["status"] for r in results], ["ok", "ok"])
+            self.assertEqual(mock_src.call_count, 2)
+            self.assertEqual(mock_excel.call_count, 2)
+            self.assertEqual(os.listdir(tmp), [])
+
+    @patch(f"{MAIN}.audit_job", side_effect=RuntimeError("boom"))
+    def test_main_returns_non_zero_and_writes_summary(self, mock_audit, mock_get_conn, mock_release, mock_print):
+        with tempfile.TemporaryDirectory() as tmp:
+            config = os.path.join(tmp, "jobs.json")
+            summary = os.path.join(tmp, "summary.json")
+            with open(config, "w") as f:
+                json.dump({"jobs": self.jobs}, f)
+
+            exit_code = main(["audit", config, "--job", "second", "--summary", summary])
+
+            with open(summary) as f:
+                self.assertEqual([r["job"] for r in json.load(f)], ["second"])
+        self.assertEqual(exit_code, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
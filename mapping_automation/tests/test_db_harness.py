@@ -0,0 +1,121 @@
+# tests/test_db_harness.py
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from ..benchmarks.synthetic import generate
+from ..benchmarks.db_harness import LocalDatabase, QueryBudgetExceeded
+from ..src.main import (get_src_info, get_field_info, mapping_audit, canonical_inserts_from_df,
+                        origin_inserts_from_df, origin_updates_from_df)
+
+
+class HarnessTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.data = generate(100, download_type="listing", seed=7)
+        self.db = LocalDatabase("sqlite").start().load(self.data)
+        self.conn = self.db.connection()
+        self.cursor = self.conn.cursor()
+
+    def tearDown(self):
+        self.db.stop()
+
+    def audit(self):
+        source_info = get_src_info(self.cursor, self.data.sources, "listing")
+        field_info = get_field_info(self.cursor, self.data.canonical_fields, "listing")
+        master_list = [l1 + l2 for l1 in source_info for l2 in field_info]
+        with self.db.stage("mapping_audit"):
+            return mapping_audit(self.cursor, master_list)
+
+
+class TestLocalDatabase(HarnessTestCase):
+
+    def test_schema_loaded_with_generated_data(self):
+        self.assertEqual(self.db.scalar("SELECT COUNT(*) FROM table_mapping"), len(self.data.mappings))
+        self.assertEqual(self.db.scalar("SELECT COUNT(*) FROM table_canonical_fields"), len(self.data.field_info))
+
+    def test_reference_queries_return_generated_rows(self):
+        # Act
+        with self.db.stage("reference_data"):
+            rows = get_src_info(self.cursor, self.data.sources, "listing")
+            get_field_info(self.cursor, self.data.canonical_fields, "listing")
+
+        # Assert
+        self.assertEqual(sorted(rows), sorted(self.data.source_info))
+        self.assertEqual(self.db.assert_budget("reference_data", 2, kind="select"), 2)
+
+    def test_mapping_audit_statuses_match_generated_mappings(self):
+        # Act
+        audit = self.audit()
+
+        # Assert
+        expected = {(m[2], m[1]): 'Mapped' if m[4] else 'Deactivated' for m in self.data.mappings}
+        for row in audit:
+            self.assertEqual(row[9], expected.get((row[3], row[7]), 'Not Mapped'))
+
+    def test_conn_close_does_not_end_harness_session(self):
+        self.conn.close()
+        self.assertEqual(self.db.scalar("SELECT COUNT(*) FROM table_source_info"), len(self.data.source_info))
+
+
+class TestStatementBudgets(HarnessTestCase):
+
+    def test_mapping_audit_budget(self):
+        audit = self.audit()
+        self.db.assert_budget("mapping_audit", len(audit))
+
+    def test_budget_exceeded_raises(self):
+        self.audit()
+        with self.assertRaises(QueryBudgetExceeded) as ctx:
+            self.db.assert_budget("mapping_audit", 1)
+        self.assertIn("mapping_audit", str(ctx.exception))
+
+    @patch("builtins.print")
+    def test_unmapped_path_budget(self, mock_print):
+        # Arrange
+        audit = self.audit()
+        rows = [row + (self.data.definitions[row[8]]["long_name"],
+                       self.data.definitions[row[8]]["transformation"]) for row in audit if row[9] == 'Not Mapped']
+        unmapped_df = pd.DataFrame(rows, columns=[
+            'Source', 'Protocol', 'Provider', 'Dataset ID', 'Class', 'Class Description', 'Download Type',
+            'Field ID', 'Canonical Field Name', 'Mapping Status', 'Proposed Field Short Name',
+            'Finalized Transformation'])
+        unmapped_df['Proposed Fields Long Name'] = unmapped_df['Proposed Field Short Name']
+        n_fields = sum(len(value.split(',')) for value in unmapped_df['Proposed Field Short Name'])
+
+        # Act
+        with self.db.stage("canonical_inserts"):
+            mapping_ids = canonical_inserts_from_df(unmapped_df, self.conn, "listing")
+        with self.db.stage("origin_inserts"):
+            origin_inserts_from_df(unmapped_df, self.conn, mapping_ids=mapping_ids)
+
+        # Assert
+        self.db.assert_budget("canonical_inserts", 2)
+        self.db.assert_budget("origin_inserts", 2)
+        self.assertEqual(self.db.statements("origin_inserts", kind="select"), 1)
+        self.assertEqual(self.db.scalar("SELECT COUNT(*) FROM table_mapping"),
+                         len(self.data.mappings) + len(unmapped_df))
+        self.assertEqual(self.db.scalar("SELECT COUNT(*) FROM table_origin_field"),
+                         len(self.data.origin_fields) + n_fields)
+
+
+    @patch("builtins.print")
+    def test_deactivated_origin_updates_prefetch_budget(self, mock_print):
+        # Arrange
+        audit = self.audit()
+        rows = [(row[7], row[3], self.data.definitions[row[8]]["long_name"]) for row in audit
+                if row[9] == 'Deactivated']
+        deactivated_df = pd.DataFrame(rows, columns=['Field ID', 'Dataset ID', 'Proposed Fields Short Name'])
+        deactivated_df['Proposed Fields Long Name'] = deactivated_df['Proposed Fields Short Name']
+        n_fields = sum(len(value.split(',')) for value in deactivated_df['Proposed Fields Short Name'])
+
+        # Act
+        with self.db.stage("origin_updates"):
+            origin_updates_from_df(deactivated_df, self.conn)
+
+        # Assert
+        self.assertGreater(len(deactivated_df), 0)
+        self.assertEqual(self.db.statements("origin_updates", kind="select"), len(deactivated_df) + 1)
+        self.db.assert_budget("origin_updates", len(deactivated_df) + 1 + n_fields)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+# tests/test_definitions.py
+import contextlib
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from ..benchmarks.synthetic import generate
+from ..benchmarks.db_harness import LocalDatabase
+from ..src import main as mapping
+from ..src.definitions import DefinitionError, DefinitionRegistry, TransformationTemplate, validate
+from ..src.service import AuditService
+
+SERVICE = "Automation_Scripts.mapping_automation.src.service"
+
+
+class TestTransformationTemplate(unittest.TestCase):
+
+    def test_names_are_replaced_once_longest_first(self):
+        # Arrange
+        template = TransformationTemplate("concat(Fld1, ''-'', Fld10)", ("Fld1", "Fld10"))
+
+        # Act
+        rendered = template.render({"Fld1": "TBL_Fld10", "Fld10": "TBL_TEN"})
+
+        # Assert
+        self.assertEqual(rendered, "concat(TBL_Fld10, ''-'', TBL_TEN)")
+        self.assertEqual(template.missing, [])
+
+    def test_finalize_uses_templates(self):
+        self.assertEqual(mapping.finalize_transformation("IF(Fld1=Fld10,1,0)", "Fld1, Fld10", "A, B"),
+                         "IF(A=B,1,0)")
+
+
+class TestValidation(unittest.TestCase):
+
+    def test_every_problem_is_reported(self):
+        # Arrange
+        records = [
+            {"field": "IS_ACTIVE", "long_name": "StatusFlag", "transformation": "IF(StatusFlag=''Active'',1,0)"},
+            {"field": "IS_ACTIVE", "long_name": "StatusFlag", "transformation": "StatusFlag"},
+            {"field": "PRICE", "long_name": "ListPrice"},
+            {"download_type": "agent", "field": "NAME", "long_name": "Name", "transformation": "upper(Name, 'x')"},
+            {"download_type": "agent", "field": "CITY", "long_name": "City, Town", "transformation": "City"},
+        ]
+
+        # Act
+        with self.assertRaises(DefinitionError) as ctx:
+            validate(records)
+
+        # Assert
+        message = str(ctx.exception)
+        self.assertTrue(message.startswith("4 invalid definitions"))
+        self.assertIn("#1 (*, IS_ACTIVE): defined more than once", message)
+        self.assertIn("#2 (*, PRICE): missing transformation", message)
+        self.assertIn("#3 (agent, NAME): unescaped quote", message)
+        self.assertIn("#4 (agent, CITY): transformation does not use Town", message)
+
+
+class TestDefinitionRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp_dir.name, name)
+        previous = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.utime(path, ns=(previous + 10 ** 9, previous + 10 ** 9))  # a distinct mtime even within one tick
+        return path
+
+    def test_csv_records_are_indexed_by_download_type(self):
+        # Arrange
+        path = self.write("definitions.csv", "download_type,field,long_name,transformation\n"
+                                             ",IS_ACTIVE,StatusFlag,StatusFlag\n"
+                                             "agent,IS_ACTIVE,AgentStatus,AgentStatus\n"
+                                             "agent,NAME,FullName,upper(FullName)\n")
+
+        # Act
+        registry = DefinitionRegistry(path)
+
+        # Assert
+        self.assertEqual(registry.for_download_type("agent"),
+                         {"IS_ACTIVE": {"long_name": "AgentStatus", "transformation": "AgentStatus"},
+                          "NAME": {"long_name": "FullName", "transformation": "upper(FullName)"}})
+        self.assertEqual(registry.get("listing", "IS_ACTIVE")["long_name"], "StatusFlag")
+        self.assertIsNone(registry.get("listing", "NAME"))
+        with patch.object(mapping, "definition_registry", registry):
+            self.assertEqual(list(mapping.job_definitions({"download_type": "agent"})), ["IS_ACTIVE", "NAME"])
+
+    def test_changed_file_is_reloaded_and_invalid_edits_keep_the_last_version(self):
+        # Arrange
+        path = self.write("definitions.json", json.dumps(mapping.field_mapping_definitions))
+        registry = DefinitionRegistry(path)
+
+        # Act
+        unchanged = registry.refresh()
+        self.write("definitions.json", json.dumps({"PRICE": {"long_name": "ListPrice", "transformation": "ListPrice"}}))
+        reloaded = registry.refresh()
+        self.write("definitions.json", json.dumps({"PRICE": {"long_name": "ListPrice"}}))
+        rejected = registry.refresh()
+
+        # Assert
+        self.assertEqual((unchanged, reloaded, rejected), (False, True, False))
+        self.assertEqual(list(registry.for_download_type("agent")), ["PRICE"])
+        self.assertEqual(registry.stats()["version"], 2)
+        self.assertIn("missing transformation", registry.stats()["last_error"])
+
+    @patch("builtins.print")
+    def test_file_missing_during_a_poll_keeps_the_loaded_definitions(self, mock_print):
+        # Arrange
+        path = self.write("definitions.json", json.dumps(mapping.field_mapping_definitions))
+        registry = DefinitionRegistry(path)
+        os.remove(path)
+
+        # Act
+        missing = registry.refresh()
+        self.write("definitions.json", json.dumps({"PRICE": {"long_name": "ListPrice", "transformation": "ListPrice"}}))
+        reloaded = registry.refresh()
+
+        # Assert
+        self.assertEqual((missing, reloaded), (False, True))
+        self.assertEqual(list(registry.for_download_type("agent")), ["PRICE"])
+        self.assertIsNone(registry.stats()["last_error"])
+
+    def test_missing_file_fails_the_first_load(self):
+        with self.assertRaises(OSError):
+            DefinitionRegistry(os.path.join(self.tmp_dir.name, "missing.json"))
+
+    def test_invalid_definitions_fail_the_first_load(self):
+        path = self.write("definitions.json", json.dumps([{"field": "PRICE"}]))
+        with self.assertRaises(DefinitionError):
+            DefinitionRegistry(path)
+
+
+class TestDatabaseDefinitions(unittest.TestCase):
+
+    def setUp(self):
+        self.data = generate(100, download_type="listing", seed=4)
+        self.db = LocalDatabase("sqlite").start().load(self.data)
+
+    def tearDown(self):
+        self.db.stop()
+
+    def test_table_is_loaded_and_reloaded_after_an_update(self):
+        # Arrange
+        registry = DefinitionRegistry("db", connection=lambda: contextlib.nullcontext(self.db.connection()))
+        field = next(iter(self.data.definitions))
+
+        # Act
+        unchanged = registry.refresh()
+        self.db.execute(f"UPDATE table_field_definitions SET long_name = 'Renamed', transformation = 'Renamed', "
+                        f"last_update_ts = '2999-01-01' WHERE field = '{field}'")
+        reloaded = registry.refresh()
+
+        # Assert
+        self.assertEqual((unchanged, reloaded), (False, True))
+        self.assertEqual(len(registry), len(self.data.definitions))
+        self.assertEqual(registry.get("listing", field)["long_name"], "Renamed")
+
+
+@patch("builtins.print")
+@patch.object(AuditService, "warm_up")
+class TestServiceReload(unittest.TestCase):
+
+    @patch(f"{SERVICE}.run_job")
+    def test_jobs_see_definitions_edited_while_the_service_runs(self, mock_run_job, mock_warm_up, mock_print):
+        with tempfile.TemporaryDirectory() as spool:
+            # Arrange
+            path = os.path.join(spool, "definitions.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(mapping.field_mapping_definitions, f)
+            registry = DefinitionRegistry(path)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"PRICE": {"long_name": "ListPrice", "transformation": "ListPrice"}}, f)
+            os.utime(path, ns=(0, 0))
+            mock_run_job.side_effect = lambda command, job, *args: {
+                "job": job["name"], "status": "ok", "fields": list(mapping.job_definitions(job))}
+            service = AuditService(spool, defaults={"auth_url": "https://es"})
+            job_id = service.submit({"name": "nightly", "sources": ["SRC_A"], "download_type": "agent"})
+
+            # Act
+            with patch.object(mapping, "definition_registry", registry):
+                service.start()
+                try:
+                    service.poll_once()
+                finally:
+                    service.shutdown()
+                health = service.health()
+
+            # Assert
+            self.assertEqual(service.status(job_id)["fields"], ["PRICE"])
+            self.assertEqual(health["definitions"]["version"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+# tests/test_diff.py
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import pandas as pd
+from ..src.diff import audit_diff
+from ..src.main import FINAL_HEADERS, audit_job
+
+
+def audit_rows(n, status='Mapped'):
+    return pd.DataFrame([[f'SRC_{idx % 3}', 'RETS', 'P', idx, f'Class{idx}', 'Desc', 'agent', 10, 'IS_ACTIVE', status,
+                          'StatusFlag', 'T', 'Y', 'StatusFlag', 'T'] for idx in range(n)], columns=FINAL_HEADERS)
+
+
+@patch("builtins.print")
+class TestAuditDiff(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.state_dir = self.tmp_dir.name
+        self.delta_path = os.path.join(self.state_dir, "delta.xlsx")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_first_run_becomes_baseline(self, mock_print):
+        counts = audit_diff(audit_rows(5), self.state_dir, "agent", self.delta_path)
+        self.assertEqual(counts, {"added": 0, "removed": 0, "changed": 0, "unchanged": 5, "delta": None})
+        self.assertFalse(os.path.exists(self.delta_path))
+
+    def test_only_added_removed_and_changed_rows_are_reported(self, mock_print):
+        # Arrange
+        audit_diff(audit_rows(50), self.state_dir, "agent", self.delta_path)
+        current = audit_rows(52).drop(index=[3, 4]).reset_index(drop=True)
+        current.loc[current['Dataset ID'] == 7, 'Mapping Status'] = 'Deactivated'
+
+        # Act
+        counts = audit_diff(current, self.state_dir, "agent", self.delta_path)
+
+        # Assert
+        self.assertEqual({k: counts[k] for k in ("added", "removed", "changed", "unchanged")},
+                         {"added": 2, "removed": 2, "changed": 1, "unchanged": 47})
+        delta = pd.read_excel(self.delta_path, sheet_name="Audit Results")
+        changed = delta[delta['Change'] == 'changed'].iloc[0]
+        self.assertEqual((changed['Dataset ID'], changed['Changed Columns'], changed['Mapping Status']),
+                         (7, 'Mapping Status', 'Deactivated'))
+        self.assertEqual(sorted(delta[delta['Change'] == 'removed']['Dataset ID']), [3, 4])
+
+    def test_chunked_input_matches_single_frame(self, mock_print):
+        # Arrange
+        audit_diff(audit_rows(40), self.state_dir, "agent")
+        current = audit_rows(41)
+
+        # Act
+        counts = audit_diff((current.iloc[start:start + 6] for start in range(0, len(current), 6)),
+                            self.state_dir, "agent", partitions=16)
+
+        # Assert
+        self.assertEqual((counts["added"], counts["unchanged"]), (1, 40))
+
+    def test_partitions_bound_memory_per_comparison(self, mock_print):
+        # Act
+        audit_diff(audit_rows(200), self.state_dir, "agent", partitions=8)
+
+        # Assert
+        with open(os.path.join(self.state_dir, "agent", "meta.json")) as f:
+            self.assertEqual(json.load(f)["rows"], 200)
+        sizes = []
+        for idx in range(8):
+            with open(os.path.join(self.state_dir, "agent", f"part-{idx:02d}.jsonl")) as f:
+                sizes.append(sum(1 for _ in f))
+        self.assertEqual(sum(sizes), 200)
+        self.assertLess(max(sizes), 200)
+
+
+class TestAuditJobDiff(unittest.TestCase):
+
+    @patch("builtins.print")
+    @patch("Automation_Scripts.mapping_automation.src.main.write_updated_audit_to_excel")
+    @patch("Automation_Scripts.mapping_automation.src.main.run_audit_stages")
+    @patch("Automation_Scripts.mapping_automation.src.main.get_field_info", return_value=[(10, 'IS_ACTIVE')])
+    @patch("Automation_Scripts.mapping_automation.src.main.get_src_info", return_value=[])
+    def test_audit_job_stores_counts_on_result(self, mock_src, mock_field, mock_stages, mock_excel, mock_print):
+        with tempfile.TemporaryDirectory() as tmp:
+            # Arrange
+            mock_stages.side_effect = lambda *args, **kwargs: audit_rows(3)
+            job = {"name": "agent", "sources": ["SRC_0"], "download_type": "agent", "auth_url": "https://es",
+                   "report_path": os.path.join(tmp, "Canonical_Audit_agent_results.xlsx"), "diff_state_dir": tmp}
+
+            # Act
+            audit_job(MagicMock(), job)
+            result = audit_job(MagicMock(), job)
+
+        # Assert
+        self.assertEqual(result.attrs["diff"]["unchanged"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
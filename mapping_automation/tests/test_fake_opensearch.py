@@ -0,0 +1,129 @@
+# tests/test_fake_opensearch.py
+import gzip
+import json
+import time
+import unittest
+import requests
+from ..benchmarks.fake_opensearch import FakeOpenSearch, Corpus, apply_filter_path
+from ..src.main import get_metadata_elastic_search
+
+CORPUS = [
+    {"documentId": "src_a", "className": "class1", "resource": "property", "longName": "List Price",
+     "tableSystemName": "ListPrice"},
+    {"documentId": "src_a", "className": "class1", "resource": "entitytype", "longName": "List Price",
+     "tableSystemName": "LP_Entity"},
+    {"documentId": "src_a", "className": "class1", "resource": "property", "longName": "Original List Price",
+     "tableSystemName": "OrigListPrice"},
+    {"documentId": "src_b", "className": "agents", "resource": None, "longName": "StatusFlag",
+     "tableSystemName": "AGT_STATUS"},
+]
+
+
+class TestCorpusSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.corpus = Corpus(CORPUS)
+
+    def test_term_is_case_insensitive_and_phrase_is_contiguous(self):
+        # Act
+        result = self.corpus.search({"query": {"bool": {"must": [
+            {"term": {"documentId": {"value": "SRC_A"}}},
+            {"match_phrase": {"longName": "list price"}},
+        ]}}})
+
+        # Assert: both "List Price" docs and "Original List Price" contain the phrase
+        self.assertEqual(result["hits"]["total"]["value"], 3)
+
+    def test_phrase_requires_order(self):
+        result = self.corpus.search({"query": {"match_phrase": {"longName": "price list"}}})
+        self.assertEqual(result["hits"]["hits"], [])
+
+    def test_size_terminate_after_and_source_filter(self):
+        # Act
+        result = self.corpus.search({"_source": ["tableSystemName"], "size": 1, "terminate_after": 2,
+                                     "query": {"match_phrase": {"longName": "list price"}}})
+
+        # Assert
+        self.assertEqual(len(result["hits"]["hits"]), 1)
+        self.assertEqual(result["hits"]["hits"][0]["_source"], {"tableSystemName": "ListPrice"})
+        self.assertTrue(result["terminated_early"])
+
+    def test_filter_path(self):
+        payload = {"took": 3, "hits": {"total": {"value": 1}, "hits": [{"_id": "1", "_source": {"a": 1}}]}}
+        self.assertEqual(apply_filter_path(payload, "hits.hits._source"), {"hits": {"hits": [{"_source": {"a": 1}}]}})
+
+
+class TestFakeOpenSearchServer(unittest.TestCase):
+
+    def test_get_metadata_elastic_search_against_server(self):
+        with FakeOpenSearch(CORPUS) as server:
+            # Act
+            hit = get_metadata_elastic_search("SRC_A", "Class1", "List Price", "Property", server.search_url)
+            miss = get_metadata_elastic_search("SRC_A", "Class1", "Close Price", "Property", server.search_url)
+
+        # Assert
+        self.assertEqual([h["_source"]["tableSystemName"] for h in hit["hits"]["hits"]],
+                         ["ListPrice", "OrigListPrice"])
+        self.assertEqual(miss["hits"]["hits"], [])
+        self.assertEqual(server.stats["searches"], 2)
+
+    def test_resource_none_is_not_filtered(self):
+        with FakeOpenSearch(CORPUS) as server:
+            result = get_metadata_elastic_search("SRC_B", "Agents", "StatusFlag", None, server.search_url)
+
+        self.assertEqual(result["hits"]["hits"][0]["_source"]["tableSystemName"], "AGT_STATUS")
+
+    def test_msearch(self):
+        # Arrange
+        lines = [{}, {"query": {"match_phrase": {"longName": "StatusFlag"}}},
+                 {}, {"query": {"match_phrase": {"longName": "Nothing"}}}]
+        body = "\n".join(json.dumps(line) for line in lines) + "\n"
+
+        # Act
+        with FakeOpenSearch(CORPUS) as server:
+            response = requests.post(server.msearch_url, data=body,
+                                     headers={"Content-Type": "application/x-ndjson"}).json()
+
+        # Assert
+        self.assertEqual([r["hits"]["total"]["value"] for r in response["responses"]], [1, 0])
+        self.assertEqual(server.stats["msearch"], 1)
+        self.assertEqual(server.stats["searches"], 2)
+
+    def test_gzip_request_and_response(self):
+        # Arrange
+        body = gzip.compress(json.dumps({"query": {"match_phrase": {"longName": "StatusFlag"}}}).encode())
+
+        # Act
+        with FakeOpenSearch(CORPUS) as server:
+            response = requests.get(server.search_url, data=body,
+                                    headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+
+        # Assert
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.json()["hits"]["total"]["value"], 1)
+
+    def test_throttling_surfaces_as_error(self):
+        with FakeOpenSearch(CORPUS, throttle_rate=1.0) as server:
+            result = get_metadata_elastic_search("SRC_A", "Class1", "List Price", None, server.search_url)
+
+        self.assertIn("429", result["error"])
+        self.assertEqual(server.stats["throttled"], 1)
+
+    def test_error_injection(self):
+        with FakeOpenSearch(CORPUS, error_rate=1.0) as server:
+            result = get_metadata_elastic_search("SRC_A", "Class1", "List Price", None, server.search_url)
+
+        self.assertIn("500", result["error"])
+        self.assertEqual(server.stats["errors"], 1)
+
+    def test_latency_injection(self):
+        with FakeOpenSearch(CORPUS, latency_ms=50) as server:
+            start = time.perf_counter()
+            get_metadata_elastic_search("SRC_A", "Class1", "List Price", None, server.search_url)
+            elapsed = time.perf_counter() - start
+
+        self.assertGreaterEqual(elapsed, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
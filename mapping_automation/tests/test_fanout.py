@@ -0,0 +1,177 @@
+# tests/test_fanout.py
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+import pandas as pd
+from ..benchmarks.synthetic import generate
+from ..benchmarks.db_harness import LocalDatabase
+from ..src import main as mapping
+from ..src.cli import run_jobs
+from ..src.fanout import normalize_targets, status_comparison, target_job
+
+MAIN = "Automation_Scripts.mapping_automation.src.main"
+
+
+class TestTargets(unittest.TestCase):
+
+    def test_names_and_dicts_normalize_and_duplicates_raise(self):
+        self.assertEqual(normalize_targets(["us_east", {"name": "eu_west", "host": "eu"}]),
+                         [{"name": "us_east"}, {"name": "eu_west", "host": "eu"}])
+        with self.assertRaises(ValueError) as ctx:
+            normalize_targets(["us_east", {"name": "us_east"}])
+        self.assertIn("us_east", str(ctx.exception))
+
+    def test_target_job_gets_its_own_report_and_state(self):
+        # Arrange
+        job = {"name": "agent", "report_path": "/reports/agent.xlsx", "diff_state_dir": "/state/diff",
+               "targets": [{"name": "eu_west"}]}
+
+        # Act
+        scoped = target_job(job, {"name": "eu_west"})
+
+        # Assert
+        self.assertEqual(scoped["name"], "agent@eu_west")
+        self.assertEqual(scoped["parent"], "agent")
+        self.assertEqual(scoped["report_path"], "/reports/agent_eu_west.xlsx")
+        self.assertEqual(scoped["diff_state_dir"], os.path.join("/state/diff", "eu_west"))
+        self.assertNotIn("targets", scoped)
+
+    @patch(f"{MAIN}.psycopg2.pool.ThreadedConnectionPool")
+    def test_each_target_has_one_pool_with_its_settings(self, mock_pool_class):
+        # Arrange
+        mock_pool_class.side_effect = lambda **kwargs: MagicMock(settings=kwargs)
+        east, west = {"name": "us_east"}, {"name": "eu_west", "port": 6543}
+
+        # Act
+        with patch.dict(mapping.target_pools, clear=True):
+            conns = [mapping.get_connection(target) for target in (east, west, east)]
+            pools = dict(mapping.target_pools)
+            mapping.release_connection(conns[0], east)
+
+        # Assert
+        self.assertEqual(mock_pool_class.call_count, 2)
+        self.assertEqual(pools["us_east"].settings["host"], "sample_host_us_east")
+        self.assertEqual(pools["us_east"].settings["database"], "sample_db")
+        self.assertEqual(pools["eu_west"].settings["database"], "sample_db_eu")
+        self.assertEqual(pools["eu_west"].settings["port"], 6543)
+        pools["us_east"].putconn.assert_called_once_with(conns[0])
+
+    @patch(f"{MAIN}.psycopg2.pool.ThreadedConnectionPool")
+    def test_slow_target_does_not_block_other_pools(self, mock_pool_class):
+        # Arrange
+        started, release = threading.Event(), threading.Event()
+
+        def connect(**kwargs):
+            if kwargs["host"] == "sample_host_us_east":
+                started.set()
+                release.wait(5)
+            return MagicMock()
+
+        mock_pool_class.side_effect = connect
+
+        # Act
+        with patch.dict(mapping.target_pools, clear=True):
+            slow = threading.Thread(target=mapping.get_connection, args=({"name": "us_east"},))
+            slow.start()
+            started.wait(5)
+            try:
+                mapping.get_connection({"name": "eu_west"})
+                blocked = slow.is_alive()
+            finally:
+                release.set()
+                slow.join()
+            names = sorted(mapping.target_pools)
+
+        # Assert
+        self.assertTrue(blocked)
+        self.assertEqual(names, ["eu_west", "us_east"])
+
+
+class TestStatusComparison(unittest.TestCase):
+
+    def frame(self, rows):
+        return pd.DataFrame([["SRC_A", "RETS", "P", cls, "agent", field, status] for cls, field, status in rows],
+                            columns=['Source', 'Protocol', 'Provider', 'Class', 'Download Type',
+                                     'Canonical Field Name', 'Mapping Status'])
+
+    def test_statuses_side_by_side_with_missing_rows(self):
+        # Arrange
+        frames = {"east": self.frame([("C1", "F1", "Mapped"), ("C1", "F2", "Not Mapped")]),
+                  "west": self.frame([("C1", "F1", "Mapped"), ("C1", "F2", "Deactivated"), ("C2", "F1", "Mapped")])}
+
+        # Act
+        comparison = status_comparison(frames)
+
+        # Assert
+        self.assertEqual(comparison[["east", "west", "Consistent"]].values.tolist(),
+                         [["Mapped", "Mapped", "Y"], ["Not Mapped", "Deactivated", "N"], ["Missing", "Mapped", "N"]])
+
+
+@patch("builtins.print")
+class TestFanOutJob(unittest.TestCase):
+
+    def setUp(self):
+        self.data = generate(100, download_type="agent", seed=5)
+        self.dbs = {name: LocalDatabase("sqlite").start().load(self.data) for name in ("east", "west")}
+        # one mapping is deactivated in west only
+        mapping_id = next(m[0] for m in self.data.mappings if m[4])
+        self.dbs["west"].execute(f"UPDATE table_mapping SET is_active = 0 WHERE id = {mapping_id}")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.job = {"name": "agent", "sources": self.data.sources, "download_type": "agent",
+                    "fields": self.data.canonical_fields, "definitions": self.data.definitions,
+                    "auth_url": "https://es", "report_path": os.path.join(self.tmp_dir.name, "agent.xlsx"),
+                    "targets": normalize_targets(["east", "west"])}
+
+    def tearDown(self):
+        for db in self.dbs.values():
+            db.stop()
+        self.tmp_dir.cleanup()
+
+    @patch(f"{MAIN}._search_metadata", return_value={"hits": {"hits": [{"_source": {"tableSystemName": "TS"}}]}})
+    @patch(f"{MAIN}.release_connection")
+    @patch(f"{MAIN}.get_connection")
+    def test_targets_audit_concurrently_with_shared_es_lookups(self, mock_get_conn, mock_release, mock_search,
+                                                                mock_print):
+        # Arrange
+        mock_get_conn.side_effect = lambda target: self.dbs[target["name"]].connection()
+
+        # Act
+        result, = run_jobs("audit", [self.job])
+
+        # Assert
+        self.assertEqual(result["status"], "ok")
+        self.assertEqual([target["job"] for target in result["targets"]], ["agent@east", "agent@west"])
+        for name in ("east", "west"):
+            self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, f"agent_{name}.xlsx")))
+        self.assertEqual(result["comparison"], os.path.join(self.tmp_dir.name, "agent_comparison.xlsx"))
+        self.assertEqual(result["status_mismatches"], 1)
+        self.assertEqual(result["es_lookups"]["executed"], mock_search.call_count)
+        self.assertGreater(result["es_lookups"]["deduplicated"], 0)
+        self.assertIsNone(mapping.es_lookups.get())
+
+    @patch(f"{MAIN}.release_connection")
+    @patch(f"{MAIN}.get_connection")
+    def test_failed_target_fails_the_job_and_is_left_out_of_the_comparison(self, mock_get_conn, mock_release,
+                                                                           mock_print):
+        # Arrange
+        def connect(target):
+            if target["name"] == "west":
+                raise RuntimeError("west is unreachable")
+            return self.dbs["east"].connection()
+
+        mock_get_conn.side_effect = connect
+
+        # Act
+        with patch(f"{MAIN}._search_metadata", return_value={"hits": {"hits": []}}):
+            result, = run_jobs("audit", [self.job])
+
+        # Assert
+        self.assertEqual(result["status"], "failed")
+        self.assertEqual([target["status"] for target in result["targets"]], ["ok", "failed"])
+        self.assertEqual(result["status_mismatches"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# tests/test_history.py
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import pandas as pd
+from ..src.history import HistoryStore, open_history
+from ..src.main import FINAL_HEADERS
+
+
+def audit_rows(statuses):
+    return pd.DataFrame([[f'SRC_{idx % 2}', 'RETS', 'P', idx, f'Class{idx}', 'Desc', 'agent', 10, 'IS_ACTIVE', status,
+                          'StatusFlag', 'T', 'Y' if status != 'Mapped' else 'N/A', 'StatusFlag', 'T']
+                         for idx, status in enumerate(statuses)], columns=FINAL_HEADERS)
+
+
+@patch("builtins.print")
+class TestHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "history.db")
+        self.history = open_history(self.path)
+
+    def tearDown(self):
+        self.history.close()
+        self.tmp_dir.cleanup()
+
+    def test_runs_are_appended_with_metrics(self, mock_print):
+        # Act
+        first = self.history.record_run(audit_rows(['Mapped', 'Not Mapped']), 'agent', 'nightly',
+                                        metrics={"stage_seconds": {"audit": 1.5}}, recorded_ts='2026-01-01 00:00:00')
+        second = self.history.record_run(audit_rows(['Mapped', 'Mapped']), 'agent', 'nightly',
+                                         recorded_ts='2026-01-02 00:00:00')
+
+        # Assert
+        runs = self.history.runs('agent')
+        self.assertEqual({run[0] for run in runs}, {first, second})
+        self.assertEqual({run[0]: run[4] for run in runs}[first], {"stage_seconds": {"audit": 1.5}})
+        self.assertEqual([row[2] for row in self.history.status_history(1, 10)], ['Not Mapped', 'Mapped'])
+
+    def test_coverage_by_source_reads_per_run_summary(self, mock_print):
+        # Arrange
+        self.history.record_run(audit_rows(['Mapped', 'Not Mapped', 'Deactivated', 'Not Mapped']), 'agent',
+                                recorded_ts='2026-01-01 00:00:00')
+        self.history.record_run(audit_rows(['Mapped', 'Mapped', 'Mapped', 'Not Mapped']), 'agent',
+                                recorded_ts='2026-01-02 00:00:00')
+
+        # Act
+        trend = self.history.coverage_by_source('agent', source='SRC_1')
+
+        # Assert
+        self.assertEqual(trend, [('2026-01-01 00:00:00', 'SRC_1', 2, 0, 0.0),
+                                 ('2026-01-02 00:00:00', 'SRC_1', 2, 1, 0.5)])
+        self.assertEqual(len(self.history.coverage_by_source('agent', since='2026-01-02')), 2)
+        self.assertEqual(self.history.coverage_by_source('listing'), [])
+
+    def test_trend_query_uses_summary_index(self, mock_print):
+        # Act
+        plan = self.history.conn.execute("EXPLAIN QUERY PLAN select recorded_ts, total, mapped "
+                                         "from audit_source_summary where download_type = 'agent' "
+                                         "and source = 'SRC_1' order by recorded_ts").fetchall()
+
+        # Assert
+        self.assertIn("idx_audit_source_summary_ts", " ".join(row[3] for row in plan))
+
+
+class TestHistoryStorePostgres(unittest.TestCase):
+
+    @patch("builtins.print")
+    def test_rows_are_copied_in_one_statement(self, mock_print):
+        # Arrange
+        conn = MagicMock(server_version=150000)
+        cursor = conn.cursor.return_value
+        history = HistoryStore(conn)
+
+        # Act
+        history.record_run(audit_rows(['Mapped', 'Not Mapped', 'Mapped']), 'agent', run_id='run-1')
+
+        # Assert
+        cursor.copy_expert.assert_called_once()
+        qry, buffer = cursor.copy_expert.call_args[0]
+        self.assertTrue(qry.startswith("COPY audit_history ("))
+        self.assertEqual(len(buffer.getvalue().splitlines()), 3)
+        self.assertTrue(buffer.getvalue().startswith("run-1\t"))
+        history.close()
+        conn.close.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+# tests/test_incremental.py
+import os
+import tempfile
+import unittest
+import pandas as pd
+from ..benchmarks.synthetic import generate
+from ..benchmarks.db_harness import LocalDatabase
+from ..src.incremental import IncrementalState, incremental_audit
+from ..src.main import INITIAL_HEADERS, get_src_info, get_field_info, mapping_audit
+
+
+class TestIncrementalAudit(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.state_dir = os.path.join(self.tmp_dir.name, "state")
+        self.data = generate(100, download_type="agent", seed=5)
+        self.db = LocalDatabase("sqlite").start().load(self.data)
+        self.cursor = self.db.connection().cursor()
+        self.source_info = get_src_info(self.cursor, self.data.sources, "agent")
+        self.field_info = get_field_info(self.cursor, self.data.canonical_fields, "agent")
+        self.audited = []
+
+    def tearDown(self):
+        self.db.stop()
+        self.tmp_dir.cleanup()
+
+    def audit_fn(self, pending):
+        self.audited.append(len(pending))
+        return pd.DataFrame(mapping_audit(self.cursor, pending), columns=INITIAL_HEADERS[:10])
+
+    def run_incremental(self, **kwargs):
+        return incremental_audit(self.cursor, self.source_info, self.field_info, "agent", self.state_dir,
+                                 self.audit_fn, **kwargs)
+
+    def test_first_run_audits_everything_and_stores_watermarks(self):
+        # Act
+        results = self.run_incremental()
+
+        # Assert
+        self.assertEqual(self.audited, [100])
+        self.assertEqual(len(results), 100)
+        state = IncrementalState(self.state_dir, "agent")
+        self.assertIsNotNone(state.watermark(self.data.sources[0]))
+        self.assertEqual(len(state.load_results()), 100)
+
+    def test_unchanged_run_reuses_previous_results(self):
+        # Arrange
+        first = self.run_incremental()
+
+        # Act
+        second = self.run_incremental()
+
+        # Assert
+        self.assertEqual(self.audited, [100])
+        self.assertEqual(second.values.tolist(), first.values.tolist())
+
+    def test_changed_mapping_only_reaudits_that_pair(self):
+        # Arrange
+        self.run_incremental()
+        mapping_id, field_id, dataset_id = next((m[0], m[1], m[2]) for m in self.data.mappings if m[4])
+        self.db.execute(f"UPDATE table_mapping SET is_active = false, last_update_ts = '2999-01-01 00:00:00' "
+                        f"WHERE id = {mapping_id}")
+
+        # Act
+        results = self.run_incremental()
+
+        # Assert
+        self.assertEqual(self.audited, [100, 1])
+        row = results[(results['Dataset ID'] == dataset_id) & (results['Field ID'] == field_id)]
+        self.assertEqual(row['Mapping Status'].tolist(), ['Deactivated'])
+        self.assertEqual(len(results), 100)
+
+    def test_changed_dataset_reaudits_all_of_its_fields(self):
+        # Arrange
+        self.run_incremental()
+        dataset_id = self.source_info[0][3]
+        self.db.execute(f"UPDATE table_dataset_config SET last_update_ts = '2999-01-01 00:00:00' "
+                        f"WHERE dataset_id = {dataset_id}")
+
+        # Act
+        self.run_incremental()
+
+        # Assert
+        self.assertEqual(self.audited, [100, len(self.field_info)])
+
+    def test_changed_field_reaudits_it_for_every_dataset(self):
+        # Arrange
+        self.run_incremental()
+        field_id = self.field_info[0][0]
+        self.db.execute(f"UPDATE table_canonical_fields SET last_update_ts = '2999-01-01 00:00:00' "
+                        f"WHERE id = {field_id}")
+
+        # Act
+        self.run_incremental()
+
+        # Assert
+        self.assertEqual(self.audited, [100, len(self.source_info)])
+
+    def test_changed_definitions_or_endpoint_reaudit_everything(self):
+        # Arrange
+        self.run_incremental(fingerprint="definitions-v1")
+
+        # Act
+        self.run_incremental(fingerprint="definitions-v1")
+        self.run_incremental(fingerprint="definitions-v2")
+        self.run_incremental(fingerprint="definitions-v2")
+
+        # Assert
+        self.assertEqual(self.audited, [100, 100])
+        self.assertIsNone(IncrementalState(self.state_dir, "agent").load_results("definitions-v1"))
+
+    def test_deleted_mapping_reaudits_everything(self):
+        # Arrange
+        self.run_incremental()
+        mapping_id, field_id, dataset_id = next((m[0], m[1], m[2]) for m in self.data.mappings if m[4])
+        self.db.execute(f"DELETE FROM table_origin_field WHERE mapping_id = {mapping_id}")
+        self.db.execute(f"DELETE FROM table_mapping WHERE id = {mapping_id}")
+
+        # Act
+        results = self.run_incremental()
+        self.run_incremental()
+
+        # Assert
+        self.assertEqual(self.audited, [100, 100])
+        row = results[(results['Dataset ID'] == dataset_id) & (results['Field ID'] == field_id)]
+        self.assertEqual(row['Mapping Status'].tolist(), ['Not Mapped'])
+
+    def test_inserted_mapping_does_not_force_a_full_reaudit(self):
+        # Arrange
+        self.run_incremental()
+        field_id = self.field_info[0][0]
+        dataset_id, dataset_name = self.source_info[0][3], self.source_info[0][4]
+        self.db.execute(f"DELETE FROM table_mapping WHERE field_id = {field_id} AND dataset_id = {dataset_id}")
+        self.run_incremental()
+        self.db.execute(f"INSERT INTO table_mapping (field_id, dataset_id, dataset_name, download_type, is_active, "
+                        f"last_update_ts, create_ts) VALUES ({field_id}, {dataset_id}, '{dataset_name}', 'agent', "
+                        f"true, '2999-01-01 00:00:00', '2999-01-01 00:00:00')")
+
+        # Act
+        self.run_incremental()
+
+        # Assert
+        self.assertEqual(self.audited, [100, 100, 1])
+
+    def test_full_refresh_ignores_state(self):
+        self.run_incremental()
+        self.run_incremental(full_refresh=True)
+        self.assertEqual(self.audited, [100, 100])
+
+
+if __name__ == "__main__":
+    unittest.main()
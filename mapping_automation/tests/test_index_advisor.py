@@ -0,0 +1,104 @@
+# tests/test_index_advisor.py
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from ..benchmarks.synthetic import generate
+from ..benchmarks.db_harness import LocalDatabase
+from ..src.index_advisor import QUERY_SHAPES, advise, covering_index, explain
+from ..src.cli import run_jobs
+
+MAIN = "Automation_Scripts.mapping_automation.src.main"
+
+
+class TestIndexAdvisor(unittest.TestCase):
+
+    def setUp(self):
+        self.db = LocalDatabase("sqlite").start().load(generate(200, seed=2))
+        self.conn = self.db.connection()
+
+    def tearDown(self):
+        self.db.stop()
+
+    def test_harness_schema_serves_every_query_shape(self):
+        # Act
+        report = advise(self.conn, large_rows=0)
+
+        # Assert
+        self.assertEqual([entry["kind"] for entry in report], [shape["kind"] for shape in QUERY_SHAPES])
+        self.assertEqual([entry["kind"] for entry in report if entry["flagged"]], [])
+        self.assertTrue(all(entry["plan"] for entry in report))
+
+    def test_missing_index_is_flagged_and_created(self):
+        # Arrange
+        self.db.execute("DROP INDEX idx_origin_lookup")
+
+        # Act
+        before = advise(self.conn, large_rows=0)
+        created = advise(self.conn, create=True, large_rows=0)
+        after = advise(self.conn, large_rows=0)
+
+        # Assert
+        entry = next(entry for entry in before if entry["kind"] == "origin_field_prefetch")
+        self.assertTrue(entry["flagged"])
+        self.assertTrue(entry["seq_scan"])
+        self.assertIn("ON table_origin_field (mapping_id, source_field, dataset_id)", entry["suggestion"])
+        self.assertTrue(next(e for e in created if e["kind"] == "origin_field_prefetch")["created"])
+        self.assertFalse(any(entry["flagged"] for entry in after))
+
+    def test_small_tables_are_not_flagged_for_scans_when_indexed(self):
+        report = advise(self.conn, large_rows=10 ** 9)
+        json.dumps(report)  # the report is stored in job summaries
+        self.assertFalse(any(entry["flagged"] for entry in report))
+
+
+class TestPlanParsing(unittest.TestCase):
+
+    def test_postgres_json_plan_reports_seq_scans(self):
+        # Arrange
+        cursor = MagicMock()
+        cursor.fetchone.return_value = [[{"Plan": {
+            "Node Type": "Nested Loop", "Plan Rows": 5, "Plans": [
+                {"Node Type": "Seq Scan", "Relation Name": "table_mapping", "Plan Rows": 5,
+                 "Actual Rows": 4, "Actual Total Time": 12.5},
+                {"Node Type": "Index Scan", "Relation Name": "table_origin_field", "Index Name": "idx_origin_lookup",
+                 "Plan Rows": 1}]}}]]
+
+        # Act
+        lines, seq_scans = explain(cursor, "select 1", "postgres", analyze=True)
+
+        # Assert
+        self.assertIn("EXPLAIN (FORMAT JSON, ANALYZE, BUFFERS) select 1", cursor.execute.call_args[0][0])
+        self.assertEqual(seq_scans, {"table_mapping"})
+        self.assertEqual(lines[1], "Seq Scan on table_mapping (rows=4, time=12.5ms)")
+        self.assertEqual(lines[2], "Index Scan on table_origin_field using idx_origin_lookup (rows=1)")
+
+    def test_covering_index_matches_leading_columns(self):
+        indexes = {"idx_mapping_lookup": ("field_id", "dataset_id", "dataset_name", "download_type")}
+        self.assertEqual(covering_index(indexes, ("dataset_id", "field_id")), "idx_mapping_lookup")
+        self.assertIsNone(covering_index(indexes, ("dataset_id", "download_type")))
+
+
+@patch("builtins.print")
+@patch(f"{MAIN}.release_connection")
+@patch(f"{MAIN}.get_connection")
+class TestExplainInJobReport(unittest.TestCase):
+
+    @patch("Automation_Scripts.mapping_automation.src.cli.advise",
+           return_value=[{"kind": "mapping_audit", "flagged": True}])
+    @patch(f"{MAIN}.audit_job")
+    def test_explain_adds_query_plans_to_job_result(self, mock_audit, mock_advise, mock_get_conn, mock_release,
+                                                    mock_print):
+        # Arrange
+        job = {"name": "agent", "sources": ["SRC_A"], "download_type": "agent", "auth_url": "https://es",
+               "report_path": "agent.xlsx", "explain": "analyze"}
+
+        # Act
+        results = run_jobs("audit", [job])
+
+        # Assert
+        mock_advise.assert_called_once_with(mock_get_conn.return_value, analyze=True)
+        self.assertEqual(results[0]["query_plans"], mock_advise.return_value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+# tests/test_jsonfile.py
+import datetime
+import os
+import tempfile
+import unittest
+import numpy as np
+from ..src.jsonfile import read_json, write_json, write_text
+
+
+class TestAtomicJsonFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "state.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_scalars_are_stored_as_plain_values(self):
+        # Arrange
+        payload = {"count": np.int64(3), "ratio": np.float64(0.5), "ts": datetime.date(2024, 1, 2)}
+
+        # Act
+        write_json(self.path, payload)
+
+        # Assert
+        self.assertEqual(read_json(self.path), {"count": 3, "ratio": 0.5, "ts": "2024-01-02"})
+
+    def test_replaces_the_file_without_leaving_temporary_files(self):
+        # Arrange
+        write_json(self.path, {"version": 1})
+
+        # Act
+        write_json(self.path, {"version": 2}, indent=2)
+
+        # Assert
+        self.assertEqual(read_json(self.path), {"version": 2})
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["state.json"])
+
+    def test_text_files_are_replaced_whole(self):
+        # Arrange
+        path = os.path.join(self.tmp_dir.name, "apply.sql")
+        write_text(path, "BEGIN;\n")
+
+        # Act
+        write_text(path, "BEGIN;\nCOMMIT;\n")
+
+        # Assert
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "BEGIN;\nCOMMIT;\n")
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["apply.sql"])
+
+
+if __name__ == "__main__":
+    unittest.main()
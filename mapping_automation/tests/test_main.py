@@ -1,12 +1,14 @@
 # tests/test_main.py
+import gzip
 import json
 import unittest
 from tkinter.constants import ACTIVE
 from unittest.mock import patch, MagicMock
-from ..src.main import (get_connection, get_src_info, get_field_info, mapping_audit, append_proposed_fields,
+from ..src.main import (create_pool, get_connection, release_connection, get_src_info, get_field_info, mapping_audit, append_proposed_fields,
                         get_metadata_elastic_search, elasticsearch_check_from_df, add_finalized_transformation,
                         write_updated_audit_to_excel, canonical_inserts_from_df, origin_inserts_from_df,
-                        canonical_updates_from_df, origin_updates_from_df)
+                        canonical_updates_from_df, origin_updates_from_df, parse_proposed, origin_insert_names,
+                        origin_update_names)
 from requests.exceptions import RequestException
 import pandas as pd
 from openpyxl.utils import get_column_letter
@@ -30,6 +32,28 @@ class TestDBConnection(unittest.TestCase):
         mock_pool_instance.getconn.assert_called_once()
         self.assertEqual(conn, mock_conn)
 
+    @patch('Automation_Scripts.mapping_automation.src.main.psycopg2.pool.ThreadedConnectionPool')
+    def test_create_pool_threaded(self, mock_threaded_pool):
+        # Act
+        created = create_pool(threaded=True)
+
+        # Assert
+        self.assertEqual(created, mock_threaded_pool.return_value)
+        self.assertEqual(mock_threaded_pool.call_args.kwargs["maxconn"], 10)
+
+    def test_release_connection_returns_conn_to_pool(self):
+        # Arrange
+        mock_pool = MagicMock()
+        mock_conn = MagicMock()
+
+        # Act
+        with patch('Automation_Scripts.mapping_automation.src.main.pool', mock_pool):
+            release_connection(mock_conn)
+
+        # Assert
+        mock_pool.putconn.assert_called_once_with(mock_conn)
+        mock_conn.close.assert_not_called()
+
 class TestGetSrcInfo(unittest.TestCase):
 
     def test_get_src_info_returns_expected(self):
@@ -184,6 +208,38 @@ class TestGetMetadataElasticSearch(unittest.TestCase):
         self.assertIn("error", result)
         self.assertIn("Network error", result["error"])
 
+    @patch("Automation_Scripts.mapping_automation.src.main.lean_es", True)
+    @patch("Automation_Scripts.mapping_automation.src.main.requests.get")
+    def test_lean_request_asks_for_one_filtered_gzipped_hit(self, mock_get):
+        # Arrange
+        mock_get.return_value.content = b'{"hits":{"hits":[{"_source":{"tableSystemName":"tbl_name"}}]}}'
+
+        # Act
+        result = get_metadata_elastic_search("SRC_A", "Dataset1", "Field1", None, "https://fake-url.com")
+
+        # Assert
+        kwargs = mock_get.call_args.kwargs
+        body = json.loads(gzip.decompress(kwargs["data"]))
+        self.assertEqual((body["size"], body["terminate_after"], body["_source"]), (1, 1, ["tableSystemName"]))
+        self.assertEqual(kwargs["params"], {"filter_path": "hits.hits._source"})
+        self.assertEqual(kwargs["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(kwargs["headers"]["Accept-Encoding"], "gzip")
+        self.assertEqual(result["hits"]["hits"][0]["_source"]["tableSystemName"], "tbl_name")
+        mock_get.return_value.json.assert_not_called()
+
+    @patch("Automation_Scripts.mapping_automation.src.main.lean_es", True)
+    @patch("Automation_Scripts.mapping_automation.src.main.requests.get")
+    def test_lean_response_that_is_not_json_is_a_failed_lookup(self, mock_get):
+        # Arrange
+        mock_get.return_value.content = b'<html>502 Bad Gateway</html>'
+
+        # Act
+        result = get_metadata_elastic_search("SRC_A", "Dataset1", "Field1", None, "https://fake-url.com")
+
+        # Assert
+        self.assertIn("error", result)
+
+
 class TestElasticsearchCheckFromDf(unittest.TestCase):
 
     def setUp(self):
@@ -279,6 +335,19 @@ class TestElasticsearchCheckFromDf(unittest.TestCase):
         # Make sure both fields were checked
         self.assertEqual(mock_meta.call_count, 2)
 
+    @patch("Automation_Scripts.mapping_automation.src.main.get_metadata_elastic_search")
+    def test_report_column_spelling_is_read(self, mock_meta):
+        # Arrange: the audit pipeline builds its frame with INITIAL_HEADERS ('Proposed Fields Short Name')
+        mock_meta.return_value = {"hits": {"hits": [{"_source": {"tableSystemName": "tbl"}}]}}
+        df = self.base_df.rename(columns={"Proposed Field Short Name": "Proposed Fields Short Name"})
+
+        # Act
+        result_df = elasticsearch_check_from_df(df, "http://fake-url")
+
+        # Assert
+        self.assertEqual(result_df.iloc[0]["es_Pass"], "Y")
+        self.assertEqual(mock_meta.call_args[0][2], "Field1")
+
     @patch("Automation_Scripts.mapping_automation.src.main.get_metadata_elastic_search")
     def test_resource_mapping_variants(self, mock_meta):
         mock_meta.return_value = {"hits": {"hits": [{"_source": {"tableSystemName": "tbl"}}]}}
@@ -386,10 +455,11 @@ class TestCanonicalInsertsFromDF(unittest.TestCase):
         mock_conn = MagicMock()
         mock_cursor = mock_conn.cursor.return_value
 
-        mock_cursor.fetchone.side_effect = [None, (1,)]
+        # Existing-mapping prefetch finds row 2, then the INSERT ... RETURNING yields the new id for row 1
+        mock_cursor.fetchall.side_effect = [[(7, 2, 20, "ClassB", "TEST_DOWNLOAD")], [(11, 1, 10, "ClassA")]]
 
         # Act
-        canonical_inserts_from_df(df, mock_conn, "TEST_DOWNLOAD")
+        mapping_ids = canonical_inserts_from_df(df, mock_conn, "TEST_DOWNLOAD")
 
         # Assert
         execute_calls = [call.args[0] for call in mock_cursor.execute.call_args_list]
@@ -404,8 +474,13 @@ class TestCanonicalInsertsFromDF(unittest.TestCase):
         self.assertRegex(insert_sql, r"VALUES\s*\(\s*1\s*,", "Expected first value in VALUES to be 1 (field_id)")
         self.assertRegex(insert_sql, r"VALUES\s*\(\s*1\s*,\s*10\s*,", "Expected second value in VALUES to be 10 (dataset_id)")
 
-        # Ensure mapping value is included
+        # Ensure mapping value is included, and only for the row that did not exist
         self.assertIn("'mapA'", insert_sql)
+        self.assertNotIn("'mapB'", insert_sql)
+        self.assertIn("RETURNING id", insert_sql)
+
+        # Existing and new mapping ids are returned keyed by (field_id, dataset_id)
+        self.assertEqual(mapping_ids, {(1, 10): [(11, "ClassA")], (2, 20): [(7, "ClassB")]})
 
         # Now check print statements (but only for the summary, not the SQL itself)
         printed_statements = [call.args[0] for call in mock_print.call_args_list]
@@ -425,7 +500,7 @@ class TestCanonicalInsertsFromDF(unittest.TestCase):
         mock_cursor = mock_conn.cursor.return_value
 
         # Simulate that row already exists
-        mock_cursor.fetchone.return_value = (1,)
+        mock_cursor.fetchall.return_value = [(5, 1, 10, "ClassA", "TEST_DOWNLOAD")]
 
         # Act
         canonical_inserts_from_df(df, mock_conn, "TEST_DOWNLOAD")
@@ -470,6 +545,27 @@ class TestOriginInsertsFromDF(unittest.TestCase):
                             for stmt in printed_statements))
         self.assertIn("No new origin inserts created", printed_statements[-1])
 
+    @patch("builtins.print")
+    def test_origin_inserts_from_df_uses_mapping_ids_without_lookup(self, mock_print):
+        # Arrange
+        df = pd.DataFrame([
+            {"Field ID": 1, "Dataset ID": 10, "Class": "ClassA",
+             "Proposed Fields Long Name": "LongName",
+             "Proposed Field Short Name": "ShortName"},
+        ])
+        mock_conn = MagicMock()
+        mock_cursor = mock_conn.cursor.return_value
+        mock_cursor.fetchall.return_value = []
+
+        # Act
+        origin_inserts_from_df(df, mock_conn, mapping_ids={(1, 10): [(123, "ClassA")]})
+
+        # Assert
+        execute_calls = [call.args[0] for call in mock_cursor.execute.call_args_list]
+        self.assertFalse(any("FROM table_mapping" in stmt for stmt in execute_calls))
+        self.assertIn("FROM table_origin_field", execute_calls[0])
+        self.assertIn("VALUES (123, 'LongName', 10", execute_calls[1])
+
     @patch("builtins.print")
     def test_origin_inserts_from_df_fetchall_result_no_db_class(self, mock_print):
 
@@ -514,8 +610,8 @@ class TestOriginInsertsFromDF(unittest.TestCase):
         mock_conn = MagicMock()
         mock_cursor = mock_conn.cursor.return_value
 
-        mock_cursor.fetchall.return_value = [(123, "ClassA")]
-        mock_cursor.fetchone.return_value = [(1,)]
+        # mapping lookup, then the origin field prefetch finds the field
+        mock_cursor.fetchall.side_effect = [[(123, "ClassA")], [(123, "LongName", 10)]]
 
         # Act
         origin_inserts_from_df(df, mock_conn)
@@ -533,7 +629,8 @@ class TestOriginInsertsFromDF(unittest.TestCase):
         execute_calls = [call.args[0] for call in mock_cursor.execute.call_args_list]
         self.assertEqual(len(execute_calls), 2)
         self.assertIn("SELECT id, dataset_name FROM table_mapping", execute_calls[0])
-        self.assertIn("SELECT 1 FROM table_origin_field", execute_calls[1])
+        self.assertIn("FROM table_origin_field", execute_calls[1])
+        self.assertIn("IN (VALUES (123, 'LongName', 10))", execute_calls[1])
         self.assertIn("No new origin inserts created", printed_statements[-1])
 
     @patch("builtins.print")
@@ -552,8 +649,7 @@ class TestOriginInsertsFromDF(unittest.TestCase):
         mock_conn = MagicMock()
         mock_cursor = mock_conn.cursor.return_value
 
-        mock_cursor.fetchall.return_value = [(123, "ClassA")]
-        mock_cursor.fetchone.return_value = None
+        mock_cursor.fetchall.side_effect = [[(123, "ClassA")], []]
 
         # Act
         origin_inserts_from_df(df, mock_conn)
@@ -564,7 +660,7 @@ class TestOriginInsertsFromDF(unittest.TestCase):
         execute_calls = [call.args[0] for call in mock_cursor.execute.call_args_list]
         self.assertEqual(len(execute_calls), 3)
         self.assertIn("SELECT id, dataset_name FROM table_mapping", execute_calls[0])
-        self.assertIn("SELECT 1 FROM table_origin_field", execute_calls[1])
+        self.assertIn("FROM table_origin_field", execute_calls[1])
         self.assertIn("INSERT INTO table_origin_field",execute_calls[2])
 
         mock_conn.commit.assert_called_once()
@@ -588,8 +684,7 @@ class TestOriginInsertsFromDF(unittest.TestCase):
         mock_conn = MagicMock()
         mock_cursor = mock_conn.cursor.return_value
 
-        mock_cursor.fetchall.return_value = [(123, "ClassA")]
-        mock_cursor.fetchone.side_effect = [(1,), None]
+        mock_cursor.fetchall.side_effect = [[(123, "ClassA")], [(123, "LongName1", 10)]]
 
         # Act
         origin_inserts_from_df(df, mock_conn)
@@ -608,8 +703,9 @@ class TestOriginInsertsFromDF(unittest.TestCase):
         # SELECT mapping query
         self.assertIn("SELECT id, dataset_name FROM table_mapping", execute_calls[0])
 
-        # SELECT origin field existence queries
-        self.assertIn("SELECT 1 FROM table_origin_field", execute_calls[1])
+        # One origin field existence prefetch covering both fields
+        self.assertIn("FROM table_origin_field", execute_calls[1])
+        self.assertIn("(123, 'LongName1', 10), (123, 'LongName2', 10)", execute_calls[1])
 
         # INSERT executed only for non-existing origin fields
         insert_calls = [stmt for stmt in execute_calls if stmt.strip().startswith("INSERT INTO")]
@@ -843,10 +939,8 @@ class TestOriginUpdateFromDf(unittest.TestCase):
 
         mock_conn = MagicMock()
         mock_cursor = mock_conn.cursor.return_value
-        mock_cursor.fetchone.side_effect = [
-            (123,),  # mapping_id exists
-            None    # origin field does not exist → triggers INSERT
-        ]
+        mock_cursor.fetchone.return_value = (123,)  # mapping_id exists
+        mock_cursor.fetchall.return_value = []  # origin field does not exist → triggers INSERT
 
         # Act
         origin_updates_from_df(df, mock_conn)
@@ -855,10 +949,28 @@ class TestOriginUpdateFromDf(unittest.TestCase):
         execute_calls = [call.args[0] for call in mock_cursor.execute.call_args_list]
 
         self.assertIn("SELECT id FROM table_mapping", execute_calls[0])
-        self.assertIn( "SELECT 1 FROM table_origin_field", execute_calls[1])
+        self.assertIn( "FROM table_origin_field", execute_calls[1])
         self.assertIn( "INSERT INTO table_origin_field", execute_calls[2])
         self.assertIn("VALUES (123, 'ShortName', 10, true, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 'ShortName', 'LongName')", execute_calls[2])
 
 
+class TestProposedNames(unittest.TestCase):
+
+    def test_identical_proposals_share_one_parsed_tuple(self):
+        self.assertEqual(parse_proposed("Field1 , Field2"), ("Field1", "Field2"))
+        self.assertIs(parse_proposed("Field1 , Field2"), parse_proposed("Field1 , Field2"))
+
+    def test_both_short_name_spellings_give_the_same_pairs(self):
+        # Arrange
+        legacy = {"Proposed Field Short Name": "A, B", "Proposed Fields Long Name": "tbl_a, tbl_b"}
+        report = {"Proposed Fields Short Name": "A, B", "Proposed Fields Long Name": "tbl_a, tbl_b"}
+
+        # Assert
+        self.assertEqual(origin_update_names(legacy), (("A", "tbl_a"), ("B", "tbl_b")))
+        self.assertEqual(origin_update_names(report), origin_update_names(legacy))
+        self.assertEqual(origin_insert_names(report), (("tbl_a", "A"), ("tbl_b", "B")))
+        self.assertEqual(origin_insert_names(report), origin_insert_names(legacy))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,101 @@
+# tests/test_memory.py
+import unittest
+from unittest.mock import MagicMock, patch
+from ..src import memory
+from ..src.main import audit_job
+from ..src.cli import run_job
+from .test_diff import audit_rows
+
+
+class TestMemoryProfiler(unittest.TestCase):
+
+    def tearDown(self):
+        memory.disable()
+
+    def test_disabled_stage_is_a_no_op(self):
+        with memory.stage("anything"):
+            pass
+        self.assertFalse(memory.is_enabled())
+        self.assertEqual(memory.report(), [])
+
+    def test_stage_records_rss_and_top_allocation_site(self):
+        # Arrange
+        memory.enable(top=3)
+
+        # Act
+        with memory.stage("build"):
+            rows = [(n, str(n)) for n in range(200000)]
+
+        # Assert
+        record, = memory.report()
+        self.assertEqual(record["stage"], "build")
+        self.assertGreater(record["py_peak_mb"], 5)
+        self.assertGreaterEqual(record["peak_rss_mb"], record["rss_mb"] - record["rss_delta_mb"])
+        self.assertIn("test_memory.py", record["top"][0]["site"])
+        self.assertEqual(len(rows), 200000)
+
+    def test_budget_fails_at_the_stage_boundary(self):
+        # Arrange
+        memory.enable(budget_mb=1)
+
+        # Act / Assert
+        with self.assertRaises(memory.MemoryBudgetExceeded) as ctx:
+            with memory.stage("cross_product"):
+                pass
+        self.assertIn("Stage 'cross_product' peaked at", str(ctx.exception))
+        self.assertIn("over the 1 MB budget", str(ctx.exception))
+
+    def test_report_reset_starts_a_new_run(self):
+        memory.enable()
+        with memory.stage("a"):
+            pass
+        self.assertEqual([record["stage"] for record in memory.report(reset=True)], ["a"])
+        self.assertEqual(memory.report(), [])
+
+
+class TestAuditJobMemory(unittest.TestCase):
+
+    def tearDown(self):
+        memory.disable()
+
+    @patch("builtins.print")
+    @patch("Automation_Scripts.mapping_automation.src.main.write_updated_audit_to_excel")
+    @patch("Automation_Scripts.mapping_automation.src.main.run_audit_stages", side_effect=lambda *a, **k: audit_rows(3))
+    @patch("Automation_Scripts.mapping_automation.src.main.get_field_info", return_value=[(10, 'IS_ACTIVE')])
+    @patch("Automation_Scripts.mapping_automation.src.main.get_src_info", return_value=[])
+    def test_job_boundaries_are_recorded(self, mock_src, mock_field, mock_stages, mock_excel, mock_print):
+        # Arrange
+        memory.enable()
+        job = {"sources": ["SRC_0"], "download_type": "agent", "auth_url": "https://es", "report_path": "r.xlsx"}
+
+        # Act
+        audit_job(MagicMock(), job)
+
+        # Assert
+        self.assertEqual([record["stage"] for record in memory.report()],
+                         ["reference_data", "cross_product", "excel_report"])
+
+    @patch("builtins.print")
+    @patch("Automation_Scripts.mapping_automation.src.cli.mapping")
+    def test_budget_fails_the_cli_job_with_its_message(self, mock_mapping, mock_print):
+        # Arrange
+        memory.enable(budget_mb=1)
+
+        def audit(conn, job, checkpoint):
+            with memory.stage("elasticsearch_check"):
+                pass
+
+        mock_mapping.audit_job.side_effect = audit
+        job = {"name": "agent", "download_type": "agent", "report_path": "r.xlsx"}
+
+        # Act
+        result = run_job("audit", job)
+
+        # Assert
+        self.assertEqual(result["status"], "failed")
+        self.assertIn("Stage 'elasticsearch_check' peaked at", result["error"])
+        self.assertEqual([record["stage"] for record in result["memory"]], ["elasticsearch_check"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+# tests/test_reference.py
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from ..benchmarks.synthetic import generate
+from ..benchmarks.db_harness import LocalDatabase
+from ..src import main as mapping
+from ..src.reference import ReferenceCache
+
+
+class TestReferenceCache(unittest.TestCase):
+
+    def setUp(self):
+        self.data = generate(200, download_type="listing", seed=3)
+        self.db = LocalDatabase("sqlite").start().load(self.data)
+        self.cursor = self.db.connection().cursor()
+        self.sources = self.data.sources[:2]
+        self.fields = self.data.canonical_fields[:5]
+
+    def tearDown(self):
+        self.db.stop()
+
+    def lookup(self, cache, stage):
+        with self.db.stage(stage):
+            return (sorted(cache.src_info(self.cursor, self.sources, "listing")),
+                    sorted(cache.field_info(self.cursor, self.fields, "listing")))
+
+    def test_matches_direct_queries_and_validates_with_one_query_per_table(self):
+        # Arrange
+        cache = ReferenceCache()
+        expected = (sorted(mapping.get_src_info(self.cursor, self.sources, "listing")),
+                    sorted(mapping.get_field_info(self.cursor, self.fields, "listing")))
+
+        # Act
+        first = self.lookup(cache, "first")
+        second = self.lookup(cache, "second")
+
+        # Assert
+        self.assertEqual(first, expected)
+        self.assertEqual(second, expected)
+        self.assertEqual(self.db.statements("first"), 4)
+        self.assertEqual(self.db.statements("second"), 2)
+        self.assertEqual(cache.stats(), {"snapshots": 2, "hits": 2, "reloads": 2})
+
+    def test_changed_rows_reload_the_snapshot(self):
+        # Arrange
+        cache = ReferenceCache()
+        self.lookup(cache, "first")
+        self.db.execute("UPDATE table_canonical_fields SET name = 'RENAMED', last_update_ts = '2999-01-01' "
+                        "WHERE id = 1")
+        self.db.execute("INSERT INTO table_dataset_config (dataset_id, dataset_name, dataset_description, "
+                        "download_type) VALUES (1, 'NewClass', 'New', 'listing')")
+
+        # Act
+        src_rows, field_rows = self.lookup(cache, "second")
+
+        # Assert
+        self.assertIn('NewClass', [row[4] for row in src_rows])
+        self.assertNotIn(1, [row[0] for row in field_rows])
+        self.assertEqual(cache.reloads, 4)
+
+    def test_snapshot_files_are_shared_between_instances(self):
+        # Arrange
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        expected = self.lookup(ReferenceCache(path), "first")
+
+        # Act
+        other = ReferenceCache(path)
+        result = self.lookup(other, "second")
+
+        # Assert
+        self.assertEqual(result, expected)
+        self.assertEqual(other.reloads, 0)
+        self.assertEqual(self.db.statements("second"), 2)
+
+    def test_max_age_skips_validation(self):
+        cache = ReferenceCache(max_age=60)
+        self.lookup(cache, "first")
+        self.lookup(cache, "second")
+        self.assertEqual(self.db.statements("second"), 0)
+
+    def test_slow_load_does_not_block_other_download_types(self):
+        # Arrange
+        cache = ReferenceCache()
+        started, release = threading.Event(), threading.Event()
+        slow_cursor = MagicMock()
+        slow_cursor.execute.side_effect = lambda *args: started.set() or release.wait(5)
+        slow_cursor.fetchone.return_value = (0, None, None)
+        slow_cursor.fetchall.return_value = []
+        slow = threading.Thread(target=cache.src_info, args=(slow_cursor, self.sources, "agent"))
+        slow.start()
+        started.wait(5)
+
+        # Act
+        try:
+            src_rows, _ = self.lookup(cache, "first")
+            blocked = slow.is_alive()
+        finally:
+            release.set()
+            slow.join()
+
+        # Assert
+        self.assertTrue(blocked)
+        self.assertGreater(len(src_rows), 0)
+        self.assertEqual(cache.stats()["snapshots"], 3)
+
+    def test_scopes_keep_separate_snapshots(self):
+        # Arrange
+        cache = ReferenceCache()
+        with self.db.stage("first"):
+            cache.src_info(self.cursor, self.sources, "listing", scope="us_east")
+
+        # Act
+        with self.db.stage("second"):
+            rows = cache.src_info(self.cursor, self.sources, "listing", scope="eu_west")
+
+        # Assert
+        self.assertTrue(rows)
+        self.assertEqual(self.db.statements("second"), 2)
+        self.assertEqual(cache.stats()["snapshots"], 2)
+
+
+class TestReferenceCacheWiring(unittest.TestCase):
+
+    def test_get_src_and_field_info_use_module_cache(self):
+        # Arrange
+        cache, cursor = MagicMock(), MagicMock()
+
+        # Act
+        with patch.object(mapping, "reference_cache", cache):
+            mapping.get_src_info(cursor, ["SRC_A"], "agent")
+            mapping.get_field_info(cursor, ("IS_ACTIVE",), "agent")
+
+        # Assert
+        cache.src_info.assert_called_once_with(cursor, ["SRC_A"], "agent", scope=None)
+        cache.field_info.assert_called_once_with(cursor, ("IS_ACTIVE",), "agent", scope=None)
+        cursor.execute.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+# tests/test_service.py
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import requests
+from ..src.main import get_metadata_elastic_search
+from ..src.service import AuditService, MetadataCache
+
+MAIN = "Automation_Scripts.mapping_automation.src.main"
+SERVICE = "Automation_Scripts.mapping_automation.src.service"
+
+
+class TestMetadataCache(unittest.TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = MetadataCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+
+    @patch(f"{SERVICE}.time.monotonic")
+    def test_expired_entries_are_misses(self, mock_clock):
+        # Arrange
+        cache = MetadataCache(ttl=10)
+        mock_clock.return_value = 100
+        cache.set("a", 1)
+
+        # Act
+        mock_clock.return_value = 111
+        result = cache.get("a")
+
+        # Assert
+        self.assertIsNone(result)
+        self.assertEqual(cache.misses, 1)
+
+    def test_es_lookups_use_shared_session_and_cache(self):
+        # Arrange
+        session = MagicMock()
+        session.get.return_value.status_code = 200
+        session.get.return_value.json.return_value = {"hits": {"hits": [{"_source": {"tableSystemName": "T"}}]}}
+        cache = MetadataCache()
+
+        # Act
+        with patch(f"{MAIN}.http_session", session), patch(f"{MAIN}.metadata_cache", cache):
+            first = get_metadata_elastic_search("SRC_A", "Class", "StatusFlag", None, "https://es")
+            second = get_metadata_elastic_search("SRC_A", "Class", "StatusFlag", None, "https://es")
+
+        # Assert
+        session.get.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_failed_lookups_are_not_cached(self):
+        session = MagicMock()
+        session.get.side_effect = requests.exceptions.ConnectionError("down")
+        cache = MetadataCache()
+        with patch(f"{MAIN}.http_session", session), patch(f"{MAIN}.metadata_cache", cache):
+            result = get_metadata_elastic_search("SRC_A", "Class", "StatusFlag", None, "https://es")
+        self.assertIn("error", result)
+        self.assertEqual(len(cache), 0)
+
+
+@patch.object(AuditService, "warm_up")
+class TestAuditService(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.spool = self.tmp_dir.name
+        self.job = {"name": "nightly", "sources": ["SRC_A"], "download_type": "agent"}
+        self.defaults = {"auth_url": "https://es", "out_path": self.spool}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_queue(self, service):
+        service.start()
+        try:
+            claimed = service.poll_once()
+        finally:
+            service.shutdown()
+        return claimed
+
+    @patch(f"{SERVICE}.run_job")
+    def test_spooled_job_runs_and_writes_report(self, mock_run_job, mock_warm_up):
+        # Arrange
+        mock_run_job.return_value = {"job": "nightly", "status": "ok", "audited_rows": 12}
+        service = AuditService(self.spool, workers=2, defaults=self.defaults)
+        job_id = service.submit(dict(self.job, command="audit-and-apply"))
+
+        # Act
+        claimed = self.run_queue(service)
+
+        # Assert
+        self.assertEqual(claimed, 1)
+        command, job = mock_run_job.call_args[0][:2]
+        self.assertEqual(command, "audit-and-apply")
+        self.assertEqual(job["auth_url"], "https://es")
+        self.assertEqual(service.status(job_id)["audited_rows"], 12)
+        self.assertTrue(os.path.exists(os.path.join(self.spool, "done", f"{job_id}.json")))
+        self.assertEqual(service.stats["ok"], 1)
+
+    @patch(f"{SERVICE}.run_job")
+    def test_invalid_job_is_moved_to_failed(self, mock_run_job, mock_warm_up):
+        service = AuditService(self.spool)
+        job_id = service.submit({"name": "broken"})
+        self.run_queue(service)
+        self.assertEqual(service.status(job_id)["status"], "failed")
+        self.assertTrue(os.path.exists(os.path.join(self.spool, "failed", f"{job_id}.json")))
+        mock_run_job.assert_not_called()
+
+    def test_job_ids_that_are_not_plain_names_are_rejected(self, mock_warm_up):
+        # Arrange
+        service = AuditService(self.spool, defaults=self.defaults, port=0).start()
+        base = f"http://127.0.0.1:{service.port}"
+        try:
+            # Act
+            with self.assertRaises(ValueError):
+                service.submit(dict(self.job, id="../../escaped"))
+            posted = requests.post(f"{base}/jobs", data=json.dumps(dict(self.job, id="../escaped")))
+            read = requests.get(f"{base}/jobs/..%2F..%2Fsecret")
+        finally:
+            service.shutdown()
+
+        # Assert
+        self.assertEqual((posted.status_code, read.status_code), (400, 400))
+        self.assertEqual(os.listdir(os.path.dirname(self.spool)).count("escaped.json"), 0)
+        self.assertEqual(os.listdir(os.path.join(self.spool, "incoming")), [])
+
+    def test_interrupted_jobs_are_requeued(self, mock_warm_up):
+        service = AuditService(self.spool)
+        with open(os.path.join(self.spool, "running", "old-job.json"), "w") as f:
+            json.dump(self.job, f)
+        service.requeue_interrupted()
+        self.assertEqual(service.status("old-job")["status"], "queued")
+
+    def test_http_api_accepts_and_reports_jobs(self, mock_warm_up):
+        # Arrange
+        service = AuditService(self.spool, defaults=self.defaults, port=0).start()
+        base = f"http://127.0.0.1:{service.port}"
+        try:
+            # Act
+            accepted = requests.post(f"{base}/jobs", data=json.dumps(self.job))
+            rejected = requests.post(f"{base}/jobs", data=json.dumps({"name": "broken"}))
+            status = requests.get(f"{base}/jobs/{accepted.json()['id']}")
+            health = requests.get(f"{base}/health")
+        finally:
+            service.shutdown()
+
+        # Assert
+        self.assertEqual(accepted.status_code, 202)
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(status.json()["status"], "queued")
+        self.assertEqual(health.json()["queued"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# tests/test_singleflight.py
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from ..src.main import es_lookups, run_audit_stages
+from ..src.singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_execution(self):
+        # Arrange
+        lookups = SingleFlight()
+        started = threading.Event()
+        calls = []
+
+        def slow_lookup(key):
+            calls.append(key)
+            started.set()
+            time.sleep(0.05)
+            return {"key": key}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(lookups.call(slow_lookup, "a")))
+                   for _ in range(8)]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        self.assertEqual(calls, ["a"])
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(lookups.stats(), {"requested": 8, "executed": 1, "deduplicated": 7, "dedup_ratio": 0.875})
+
+    def test_results_not_kept_are_retried(self):
+        # Arrange
+        lookups = SingleFlight(keep=lambda result: "error" not in result)
+        fn = MagicMock(side_effect=[{"error": "timeout"}, {"hits": {}}])
+
+        # Act
+        first = lookups.call(fn, "a")
+        second = lookups.call(fn, "a")
+        third = lookups.call(fn, "a")
+
+        # Assert
+        self.assertEqual(first, {"error": "timeout"})
+        self.assertEqual(second, third)
+        self.assertEqual(fn.call_count, 2)
+
+    def test_exceptions_reach_the_caller_and_are_not_kept(self):
+        # Arrange
+        lookups = SingleFlight()
+        fn = MagicMock(side_effect=[ValueError("boom"), 1])
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            lookups.call(fn, "a")
+        self.assertEqual(lookups.call(fn, "a"), 1)
+
+
+class TestAuditStagesDeduplicateLookups(unittest.TestCase):
+
+    @patch("builtins.print")
+    @patch("Automation_Scripts.mapping_automation.src.main._search_metadata")
+    def test_identical_lookups_run_once_per_run(self, mock_search, mock_print):
+        # Arrange: the same class of one source is audited for two fields proposing the same name
+        mock_search.return_value = {"hits": {"hits": [{"_source": {"tableSystemName": "SF"}}]}}
+        cursor = MagicMock()
+        cursor.fetchall.return_value = []
+        master_list = [("SRC_A", "RETS", "P", 1, "Class1", "Desc", "agent", field_id, "IS_ACTIVE")
+                       for field_id in (10, 11)]
+        master_list += [("SRC_A", "RETS", "P", 2, "Class2", "Desc", "agent", 10, "IS_ACTIVE")]
+        definitions = {"IS_ACTIVE": {"long_name": "StatusFlag", "transformation": "StatusFlag"}}
+
+        # Act
+        result = run_audit_stages(cursor, master_list, "url", definitions=definitions)
+
+        # Assert
+        self.assertEqual(mock_search.call_count, 2)
+        self.assertEqual(result.attrs["es_lookups"], {"requested": 3, "executed": 2, "deduplicated": 1,
+                                                      "dedup_ratio": 0.3333})
+        self.assertEqual(list(result["es_Pass"]), ["Y", "Y", "Y"])
+        self.assertIsNone(es_lookups.get())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# tests/test_startup.py
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import unittest
+import Automation_Scripts
+
+# Import-time budget for the CLI/help path; generous enough for slow CI, far below an eager pandas import
+IMPORT_BUDGET_SECONDS = 0.5
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "psycopg2", "requests", "Automation_Scripts.db_creds")
+PKG = "Automation_Scripts.mapping_automation.src"
+
+
+def run_isolated(code):
+    # Runs code in a fresh interpreter and returns the JSON it prints on its last line
+    root = os.path.dirname(list(Automation_Scripts.__path__)[0])
+    env = dict(os.environ, PYTHONPATH=root)
+    script = textwrap.dedent(code) + textwrap.dedent(f"""
+        import sys, json
+        print(json.dumps({{"loaded": sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules), **result}}))
+    """)
+    proc = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env, cwd=root)
+    if proc.returncode != 0:
+        raise AssertionError(proc.stderr)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+class TestStartupBudget(unittest.TestCase):
+
+    def test_cli_help_loads_no_heavy_dependencies(self):
+        # Act
+        result = run_isolated(f"""
+            import time
+            started = time.perf_counter()
+            from {PKG} import cli, service
+            import_seconds = time.perf_counter() - started
+            try:
+                cli.main(["--help"])
+            except SystemExit:
+                pass
+            result = {{"import_seconds": import_seconds}}
+        """)
+
+        # Assert
+        self.assertEqual(result["loaded"], [])
+        self.assertLess(result["import_seconds"], IMPORT_BUDGET_SECONDS)
+
+    def test_mapping_audit_without_pandas_or_excel(self):
+        # Act
+        result = run_isolated(f"""
+            from unittest.mock import MagicMock
+            from {PKG}.main import get_src_info, mapping_audit
+            cursor = MagicMock()
+            cursor.fetchall.side_effect = [[("SRC_A", "RETS", "P", 1, "Class", "Desc", "agent")], []]
+            rows = mapping_audit(cursor, [r + (10, "IS_ACTIVE") for r in get_src_info(cursor, ["SRC_A"], "agent")])
+            result = {{"status": rows[0][-1]}}
+        """)
+
+        # Assert
+        self.assertEqual(result["status"], "Not Mapped")
+        self.assertEqual(result["loaded"], [])
+
+    def test_audit_stages_skip_excel_database_driver_and_http(self):
+        # Act
+        result = run_isolated(f"""
+            from unittest.mock import MagicMock, patch
+            from {PKG} import main
+            cursor = MagicMock()
+            cursor.fetchall.return_value = [(True,)]
+            with patch.object(main, "get_metadata_elastic_search", return_value={{"hits": {{"hits": []}}}}):
+                df = main.run_audit_stages(cursor, [("SRC_A", "RETS", "P", 1, "Class", "Desc", "agent", 10,
+                                                    "IS_ACTIVE")], "https://es")
+            result = {{"rows": len(df)}}
+        """)
+
+        # Assert
+        self.assertEqual(result["rows"], 1)
+        self.assertEqual(result["loaded"], ["numpy", "pandas"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+# tests/test_suggest.py
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+import pandas as pd
+from ..benchmarks.fake_opensearch import FakeOpenSearch
+from ..src.main import SUGGESTION_HEADER, add_long_name_suggestions, get_class_metadata
+from ..src.suggest import TrigramIndex, trigrams
+
+CORPUS = [
+    {"documentId": "src_a", "className": "class1", "resource": "property", "longName": "Status Flag",
+     "tableSystemName": "STATUS_FLG"},
+    {"documentId": "src_a", "className": "class1", "resource": "property", "longName": "Listing Status",
+     "tableSystemName": "LST_STATUS"},
+    {"documentId": "src_a", "className": "class1", "resource": "property", "longName": "List Price",
+     "tableSystemName": "LIST_PRICE"},
+    {"documentId": "src_a", "className": "class2", "resource": "property", "longName": "Status Flag",
+     "tableSystemName": "OTHER_CLASS"},
+]
+
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def test_camel_case_and_separators_split_into_words(self):
+        self.assertEqual(trigrams("StatusFlag"), trigrams("status_flag"))
+
+    def test_closest_values_first(self):
+        # Arrange
+        index = TrigramIndex([("Status Flag", "STATUS_FLG"), ("Listing Status", "LST_STATUS"),
+                              ("List Price", "LIST_PRICE")])
+
+        # Act
+        matches = index.search("StatusFlg", top_k=2, min_score=0.1)
+
+        # Assert
+        self.assertEqual([value for value, _ in matches], ["STATUS_FLG", "LST_STATUS"])
+        self.assertEqual(index.search("zzz"), [])
+
+    def test_lookups_stay_fast_with_many_fields(self):
+        # Arrange
+        index = TrigramIndex((f"Field Number {n} Value", f"FLD_{n}") for n in range(30000))
+
+        # Act
+        started = time.perf_counter()
+        for n in range(0, 30000, 300):
+            index.search(f"FieldNumber{n}Value", top_k=3)
+        seconds = time.perf_counter() - started
+
+        # Assert
+        self.assertEqual(index.search("FieldNumber123Value", top_k=1)[0][0], "FLD_123")
+        self.assertLess(seconds, 2.0)
+
+
+@patch("builtins.print")
+class TestLongNameSuggestions(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeOpenSearch(CORPUS).start()
+        self.df = pd.DataFrame([
+            ["SRC_A", "RETS", "P", 1, "class1", "listing", "Not Mapped", "StatusFlg, ListPrice", "NF,LIST_PRICE"],
+            ["SRC_A", "RETS", "P", 1, "class1", "listing", "Not Mapped", "ListingStatus", "NF"],
+            ["SRC_A", "RETS", "P", 1, "class1", "listing", "Mapped", "N/A", "N/A"],
+            ["SRC_A", "RETS", "P", 2, "class1", "listing", "Deactivated", "ListPrice", "LIST_PRICE"],
+        ], columns=["Source", "Protocol", "Provider", "Dataset ID", "Class", "Download Type", "Mapping Status",
+                    "Proposed Fields Short Name", "Proposed Fields Long Name"])
+
+    def tearDown(self):
+        self.server.stop()
+
+    @patch("Automation_Scripts.mapping_automation.src.main.CLASS_METADATA_PAGE", 2)
+    def test_nf_fields_get_candidates_from_one_paged_fetch_per_class(self, mock_print):
+        # Act
+        result = add_long_name_suggestions(self.df, self.server.search_url, top_k=2, min_score=0.1)
+
+        # Assert
+        self.assertEqual(list(result[SUGGESTION_HEADER]),
+                         ["StatusFlg: STATUS_FLG, LST_STATUS", "ListingStatus: LST_STATUS, STATUS_FLG", "N/A", "N/A"])
+        self.assertEqual(self.server.stats["searches"], 2)  # 3 documents in pages of 2
+
+    @patch("Automation_Scripts.mapping_automation.src.main.CLASS_METADATA_PAGE", 2)
+    def test_paging_returns_documents_with_the_same_names(self, mock_print):
+        # Arrange
+        self.server.stop()
+        self.server = FakeOpenSearch(CORPUS + [dict(CORPUS[0]) for _ in range(3)]).start()
+
+        # Act
+        docs = get_class_metadata("SRC_A", "class1", "property", self.server.search_url)
+
+        # Assert
+        self.assertEqual(len(docs), 6)
+        self.assertEqual(self.server.stats["searches"], 4)  # 6 documents in pages of 2, then an empty page
+
+    def test_unreachable_metadata_leaves_no_candidates(self, mock_print):
+        # Act
+        result = add_long_name_suggestions(self.df.head(1), "http://127.0.0.1:9/metadata/_search")
+
+        # Assert
+        self.assertEqual(result.iloc[0][SUGGESTION_HEADER], "StatusFlg: -")
+
+    def test_non_json_metadata_response_leaves_no_candidates(self, mock_print):
+        # Arrange
+        session = MagicMock()
+        session.get.return_value.json.side_effect = ValueError("Expecting value: line 1 column 1 (char 0)")
+
+        # Act
+        with patch("Automation_Scripts.mapping_automation.src.main.http_session", session):
+            docs = get_class_metadata("SRC_A", "class1", "property", self.server.search_url)
+            result = add_long_name_suggestions(self.df.head(1), self.server.search_url)
+
+        # Assert
+        self.assertEqual(docs, [])
+        self.assertEqual(result.iloc[0][SUGGESTION_HEADER], "StatusFlg: -")
+
+
+if __name__ == "__main__":
+    unittest.main()
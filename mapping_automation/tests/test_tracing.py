@@ -0,0 +1,151 @@
+# tests/test_tracing.py
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from ..src import tracing
+from ..src.main import get_metadata_elastic_search, mapping_audit
+
+
+class TracingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.trace_path = os.path.join(self.tmp_dir.name, "trace.jsonl")
+
+    def tearDown(self):
+        tracing.disable()
+        self.tmp_dir.cleanup()
+
+    def read_spans(self):
+        tracing.disable()
+        return tracing.load_spans(self.trace_path)
+
+
+class TestSpans(TracingTestCase):
+
+    def test_disabled_span_is_noop(self):
+        # Act
+        with tracing.span("stage.test", rows=1) as span:
+            span.set(extra=True)
+
+        # Assert
+        self.assertFalse(tracing.is_enabled())
+        self.assertFalse(os.path.exists(self.trace_path))
+
+    def test_nested_spans_record_parent(self):
+        # Arrange
+        trace_id = tracing.enable(self.trace_path)
+
+        # Act
+        with tracing.span("stage.outer", rows=2):
+            with tracing.span("sql.inner", dataset_id=1) as inner:
+                inner.set(rows=5)
+
+        # Assert
+        spans = {s["name"]: s for s in self.read_spans()}
+        self.assertEqual(spans["sql.inner"]["parentSpanId"], spans["stage.outer"]["spanId"])
+        self.assertIsNone(spans["stage.outer"]["parentSpanId"])
+        self.assertEqual(spans["sql.inner"]["attributes"], {"dataset_id": 1, "rows": 5})
+        self.assertEqual(spans["stage.outer"]["traceId"], trace_id)
+        self.assertGreaterEqual(spans["stage.outer"]["endTimeUnixNano"], spans["stage.outer"]["startTimeUnixNano"])
+
+    def test_exception_marks_span_error(self):
+        # Arrange
+        tracing.enable(self.trace_path)
+
+        # Act
+        with self.assertRaises(ValueError):
+            with tracing.span("stage.failing"):
+                raise ValueError("boom")
+
+        # Assert
+        span = self.read_spans()[0]
+        self.assertEqual(span["status"], "ERROR")
+        self.assertIn("boom", span["attributes"]["error"])
+
+
+class TestTracedExecute(TracingTestCase):
+
+    def test_execute_disabled_passes_through(self):
+        # Arrange
+        mock_cursor = MagicMock()
+
+        # Act
+        tracing.execute(mock_cursor, "SELECT 1;", "check", field_id=1)
+
+        # Assert
+        mock_cursor.execute.assert_called_once_with("SELECT 1;")
+
+    def test_mapping_audit_emits_sql_spans(self):
+        # Arrange
+        tracing.enable(self.trace_path)
+        mock_cursor = MagicMock()
+        mock_cursor.rowcount = 1
+        mock_cursor.fetchall.return_value = [(True,)]
+        sample_tuple = ('SRC_A', 'REST', 'Provider1', 1, 'Dataset1', 'Desc1', 'agent', 101, 'SomeField')
+
+        # Act
+        mapping_audit(mock_cursor, [sample_tuple])
+
+        # Assert
+        span = self.read_spans()[0]
+        self.assertEqual(span["name"], "sql.mapping_audit")
+        self.assertEqual(span["attributes"], {"source": "SRC_A", "dataset_id": 1, "field_id": 101, "rows": 1})
+
+    @patch("Automation_Scripts.mapping_automation.src.main.requests.get")
+    def test_es_request_emits_http_span(self, mock_get):
+        # Arrange
+        tracing.enable(self.trace_path)
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"hits": {"hits": [{"_source": {"tableSystemName": "tbl"}}]}}
+        mock_get.return_value = mock_response
+
+        # Act
+        get_metadata_elastic_search("SRC_A", "Dataset1", "Field1", None, "https://fake-url.com")
+
+        # Assert
+        span = self.read_spans()[0]
+        self.assertEqual(span["name"], "http.es_search")
+        self.assertEqual(span["attributes"]["status_code"], 200)
+        self.assertEqual(span["attributes"]["rows"], 1)
+
+
+class TestOfflineAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.spans = [
+            {"traceId": "t", "spanId": "1", "parentSpanId": None, "name": "stage.mapping_audit",
+             "startTimeUnixNano": 0, "endTimeUnixNano": 10_000_000, "durationMs": 10.0, "threadId": 1,
+             "attributes": {}},
+            {"traceId": "t", "spanId": "2", "parentSpanId": "1", "name": "sql.mapping_audit",
+             "startTimeUnixNano": 1_000_000, "endTimeUnixNano": 5_000_000, "durationMs": 4.0, "threadId": 1,
+             "attributes": {"dataset_id": 7}},
+        ]
+
+    def test_summarize_computes_self_time(self):
+        summary = dict(tracing.summarize(self.spans))
+        self.assertEqual(summary["stage.mapping_audit"]["self_ms"], 6.0)
+        self.assertEqual(summary["sql.mapping_audit"]["count"], 1)
+
+    def test_summarize_group_by_attribute(self):
+        summary = dict(tracing.summarize(self.spans, group_by="dataset_id"))
+        self.assertIn(("sql.mapping_audit", 7), summary)
+
+    def test_to_chrome_trace(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_path = os.path.join(tmp_dir, "timeline.json")
+            count = tracing.to_chrome_trace(self.spans, out_path)
+            with open(out_path) as f:
+                events = json.load(f)["traceEvents"]
+
+        self.assertEqual(count, 2)
+        self.assertEqual(events[1]["ts"], 1000)
+        self.assertEqual(events[1]["dur"], 4000)
+        self.assertEqual(events[1]["ph"], "X")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+# tests/test_writes.py
+import unittest
+from unittest.mock import MagicMock, patch
+import pandas as pd
+from ..benchmarks.db_harness import LocalDatabase
+from ..src.writes import WriteConfig, WriteExecutor
+from ..src.main import canonical_inserts_from_df, canonical_updates_from_df, origin_inserts_from_df
+
+INSERT = "INSERT INTO table_canonical_fields (id, name, download_type) VALUES ({id}, {name}, 'agent')"
+
+
+class TestWriteExecutorStatements(unittest.TestCase):
+
+    def test_default_config_executes_directly_and_commits_once(self):
+        # Arrange
+        conn, cursor = MagicMock(), MagicMock()
+        executor = WriteExecutor(conn)
+
+        # Act
+        for n in range(3):
+            executor.execute(cursor, f"INSERT {n}", "canonical_insert")
+        executor.commit()
+
+        # Assert
+        self.assertEqual([c.args[0] for c in cursor.execute.call_args_list], ["INSERT 0", "INSERT 1", "INSERT 2"])
+        conn.commit.assert_called_once()
+
+    def test_chunk_size_commits_every_n_single_row_statements(self):
+        # Arrange
+        conn, cursor = MagicMock(), MagicMock()
+        executor = WriteExecutor(conn, WriteConfig(chunk_size=2))
+
+        # Act
+        for n in range(5):
+            executor.execute(cursor, f"INSERT {n}", "canonical_insert")
+        executor.commit()
+
+        # Assert
+        self.assertEqual(conn.commit.call_count, 3)
+        self.assertEqual(executor.summary(), {"statements": 5, "commits": 3, "failed": 0})
+
+    def test_chunk_size_commits_at_row_boundaries_of_multi_row_statements(self):
+        # Arrange
+        conn, cursor = MagicMock(), MagicMock()
+        executor = WriteExecutor(conn, WriteConfig(chunk_size=3))
+        commits = []
+        conn.commit.side_effect = lambda: commits.append(cursor.execute.call_count)
+
+        # Act
+        executor.execute(cursor, "UPDATE 0", "canonical_update")
+        executor.execute_batch(cursor, [(f"({n})", {}) for n in range(7)],
+                               lambda values: f"INSERT {', '.join(values)}", "origin_insert")
+        executor.commit()
+
+        # Assert
+        self.assertEqual([c.args[0] for c in cursor.execute.call_args_list],
+                         ["UPDATE 0", "INSERT (0), (1)", "INSERT (2), (3), (4)", "INSERT (5), (6)"])
+        self.assertEqual(commits, [2, 3, 4])
+
+    def test_atomic_defers_commit_to_finish(self):
+        conn, cursor = MagicMock(), MagicMock()
+        executor = WriteExecutor(conn, WriteConfig(chunk_size=1, atomic=True))
+        executor.execute(cursor, "INSERT 0", "canonical_insert")
+        executor.commit()
+        conn.commit.assert_not_called()
+        executor.finish()
+        conn.commit.assert_called_once()
+
+
+class TestWriteExecutorSavepoints(unittest.TestCase):
+
+    def setUp(self):
+        self.db = LocalDatabase("sqlite").start()
+        self.conn = self.db.connection()
+        self.cursor = self.conn.cursor()
+
+    def tearDown(self):
+        self.db.stop()
+
+    def names(self):
+        self.cursor.execute("SELECT name FROM table_canonical_fields ORDER BY id")
+        return [row[0] for row in self.cursor.fetchall()]
+
+    @patch("builtins.print")
+    def test_failing_statement_is_isolated_and_chunk_replayed(self, mock_print):
+        # Arrange
+        executor = WriteExecutor(self.conn, WriteConfig(chunk_size=3, savepoints=True))
+        names = ["'A'", "'B'", "NULL", "'D'", "'E'"]
+
+        # Act
+        for n, name in enumerate(names, 1):
+            executor.execute(self.cursor, INSERT.format(id=n, name=name), "canonical_insert", field_id=n)
+        executor.commit()
+        executor.finish()
+
+        # Assert
+        self.assertEqual(self.names(), ["A", "B", "D", "E"])
+        self.assertEqual(len(executor.failures), 1)
+        self.assertEqual(executor.failures[0]["attrs"], {"field_id": 3})
+        self.assertIn("NOT NULL", executor.failures[0]["error"].upper())
+
+    @patch("builtins.print")
+    def test_returned_rows_survive_a_later_failure_in_the_chunk(self, mock_print):
+        # Arrange
+        executor = WriteExecutor(self.conn, WriteConfig(chunk_size=10, savepoints=True))
+
+        # Act
+        returned = executor.execute(self.cursor, INSERT.format(id=1, name="'A'") + " RETURNING id", "canonical_insert",
+                                    fetch=True)
+        executor.execute(self.cursor, INSERT.format(id=2, name="NULL"), "canonical_insert")
+        executor.finish()
+
+        # Assert
+        self.assertEqual(returned, [(1,)])
+        self.assertEqual(self.names(), ["A"])
+
+    def test_atomic_rollback_discards_every_stage(self):
+        # Arrange
+        executor = WriteExecutor(self.conn, WriteConfig(chunk_size=1, savepoints=True, atomic=True))
+        executor.execute(self.cursor, INSERT.format(id=1, name="'A'"), "canonical_insert")
+        executor.commit()
+        executor.execute(self.cursor, INSERT.format(id=2, name="'B'"), "canonical_insert")
+
+        # Act
+        executor.rollback()
+
+        # Assert
+        self.assertEqual(self.names(), [])
+
+    @patch("builtins.print")
+    def test_update_stage_keeps_good_rows_when_one_fails(self, mock_print):
+        # Arrange
+        self.db.execute("INSERT INTO table_canonical_fields (id, name, download_type) VALUES (10, 'IS_ACTIVE', 'agent')")
+        for dataset_id in (1, 2):
+            self.db.execute(f"""INSERT INTO table_mapping (field_id, dataset_id, custom_transformation, is_active,
+                                download_type, dataset_name) VALUES (10, {dataset_id}, 'old', false, 'agent', 'Class')""")
+        self.db.execute("""CREATE TRIGGER reject_dataset_2 BEFORE UPDATE ON table_mapping WHEN NEW.dataset_id = 2
+                           BEGIN SELECT RAISE(ABORT, 'dataset 2 is locked'); END""")
+        df = pd.DataFrame([[10, dataset_id, 'Class', 'agent', 'new'] for dataset_id in (1, 2)],
+                          columns=['Field ID', 'Dataset ID', 'Class', 'Download Type', 'Finalized Transformation'])
+        executor = WriteExecutor(self.conn, WriteConfig(savepoints=True))
+
+        # Act
+        canonical_updates_from_df(df, self.conn, executor)
+
+        # Assert
+        self.cursor.execute("SELECT dataset_id, custom_transformation, is_active FROM table_mapping ORDER BY dataset_id")
+        self.assertEqual(self.cursor.fetchall(), [(1, 'new', 1), (2, 'old', 0)])
+        self.assertEqual(executor.failures[0]["attrs"], {"dataset_id": 2, "field_id": 10})
+
+    @patch("builtins.print")
+    def test_failing_insert_batch_is_retried_row_by_row(self, mock_print):
+        # Arrange
+        self.db.execute("INSERT INTO table_canonical_fields (id, name, download_type) VALUES (10, 'IS_ACTIVE', 'agent')")
+        descriptions = ["Homes", "Land", "Owner's units", "Rentals", "Farms"]
+        df = pd.DataFrame([[10, dataset_id, f"Class{dataset_id}", description, 'StatusFlag', 'Status Flag', 'Status']
+                           for dataset_id, description in enumerate(descriptions, 1)],
+                          columns=['Field ID', 'Dataset ID', 'Class', 'Class Description', 'Finalized Transformation',
+                                   'Proposed Fields Long Name', 'Proposed Field Short Name'])
+        executor = WriteExecutor(self.conn, WriteConfig(savepoints=True))
+
+        # Act
+        mapping_ids = canonical_inserts_from_df(df, self.conn, "agent", executor)
+        origin_inserts_from_df(df, self.conn, executor, mapping_ids)
+        executor.finish()
+
+        # Assert
+        self.cursor.execute("SELECT dataset_id FROM table_mapping ORDER BY dataset_id")
+        self.assertEqual([row[0] for row in self.cursor.fetchall()], [1, 2, 4, 5])
+        self.cursor.execute("SELECT dataset_id FROM table_origin_field ORDER BY dataset_id")
+        self.assertEqual([row[0] for row in self.cursor.fetchall()], [1, 2, 4, 5])
+        self.assertEqual([failure["attrs"] for failure in executor.failures],
+                         [{"field_id": 10, "dataset_id": 3, "dataset_name": "Class3"}])
+        printed = [c.args[0] for c in mock_print.call_args_list]
+        self.assertIn("1 of 5 canonical inserts failed and were rolled back", printed)
+        self.assertIn("Origin Inserts Created", printed)
+
+
+if __name__ == "__main__":
+    unittest.main()